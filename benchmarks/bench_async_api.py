@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga del dashboard: consultas en el event loop vs. pool de hilos (async_dao).
+
+Levanta la app de dashboard_server sobre una base SQLite temporal con N avisos,
+lanza R requests (/api/ausencias y /api/stats, caché de respuestas desactivada)
+con C clientes concurrentes y mide requests/s, latencia p50/p95 y el retraso
+máximo del event loop (un tick cada 5 ms que debería despertarse a tiempo).
+
+- sync: DB_THREADS=0, cada consulta bloquea el loop (comportamiento anterior)
+- pool: DB_THREADS=N, consultas en async_dao
+
+Uso: python benchmarks/bench_async_api.py [--rows 100000] [--requests 400] [--concurrency 32]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# La base del DAO se fija al importar: antes de cualquier import de src
+_db = Path(tempfile.mkdtemp()) / "bench_async.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{_db}"
+os.environ["API_CACHE_SIZE"] = "0"
+
+from aiohttp import ClientSession  # noqa: E402
+from aiohttp.test_utils import TestServer  # noqa: E402
+
+import dashboard_server  # noqa: E402
+from bench_indexes import cargar  # noqa: E402
+from src.config import settings  # noqa: E402
+from src.persistence import async_dao  # noqa: E402
+from src.persistence.dao import _engine  # noqa: E402
+from src.persistence.seed import ensure_schema  # noqa: E402
+
+URLS = (
+	"/api/ausencias?limit=200",
+	"/api/ausencias?limit=100&orden=prioridad",
+	"/api/ausencias?limit=100&estado=incompleto",
+	"/api/stats",
+)
+
+
+async def _monitor_loop(stop: asyncio.Event, lags: list[float]) -> None:
+	loop = asyncio.get_running_loop()
+	while not stop.is_set():
+		t0 = loop.time()
+		await asyncio.sleep(0.005)
+		lags.append(loop.time() - t0 - 0.005)
+
+
+async def correr(modo: str, hilos: int, total: int, concurrencia: int) -> None:
+	settings.DB_THREADS = hilos
+	async_dao.shutdown()
+	app = await dashboard_server.init_app()
+	server = TestServer(app)
+	await server.start_server()
+	latencias: list[float] = []
+	lags: list[float] = []
+	cola: asyncio.Queue = asyncio.Queue()
+	for i in range(total):
+		cola.put_nowait(i)
+
+	async def cliente(http: ClientSession) -> None:
+		while not cola.empty():
+			i = cola.get_nowait()
+			t0 = time.perf_counter()
+			async with http.get(server.make_url(URLS[i % len(URLS)])) as r:
+				await r.read()
+				assert r.status == 200, r.status
+			latencias.append(time.perf_counter() - t0)
+
+	stop = asyncio.Event()
+	monitor = asyncio.create_task(_monitor_loop(stop, lags))
+	t0 = time.perf_counter()
+	async with ClientSession() as http:
+		await asyncio.gather(*(cliente(http) for _ in range(concurrencia)))
+	elapsed = time.perf_counter() - t0
+	stop.set()
+	await monitor
+	await server.close()
+
+	latencias.sort()
+	p95 = latencias[int(len(latencias) * 0.95) - 1]
+	print(
+		f"  {modo:<10} {total / elapsed:8.1f} req/s   p50 {statistics.median(latencias) * 1000:7.1f} ms"
+		f"   p95 {p95 * 1000:7.1f} ms   loop bloqueado máx {max(lags) * 1000:7.1f} ms"
+	)
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--rows", type=int, default=100000)
+	parser.add_argument("--requests", type=int, default=400)
+	parser.add_argument("--concurrency", type=int, default=32)
+	parser.add_argument("--threads", type=int, default=4)
+	args = parser.parse_args()
+
+	ensure_schema()
+	cargar(_engine, args.rows)
+	print(f"{args.rows} avisos, {args.requests} requests, {args.concurrency} clientes")
+	asyncio.run(correr("sync", 0, args.requests, args.concurrency))
+	asyncio.run(correr(f"pool({args.threads})", args.threads, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark de forward_chain_batch a 10k / 100k conjuntos de hechos.
+
+Compara: bucle de forward_chain(f) vs. forward_chain_batch en proceso vs.
+forward_chain_batch con pool de procesos.
+
+Uso: python benchmarks/bench_batch.py [--workers N] [--sizes 10000,100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Iterator
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.engine.inference import forward_chain, forward_chain_batch  # noqa: E402
+
+MOTIVOS = [
+	"enfermedad_inculpable", "enfermedad_familiar", "fallecimiento", "matrimonio",
+	"nacimiento", "paternidad", "permiso_gremial", "art",
+]
+
+
+def generar(n: int, seed: int = 7) -> Iterator[dict[str, Any]]:
+	"""Genera avisos sintéticos (streaming, sin materializar la lista)."""
+	rnd = random.Random(seed)
+	base = date(2025, 1, 1)
+	for i in range(n):
+		inicio = base + timedelta(days=rnd.randint(0, 365))
+		yield {
+			"legajo": str(1000 + rnd.randint(0, 4999)),
+			"empleado_nombre": None if rnd.random() < 0.05 else f"Empleado {i}",
+			"area": rnd.choice(["producción", "administración", "ventas", "logística"]),
+			"motivo": rnd.choice(MOTIVOS),
+			"fecha_inicio": inicio.isoformat(),
+			"duracion_estimdays": rnd.randint(1, 10),
+			"adjunto_certificado": "cert.pdf" if rnd.random() < 0.6 else None,
+			"fecha_recepcion": (inicio + timedelta(days=rnd.randint(0, 4))).isoformat(),
+		}
+
+
+def medir(nombre: str, n: int, fn) -> None:
+	t0 = time.perf_counter()
+	count = 0
+	for _ in fn():
+		count += 1
+	dt = time.perf_counter() - t0
+	assert count == n
+	print(f"  {nombre:<28} {dt:8.2f} s   {n / dt:10.0f} eval/s")
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+	parser.add_argument("--sizes", default="10000,100000")
+	args = parser.parse_args()
+	for n in (int(x) for x in args.sizes.split(",")):
+		print(f"n = {n}")
+		medir("forward_chain en bucle", n, lambda: (forward_chain(f) for f in generar(n)))
+		medir("forward_chain_batch", n, lambda: forward_chain_batch(generar(n)))
+		if args.workers > 1:
+			medir(f"forward_chain_batch x{args.workers}", n, lambda: forward_chain_batch(generar(n), workers=args.workers))
+
+
+if __name__ == "__main__":
+	main()
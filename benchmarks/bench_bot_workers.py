@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Generador de carga del bot: conversaciones sintéticas contra 0..N workers (sharding.py).
+
+Cada chat recorre una conversación completa (saludo, legajo, motivo, fecha,
+días, certificado más tarde, confirmación que crea el aviso) sobre una base
+SQLite temporal. Los chats corren concurrentemente; dentro de un chat los
+mensajes se mandan todos juntos sin esperar respuesta (--rafaga, el peor caso
+para el orden) o uno por vez como un usuario real. Reporta mensajes/s,
+latencia p50/p95 y verifica que cada chat terminara con el aviso registrado
+(si el orden por chat se rompiera, la conversación no llegaría a confirmar).
+
+- 0 workers: LocalDialogue (DialogueManager en el event loop, como antes)
+- N workers: ShardedDialogue con N procesos
+
+Uso: python benchmarks/bench_bot_workers.py [--chats 200] [--workers 0 1 2 4] [--rafaga]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# La base del DAO se fija al importar. Los workers (spawn) vuelven a ejecutar este
+# módulo: heredan BENCH_BOT_DB del entorno y usan la misma base
+if "BENCH_BOT_DB" not in os.environ:
+	os.environ["BENCH_BOT_DB"] = str(Path(tempfile.mkdtemp()) / "bench_bot.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.environ['BENCH_BOT_DB']}"
+
+from src.persistence.dao import session_scope  # noqa: E402
+from src.persistence.models import Employee  # noqa: E402
+from src.persistence.seed import ensure_schema  # noqa: E402
+from src.telegram.sharding import LocalDialogue, ShardedDialogue  # noqa: E402
+
+MOTIVOS = ("enfermedad", "matrimonio", "fallecimiento")
+
+
+def conversacion(legajo: str, i: int) -> list[str]:
+	# Los motivos sin certificado ignoran "enviar más tarde" (se vuelve a pedir confirmación)
+	return ["hola", legajo, MOTIVOS[i % len(MOTIVOS)], "mañana", str(1 + i % 5), "enviar más tarde", "si"]
+
+
+def cargar_empleados(n: int) -> list[str]:
+	legajos = [str(1000 + i) for i in range(n)]
+	with session_scope() as session:
+		session.add_all(Employee(legajo=leg, nombre=f"Empleado {leg}", area="producción") for leg in legajos)
+	return legajos
+
+
+async def correr(dialogue, legajos: list[str], ronda: str, rafaga: bool) -> tuple[float, list[float], int]:
+	latencias: list[float] = []
+
+	async def enviar(chat: str, texto: str) -> dict:
+		t0 = time.perf_counter()
+		res = await dialogue.process_message(chat, texto)
+		latencias.append(time.perf_counter() - t0)
+		return res
+
+	async def chat(i: int, legajo: str) -> bool:
+		chat_id = f"{ronda}_{i}"
+		mensajes = conversacion(legajo, i)
+		if rafaga:
+			respuestas = await asyncio.gather(*(enviar(chat_id, m) for m in mensajes))
+		else:
+			respuestas = [await enviar(chat_id, m) for m in mensajes]
+		return "REGISTRADA" in (respuestas[-1].get("reply_text") or "")
+
+	t0 = time.perf_counter()
+	ok = await asyncio.gather(*(chat(i, leg) for i, leg in enumerate(legajos)))
+	return time.perf_counter() - t0, latencias, sum(ok)
+
+
+async def main() -> None:
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--chats", type=int, default=200)
+	parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+	parser.add_argument("--rafaga", action="store_true", help="mensajes de un chat sin esperar respuesta")
+	args = parser.parse_args()
+
+	ensure_schema()
+	# Legajos distintos por ronda: el mismo legajo con la misma fecha sería un solape
+	todos = cargar_empleados(args.chats * len(args.workers))
+	print(f"{args.chats} chats x {len(conversacion('1000', 0))} mensajes, os.cpu_count()={os.cpu_count()}")
+	for r, workers in enumerate(args.workers):
+		legajos = todos[r * args.chats:(r + 1) * args.chats]
+		dialogue = LocalDialogue() if workers == 0 else ShardedDialogue(workers).start()
+		try:
+			# Calentar (import y directorio de empleados en cada worker) fuera de la medición
+			await asyncio.gather(*(dialogue.process_message(f"warm_{r}_{i}", "hola") for i in range(workers * 8 or 1)))
+			total, lat, ok = await correr(dialogue, legajos, f"r{r}", args.rafaga)
+		finally:
+			await dialogue.close()
+		lat.sort()
+		print(
+			f"  workers={workers}: {len(lat) / total:7.0f} msg/s   p50 {statistics.median(lat) * 1000:7.1f} ms"
+			f"   p95 {lat[int(len(lat) * 0.95) - 1] * 1000:7.1f} ms   avisos {ok}/{len(legajos)}"
+		)
+
+
+if __name__ == "__main__":
+	asyncio.run(main())
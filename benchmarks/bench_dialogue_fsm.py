@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark del diálogo: máquina de estados (docs/dialogue.json) vs. cadena if/elif anterior.
+
+Genera N conversaciones grabadas (legajos válidos, inexistentes con nombre y
+sugerencias, formatos inválidos, "otra fecha", "otro", editar, adjuntar o
+enviar más tarde) y las reproduce en ambos managers con sesiones en memoria.
+Reporta µs por mensaje y verifica que las respuestas (texto y teclado) sean
+idénticas mensaje a mensaje.
+
+La versión if/elif es src/dialogue/manager.py tal como estaba antes de la
+máquina de estados, leída con `git show` al ejecutar (no hay una copia
+mantenida a mano). Por defecto se usa el padre del commit que agregó
+docs/dialogue.json, así sigue valiendo tras un rebase o squash; --legacy-rev
+fija otra revisión. Necesita git y el historial del repositorio.
+
+Sin --confirmar las conversaciones no confirman el aviso (la escritura en la
+base dominaría el tiempo y no depende del despacho).
+
+Uso: python benchmarks/bench_dialogue_fsm.py [--conversaciones 2000] [--repeticiones 3] [--confirmar] [--legacy-rev REV]
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# La base del DAO se fija al importar: antes de cualquier import de src
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_dialogue.db'}"
+os.environ["SESSION_BACKEND"] = "memory"
+
+from src.dialogue.manager import DialogueManager, SESSION_DEFAULTS, dialogue_tree_stats  # noqa: E402
+from src.persistence.dao import session_scope  # noqa: E402
+from src.persistence.models import Employee  # noqa: E402
+from src.persistence.seed import ensure_schema  # noqa: E402
+from src.session_store import MemoryBackend, SessionStore  # noqa: E402
+
+NOMBRES = ["Rigoberta Quintanilla", "Juan Carlos Pérez", "María Laura Gómez", "Ezequiel Ferreyra", "Ana Sofía Ruiz"]
+MOTIVOS = ["enfermedad", "enfermedad inculpable", "enfermedad familiar", "fallecimiento", "matrimonio", "nacimiento", "paternidad", "art", "vacaciones"]
+
+
+def _git(*args: str) -> str:
+	try:
+		return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+	except FileNotFoundError:
+		sys.exit("git no está instalado: la versión if/elif se lee del historial del repositorio")
+	except subprocess.CalledProcessError as e:
+		sys.exit(f"git {' '.join(args)} falló: {e.stderr.strip() or e}")
+
+
+def resolver_rev_legacy() -> str:
+	"""Padre del commit que agregó docs/dialogue.json (último con la cadena if/elif)."""
+	altas = _git("log", "--diff-filter=A", "--format=%H", "--", "docs/dialogue.json").split()
+	if not altas:
+		sys.exit("No encontré en el historial el commit que agregó docs/dialogue.json; usá --legacy-rev REV")
+	return f"{altas[-1]}^"
+
+
+def cargar_manager_legacy(rev: str) -> type:
+	"""DialogueManager de `rev` (git show), importado como src.dialogue._manager_legacy."""
+	origen = f"{rev}:src/dialogue/manager.py"
+	fuente = _git("show", origen)
+	nombre = "src.dialogue._manager_legacy"
+	modulo = types.ModuleType(nombre)
+	modulo.__package__ = "src.dialogue"
+	modulo.__file__ = f"<{origen}>"
+	sys.modules[nombre] = modulo
+	exec(compile(fuente, modulo.__file__, "exec"), modulo.__dict__)
+	return modulo.DialogueManager
+
+
+def cargar_empleados(n: int) -> None:
+	with session_scope() as session:
+		session.add_all(
+			Employee(legajo=str(1000 + i), nombre=NOMBRES[i % len(NOMBRES)] if i < len(NOMBRES) else f"Empleado {i}", area="producción")
+			for i in range(n)
+		)
+
+
+def conversacion(rnd: random.Random, empleados: int, confirmar: bool) -> list[str]:
+	msgs = ["hola"]
+	if rnd.random() < 0.2:
+		msgs.append(rnd.choice(["abc", "mi legajo", "12"]))
+	if rnd.random() < 0.75:
+		msgs.append(str(1000 + rnd.randrange(empleados)))
+	else:
+		msgs.append(str(8000 + rnd.randrange(999)))
+		if rnd.random() < 0.3:
+			msgs.append("ana")
+		nombre = rnd.choice(NOMBRES)
+		msgs.append(nombre.lower()[:-1] if rnd.random() < 0.5 else nombre)
+		msgs.append(rnd.choice(["continuar provisional", "ninguno", "1000 - rigoberta quintanilla", "xx"]))
+		msgs.append("continuar provisional")
+	for _ in range(2 if rnd.random() < 0.2 else 1):
+		msgs.append(rnd.choice(MOTIVOS))
+		if msgs[-1] == "vacaciones":
+			msgs.append("enfermedad")
+		msgs.append(rnd.choice(["hoy", "mañana", "otra fecha", "15/12/2026", "cuando pueda"]))
+		if msgs[-1] == "otra fecha":
+			msgs.extend(rnd.choice([["20/12/2026"], ["ayer no", "21/12/2026"]]))
+		elif msgs[-1] == "cuando pueda":
+			msgs.append("hoy")
+		msgs.append(rnd.choice(["1", "2", "3", "5", "10", "otro", "cero"]))
+		if msgs[-1] == "otro":
+			msgs.append(str(rnd.randint(4, 30)))
+		elif msgs[-1] == "cero":
+			msgs.append("2")
+		msgs.append(rnd.choice(["adjuntar ahora", "enviar más tarde", "no sé", "enviar más tarde"]))
+		msgs.append(rnd.choice(["editar", "tal vez", "editar"]))
+	msgs.append("si" if confirmar else "editar")
+	return msgs
+
+
+def _markup(res: dict):
+	mk = res.get("reply_markup")
+	return mk.model_dump() if hasattr(mk, "model_dump") else mk
+
+
+def reproducir(mgr, conversaciones: list[list[str]], prefijo: str) -> tuple[float, list[tuple]]:
+	salidas = []
+	t0 = time.perf_counter()
+	for i, msgs in enumerate(conversaciones):
+		chat = f"{prefijo}{i}"
+		for m in msgs:
+			salidas.append(mgr.process_message(chat, m))
+	total = time.perf_counter() - t0
+	return total, [(r.get("reply_text"), _markup(r)) for r in salidas]
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--conversaciones", type=int, default=2000)
+	parser.add_argument("--repeticiones", type=int, default=3)
+	parser.add_argument("--empleados", type=int, default=500)
+	parser.add_argument("--confirmar", action="store_true", help="terminar confirmando (crea avisos)")
+	parser.add_argument("--legacy-rev", help="revisión con la versión if/elif (default: la anterior a docs/dialogue.json)")
+	args = parser.parse_args()
+	LegacyDialogueManager = cargar_manager_legacy(args.legacy_rev or resolver_rev_legacy())
+
+	ensure_schema()
+	cargar_empleados(args.empleados)
+	rnd = random.Random(7)
+	conversaciones = [conversacion(rnd, args.empleados, args.confirmar) for _ in range(args.conversaciones)]
+	total_msgs = sum(len(c) for c in conversaciones)
+	print(f"{args.conversaciones} conversaciones, {total_msgs} mensajes")
+
+	tiempos: dict[str, float] = {}
+	respuestas: dict[str, list[tuple]] = {}
+	for rep in range(args.repeticiones):
+		for nombre, cls in (("if/elif", LegacyDialogueManager), ("fsm", DialogueManager)):
+			mgr = cls(SessionStore(MemoryBackend(), nombre, maxsize=args.conversaciones * 2, defaults=SESSION_DEFAULTS))
+			total, salidas = reproducir(mgr, conversaciones, f"r{rep}_")
+			tiempos[nombre] = min(tiempos.get(nombre, total), total)
+			respuestas[nombre] = salidas
+	for nombre, total in tiempos.items():
+		print(f"  {nombre:<8} {total / total_msgs * 1e6:7.1f} µs/mensaje  ({total:.2f} s)")
+	iguales = sum(a == b for a, b in zip(respuestas["if/elif"], respuestas["fsm"]))
+	print(f"  respuestas idénticas: {iguales}/{total_msgs}")
+	print(f"  árbol: {dialogue_tree_stats()}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark de índices de avisos: EXPLAIN QUERY PLAN y tiempos con/sin índices.
+
+Carga N avisos sintéticos (default 1M) en una base SQLite temporal, mide las
+consultas de find_solape, historial_empleado, /api/ausencias y /api/stats sin
+índices, crea los índices de los modelos (create_missing_indexes + ANALYZE) y
+verifica que cada plan use el índice esperado.
+
+Uso: python benchmarks/bench_indexes.py [--rows 1000000] [--db ruta.db]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, func, select  # noqa: E402
+
+from src.persistence.dao import _historial_query, _solape_query  # noqa: E402
+from src.persistence.models import Aviso, Base  # noqa: E402
+from src.persistence.queries import keyset_page  # noqa: E402
+from src.persistence.seed import create_missing_indexes  # noqa: E402
+
+MOTIVOS = [
+	"enfermedad_inculpable", "enfermedad_familiar", "fallecimiento", "matrimonio",
+	"nacimiento", "paternidad", "permiso_gremial", "art",
+]
+ESTADOS = ["completo", "incompleto", "pendiente_validacion", "rechazado"]
+CERTS = [None, "pendiente", "en_revision", "validado"]
+LEGAJOS = 20000
+
+
+def cargar(engine, n: int, seed: int = 7) -> None:
+	rnd = random.Random(seed)
+	base = date(2020, 1, 1)
+	ts = datetime(2020, 1, 1)
+	sql = (
+		"INSERT INTO avisos (id_aviso, legajo, motivo, fecha_inicio, fecha_fin_estimada, duracion_estimdays,"
+		" estado_aviso, estado_certificado, fuera_de_termino, adjunto, created_at, recordatorio_22h_enviado)"
+		" VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, 0, ?, 0)"
+	)
+	with engine.begin() as conn:
+		lote = []
+		for i in range(n):
+			inicio = base + timedelta(days=rnd.randint(0, 2000))
+			dias = rnd.randint(1, 10)
+			lote.append((
+				f"A-{i:08d}", str(1000 + rnd.randrange(LEGAJOS)), rnd.choice(MOTIVOS),
+				inicio.isoformat(), (inicio + timedelta(days=dias)).isoformat(), dias,
+				rnd.choice(ESTADOS), rnd.choice(CERTS),
+				(ts + timedelta(minutes=i)).isoformat(sep=" "),
+			))
+			if len(lote) == 50000:
+				conn.exec_driver_sql(sql, lote)
+				lote = []
+		if lote:
+			conn.exec_driver_sql(sql, lote)
+
+
+def consultas() -> list[tuple[str, object, str]]:
+	"""(nombre, statement, índice esperado en el plan)."""
+	desde = date(2024, 6, 1)
+	return [
+		("find_solape", _solape_query("1234", date(2023, 3, 1), date(2023, 3, 5)), "ix_avisos_legajo_fechas"),
+		("historial_empleado", _historial_query("1234", 10), "ix_avisos_legajo_created_at"),
+		("ausencias estado", keyset_page(select(Aviso).where(Aviso.estado_aviso == "rechazado"), None, 100), "ix_avisos_estado_aviso"),
+		("ausencias keyset", keyset_page(select(Aviso), (datetime(2021, 6, 1), "A-00500000"), 100), "ix_avisos_created_at_id"),
+		("ausencias motivo", select(Aviso).where(Aviso.motivo == "art").where(Aviso.fecha_inicio >= desde).limit(100), "ix_avisos_"),
+		("ausencias fecha", select(func.count()).select_from(Aviso).where(Aviso.fecha_inicio >= desde), "ix_avisos_fecha_inicio"),
+		("stats activas", select(func.count()).select_from(Aviso).where(Aviso.estado_aviso != "completo"), "ix_avisos_estado_aviso"),
+		("stats certificados", select(func.count()).select_from(Aviso).where(Aviso.estado_certificado.in_(["pendiente", "en_revision"])), "ix_avisos_estado_certificado"),
+	]
+
+
+def _sql(engine, stmt) -> str:
+	return str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+
+
+def medir(engine, etiqueta: str, verificar: bool) -> bool:
+	ok = True
+	print(etiqueta)
+	with engine.connect() as conn:
+		for nombre, stmt, indice in consultas():
+			sql = _sql(engine, stmt)
+			plan = " | ".join(r[3] for r in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql))
+			t0 = time.perf_counter()
+			for _ in range(5):
+				conn.exec_driver_sql(sql).fetchall()
+			ms = (time.perf_counter() - t0) / 5 * 1000
+			usa = indice in plan
+			marca = ("OK " if usa else "NO ") if verificar else "   "
+			ok = ok and (usa or not verificar)
+			print(f"  {marca}{nombre:<20} {ms:9.2f} ms   {plan}")
+	return ok
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--rows", type=int, default=1_000_000)
+	parser.add_argument("--db", default=None)
+	args = parser.parse_args()
+	db = Path(args.db) if args.db else Path(tempfile.mkdtemp()) / "bench_indexes.db"
+	engine = create_engine(f"sqlite:///{db}")
+	Base.metadata.create_all(engine)
+	with engine.begin() as conn:
+		for table in Base.metadata.sorted_tables:
+			for index in table.indexes:
+				index.drop(bind=conn, checkfirst=True)
+	t0 = time.perf_counter()
+	cargar(engine, args.rows)
+	print(f"{args.rows} avisos cargados en {time.perf_counter() - t0:.1f} s ({db})")
+	medir(engine, "Sin índices:", verificar=False)
+	t0 = time.perf_counter()
+	with engine.begin() as conn:
+		creados = create_missing_indexes(conn)
+		conn.exec_driver_sql("ANALYZE")
+	print(f"Índices creados en {time.perf_counter() - t0:.1f} s: {', '.join(creados)}")
+	ok = medir(engine, "Con índices:", verificar=True)
+	sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+	main()
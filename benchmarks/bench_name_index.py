@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark de NameIndex: top-k por nombre con errores de tipeo sobre N empleados (Faker es_AR).
+
+Compara contra process.extract de rapidfuzz sobre todos los nombres (sin índice)
+y reporta latencia media, p95 y recall (el empleado correcto aparece en el top-k).
+
+Uso: python benchmarks/bench_name_index.py [--empleados 50000] [--consultas 500] [--k 3]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from faker import Faker  # noqa: E402
+from rapidfuzz import fuzz, process  # noqa: E402
+
+from src.utils.name_index import NameIndex, normalize_name  # noqa: E402
+
+
+def con_error(nombre: str, rnd: random.Random) -> str:
+	"""Una letra cambiada (sin tocar espacios), como un error de tipeo."""
+	posiciones = [i for i, c in enumerate(nombre) if c.isalpha()]
+	i = rnd.choice(posiciones)
+	return nombre[:i] + rnd.choice("abcdefghilmnoprstu") + nombre[i + 1:]
+
+
+def medir(nombre: str, buscar, consultas: list[tuple[int, str]], nombres: list[str]) -> None:
+	tiempos = []
+	aciertos = 0
+	for pos, consulta in consultas:
+		t0 = time.perf_counter()
+		encontrados = buscar(consulta)
+		tiempos.append(time.perf_counter() - t0)
+		aciertos += any(nombres[p] == nombres[pos] for p in encontrados)
+	tiempos.sort()
+	print(
+		f"  {nombre:<22} media {sum(tiempos) / len(tiempos) * 1000:7.3f} ms"
+		f"   p95 {tiempos[int(len(tiempos) * 0.95) - 1] * 1000:7.3f} ms   recall {aciertos / len(consultas):.3f}"
+	)
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--empleados", type=int, default=50000)
+	parser.add_argument("--consultas", type=int, default=500)
+	parser.add_argument("--k", type=int, default=3)
+	args = parser.parse_args()
+
+	Faker.seed(1)
+	fake = Faker("es_AR")
+	nombres = [fake.name() for _ in range(args.empleados)]
+	t0 = time.perf_counter()
+	ix = NameIndex((n, i) for i, n in enumerate(nombres))
+	print(f"{ix!r} construido en {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+	rnd = random.Random(3)
+	consultas = [(i, con_error(nombres[i], rnd)) for i in rnd.sample(range(len(nombres)), args.consultas)]
+	normalizados = [normalize_name(n) for n in nombres]
+	medir("NameIndex.search", lambda q: [p for p, _, _ in ix.search(q, args.k)], consultas, nombres)
+	medir(
+		"extract (sin índice)",
+		lambda q: [p for _, _, p in process.extract(normalize_name(q), normalizados, scorer=fuzz.token_sort_ratio, limit=args.k)],
+		consultas[:50],
+		nombres,
+	)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark de ensure_schema: costo de arranque y de validar un legajo por mensaje.
+
+- arranque en frío: create_all + PRAGMA table_info/ALTER + índices sobre una base nueva
+- verificación completa sobre una base existente (lo que antes costaba cada mensaje)
+- llamada memoizada (lo que cuesta ahora después del arranque)
+- validación de legajo antes (ensure_schema completo + consulta) vs. ahora (solo consulta)
+
+Uso: python benchmarks/bench_schema.py [--repeticiones 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# La base del DAO se fija al importar: antes de cualquier import de src
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_schema.db'}"
+
+from src.persistence.dao import get_employee  # noqa: E402
+from src.persistence.seed import ensure_schema, seed_employees_examples  # noqa: E402
+
+
+def medir(nombre: str, fn, repeticiones: int) -> float:
+	t0 = time.perf_counter()
+	for _ in range(repeticiones):
+		fn()
+	ms = (time.perf_counter() - t0) / repeticiones * 1000
+	print(f"  {nombre:<38} {ms:9.3f} ms")
+	return ms
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--repeticiones", type=int, default=200)
+	args = parser.parse_args()
+	n = args.repeticiones
+
+	print("Arranque")
+	medir("ensure_schema en frío (base nueva)", ensure_schema, 1)
+	seed_employees_examples()
+	completo = medir("ensure_schema(force=True)", lambda: ensure_schema(force=True), n)
+	memo = medir("ensure_schema memoizado", ensure_schema, n)
+
+	print("Validación de legajo por mensaje")
+	antes = medir("antes: ensure_schema + consulta", lambda: (ensure_schema(force=True), get_employee("1111")), n)
+	ahora = medir("ahora: consulta", lambda: get_employee("1111"), n)
+	print(f"\nverificación memoizada {completo / max(memo, 1e-9):,.0f}x más barata; validación {antes / ahora:.1f}x más rápida")
+
+
+if __name__ == "__main__":
+	main()
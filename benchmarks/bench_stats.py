@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /api/stats: seis COUNT separados vs. un agregado SUM(CASE) vs. tabla materializada.
+
+Uso: python benchmarks/bench_stats.py [--sizes 100000,1000000]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, func, or_, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from bench_indexes import cargar  # noqa: E402
+from src.config import settings  # noqa: E402
+from src.persistence.models import Aviso, Base, Employee  # noqa: E402
+from src.persistence.queries import compute_stats, fetch_stats, rebuild_stats  # noqa: E402
+
+
+def seis_counts(session: Session) -> dict[str, int]:
+	sin_validar = or_(Employee.legajo.is_(None), Employee.nombre.is_(None), Employee.area.is_(None))
+	cert = Aviso.estado_certificado.in_(["pendiente", "en_revision"])
+	base = select(func.count()).select_from(Aviso)
+	join = base.join(Employee, Aviso.legajo == Employee.legajo, isouter=True)
+	return {
+		"total_ausencias": session.execute(base).scalar(),
+		"ausencias_activas": session.execute(base.where(Aviso.estado_aviso != "completo")).scalar(),
+		"requieren_validacion": session.execute(join.where(sin_validar)).scalar(),
+		"certificados_pendientes": session.execute(base.where(cert)).scalar(),
+		"completadas": session.execute(base.where(Aviso.estado_aviso == "completo")).scalar(),
+		"alta_prioridad": session.execute(join.where(sin_validar, cert)).scalar(),
+	}
+
+
+def medir(nombre: str, engine, fn, repeticiones: int = 5) -> dict[str, int]:
+	t0 = time.perf_counter()
+	for _ in range(repeticiones):
+		with Session(engine) as s:
+			res = fn(s)
+	print(f"  {nombre:<22} {(time.perf_counter() - t0) / repeticiones * 1000:9.2f} ms")
+	return res
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--sizes", default="100000,1000000")
+	args = parser.parse_args()
+	settings.STATS_MATERIALIZED = True
+	for n in (int(x) for x in args.sizes.split(",")):
+		db = Path(tempfile.mkdtemp()) / "bench_stats.db"
+		engine = create_engine(f"sqlite:///{db}")
+		Base.metadata.create_all(engine)
+		cargar(engine, n)
+		with Session(engine) as s, s.begin():
+			rebuild_stats(s)
+		print(f"n = {n}")
+		a = medir("6 x COUNT", engine, seis_counts)
+		b = medir("SUM(CASE) único", engine, compute_stats)
+		c = medir("materializada", engine, fetch_stats)
+		assert a == b == c, (a, b, c)
+
+
+if __name__ == "__main__":
+	main()
@@ -9,7 +9,8 @@ import logging
 from aiohttp import web
 from aiohttp.web_request import Request
 from src.config import settings
-from src.dialogue.manager import DialogueManager
+from src.telegram.middleware import ChatSerializerMiddleware
+from src.telegram.sharding import build_dialogue
 
 try:
     from aiogram import Bot, Dispatcher, types
@@ -27,15 +28,21 @@ PORT = 8080
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-dm = DialogueManager()
+# LocalDialogue o ShardedDialogue según BOT_WORKERS (se crea en setup_webhook_bot)
+dialogue = None
+# Updates de un mismo chat en serie, hasta BOT_MAX_CONCURRENCY en paralelo
+serializer = ChatSerializerMiddleware()
 
 async def setup_webhook_bot():
     if not settings.TELEGRAM_TOKEN:
         print("❌ Falta TELEGRAM_TOKEN en .env")
         return None, None
     
+    global dialogue
     bot = Bot(token=settings.TELEGRAM_TOKEN)
     dp = Dispatcher()
+    dialogue = build_dialogue()
+    dp.update.outer_middleware(serializer)
     
     @dp.message()
     async def handle_message(msg: types.Message):
@@ -61,7 +68,7 @@ async def setup_webhook_bot():
             
             # Procesamiento normal
             session_id = str(user_id)
-            result = dm.process_message(session_id, msg.text)
+            result = await dialogue.process_message(session_id, msg.text)
             
             reply = result.get("reply_text", "✅ Procesado")
             if result.get("ask"):
@@ -135,7 +142,12 @@ async def main():
         async def health(request: Request):
             return web.Response(text="🤖 Bot webhook activo!")
         
+        # Profundidad de colas y tiempos de espera por chat
+        async def stats(request: Request):
+            return web.json_response(serializer.stats())
+
         app.router.add_get("/", health)
+        app.router.add_get("/stats", stats)
         
         print(f"🚀 Servidor iniciando en http://{HOST}:{PORT}")
         print("📱 Bot listo para recibir mensajes via webhook")
@@ -158,6 +170,8 @@ async def main():
     finally:
         await bot.set_webhook("")  # Limpiar webhook
         await bot.session.close()
+        if dialogue is not None:
+            await dialogue.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -57,18 +57,26 @@ async def health_check(request: Request) -> Response:
     """Endpoint de salud del servidor"""
     try:
         # Verificar conexión a BD
-        from src.persistence.dao import session_scope
+        from src.persistence import async_dao
+        from src.persistence.dao import _engine, session_scope
+        from src.persistence.directory import employee_directory
+        from src.persistence.engine import pool_status
         from src.persistence.models import Employee
         
-        with session_scope() as session:
+        def contar_empleados() -> int:
             # Test query simple
             from sqlalchemy import select, func
-            count = session.execute(select(func.count()).select_from(Employee)).scalar()
+            with session_scope() as session:
+                return session.execute(select(func.count()).select_from(Employee)).scalar()
+        
+        count = await async_dao.run_db(contar_empleados)
             
         return web.json_response({
             "status": "ok",
             "database": "connected",
             "employees_count": count,
+            "pool": pool_status(_engine),
+            "employee_directory": employee_directory.stats(),
             "message": "Dashboard server running"
         })
         
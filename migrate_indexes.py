@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Script de migración para crear los índices de avisos (solape, historial, filtros del dashboard)
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.persistence.dao import _engine
+from src.persistence.seed import create_missing_indexes
+
+def migrate():
+    """Crea los índices declarados en los modelos que falten en la base"""
+    print("Ejecutando migración de índices...")
+    
+    try:
+        with _engine.begin() as conn:
+            created = create_missing_indexes(conn)
+            for name in created:
+                print(f"Creado índice {name}")
+            # Estadísticas para que el planificador de SQLite elija bien
+            conn.exec_driver_sql("ANALYZE")
+        if not created:
+            print("Los índices ya existían")
+        print("✅ Migración completada exitosamente")
+            
+    except Exception as e:
+        print(f"❌ Error en la migración: {e}")
+        return False
+    
+    return True
+
+if __name__ == "__main__":
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -10,6 +10,50 @@ class Settings(BaseModel):
 	DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./ausencias.db")
 	LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 	DEMO_EXPORT: bool = os.getenv("DEMO_EXPORT", "false").lower() in ("1", "true", "yes")
+	# Caché de resultados del motor (0 desactiva)
+	ENGINE_CACHE_SIZE: int = int(os.getenv("ENGINE_CACHE_SIZE", "1024"))
+	ENGINE_CACHE_TTL: float = float(os.getenv("ENGINE_CACHE_TTL", "300"))
+	# /api/stats desde tabla materializada (estadisticas_avisos) en lugar del agregado en vivo
+	STATS_MATERIALIZED: bool = os.getenv("STATS_MATERIALIZED", "false").lower() in ("1", "true", "yes")
+	# Segundos que se reutiliza la versión de datos leída de la base (escrituras de otros procesos)
+	DATA_VERSION_TTL: float = float(os.getenv("DATA_VERSION_TTL", "2"))
+	# Respuestas de la API cacheadas por versión de datos + parámetros (0 desactiva)
+	API_CACHE_SIZE: int = int(os.getenv("API_CACHE_SIZE", "256"))
+	# Hilos para consultas desde handlers async (0 = ejecutar en el event loop)
+	DB_THREADS: int = int(os.getenv("DB_THREADS", "4"))
+	# Pool de conexiones (no aplica a SQLite en memoria); recycle -1 = nunca
+	DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+	DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+	DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+	DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+	DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+	# PRAGMAs por conexión SQLite (cache_size negativo = KiB)
+	SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+	SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+	SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+	SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+	SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+	# Sugerencias de empleados por nombre cuando el legajo no existe (score 0-100; 0 desactiva)
+	NAME_SUGGEST_MIN_SCORE: float = float(os.getenv("NAME_SUGGEST_MIN_SCORE", "80"))
+	NAME_SUGGEST_LIMIT: int = int(os.getenv("NAME_SUGGEST_LIMIT", "3"))
+	# Estado de conversación del bot: "sql" (tabla sesiones_bot, compartida entre procesos) o "memory"
+	SESSION_BACKEND: str = os.getenv("SESSION_BACKEND", "sql")
+	SESSION_CACHE_SIZE: int = int(os.getenv("SESSION_CACHE_SIZE", "1024"))
+	# Segundos que se confía en la copia en memoria antes de releer del backend
+	SESSION_CACHE_TTL: float = float(os.getenv("SESSION_CACHE_TTL", "300"))
+	# Conversaciones sin actividad por más de estos días se purgan del backend
+	SESSION_MAX_AGE_DAYS: int = int(os.getenv("SESSION_MAX_AGE_DAYS", "7"))
+	# Procesos worker del bot: los chats se reparten por hash de chat.id (0 = todo en el proceso)
+	BOT_WORKERS: int = int(os.getenv("BOT_WORKERS", "0"))
+	# Updates procesados a la vez por el bot (los de un mismo chat siempre en serie)
+	BOT_MAX_CONCURRENCY: int = int(os.getenv("BOT_MAX_CONCURRENCY", "32"))
+	# Adjuntos del bot: spool local (por sha256) y subidas a Drive en segundo plano con reintentos
+	UPLOAD_SPOOL_DIR: str = os.getenv("UPLOAD_SPOOL_DIR", "uploads/spool")
+	UPLOAD_WORKERS: int = int(os.getenv("UPLOAD_WORKERS", "2"))
+	UPLOAD_MAX_ATTEMPTS: int = int(os.getenv("UPLOAD_MAX_ATTEMPTS", "6"))
+	# Segundos antes del primer reintento (se duplica en cada uno, hasta UPLOAD_BACKOFF_MAX)
+	UPLOAD_BACKOFF_BASE: float = float(os.getenv("UPLOAD_BACKOFF_BASE", "2"))
+	UPLOAD_BACKOFF_MAX: float = float(os.getenv("UPLOAD_BACKOFF_MAX", "600"))
 
 
 settings = Settings()
@@ -0,0 +1,331 @@
+"""Máquina de estados del diálogo: árbol declarado en docs/dialogue.json, compilado una vez.
+
+Cada estado (= sess["step"]) declara un normalizador y una lista ordenada de
+transiciones; gana la primera cuya condición se cumple:
+
+- "if": {"value": "empty"|"valid"} sobre el valor normalizado, {"equals": [...]}
+  / {"contains": [...]} sobre el texto (minúsculas, sin espacios en los
+  extremos), {"field": x} sesión con x verdadero. Las claves se combinan con
+  AND; sin "if" la transición siempre aplica.
+- Efectos, en este orden: "set" (valores fijos), "store" (guarda el valor
+  normalizado en un campo), "goto" (paso siguiente), "action" (función Python
+  registrada; si retorna una respuesta, esa es la respuesta), "resend" (vuelve
+  a despachar otro texto) y "reply"/"keyboard".
+
+Los textos de "reply" son plantillas str.format con campos de la sesión y
+valores de contexto registrados ({saludo}, {pedir_motivo}, ...).
+
+compile_tree resuelve todo al cargar (estado -> objeto, condiciones a
+predicados, plantillas y teclados sin variables precalculados) y valida que no
+haya nombres desconocidos; DialogueTreeLoader recarga el archivo cuando cambia
+(mtime/tamaño) y, si la versión nueva es inválida, conserva la anterior.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import logging
+import string
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# (texto, sesión) -> valor normalizado (None/"" = vacío)
+Normalizer = Callable[[str, dict], Any]
+# (manager, turno) -> respuesta o None para seguir con los efectos declarados
+Action = Callable[[Any, "Turn"], Optional[dict]]
+ContextValue = Callable[[dict], str]
+Keyboard = Callable[[dict], Any]
+
+
+@dataclass(frozen=True)
+class Registry:
+	"""Nombres que puede usar el árbol, provistos por quien lo ejecuta (DialogueManager)."""
+	normalizers: Mapping[str, Normalizer]
+	context: Mapping[str, ContextValue]
+	keyboards: Mapping[str, Keyboard]
+	actions: Mapping[str, Action]
+	# Campos de sesión (para "store", "set", "field" y plantillas)
+	fields: frozenset[str]
+	# Teclados que no dependen de la sesión: se construyen una vez por compilación
+	static_keyboards: frozenset[str] = frozenset()
+
+
+class Turn:
+	"""Un mensaje en curso: lo que reciben las acciones."""
+	__slots__ = ("session_id", "sess", "text", "value")
+
+	def __init__(self, session_id: str, sess: dict, text: str, value: Any) -> None:
+		self.session_id = session_id
+		self.sess = sess
+		self.text = text
+		self.value = value
+
+
+class _Context:
+	"""Mapping para format_map: campo de sesión o valor de contexto calculado al pedirlo."""
+	__slots__ = ("sess", "context")
+
+	def __init__(self, sess: dict, context: Mapping[str, ContextValue]) -> None:
+		self.sess = sess
+		self.context = context
+
+	def __getitem__(self, key: str) -> Any:
+		if key in self.context:
+			return self.context[key](self.sess)
+		return self.sess[key]
+
+
+@dataclass(frozen=True)
+class CompiledTransition:
+	test: Callable[[str, Any, dict], bool]
+	set_values: tuple[tuple[str, Any], ...]
+	store: Optional[str]
+	goto: Optional[str]
+	action: Optional[Action]
+	resend: Optional[str]
+	# Texto fijo (sin variables) o plantilla; None = sin respuesta declarada
+	reply: Optional[str]
+	reply_is_template: bool
+	keyboard: Any
+	keyboard_factory: Optional[Keyboard]
+
+	def respond(self, sess: dict, context: Mapping[str, ContextValue]) -> dict[str, Any]:
+		text = self.reply.format_map(_Context(sess, context)) if self.reply_is_template else self.reply
+		out: dict[str, Any] = {"reply_text": text}
+		markup = self.keyboard_factory(sess) if self.keyboard_factory is not None else self.keyboard
+		if markup is not None:
+			out["reply_markup"] = markup
+		return out
+
+
+@dataclass(frozen=True)
+class CompiledState:
+	name: str
+	normalizer: Optional[Normalizer]
+	transitions: tuple[CompiledTransition, ...]
+
+
+@dataclass(frozen=True)
+class DialogueTree:
+	version: int
+	initial: str
+	fingerprint: str
+	states: dict[str, CompiledState]
+	fallback: CompiledState
+	context: Mapping[str, ContextValue] = field(repr=False)
+
+	def dispatch(self, manager: Any, session_id: str, sess: dict, incoming: str) -> dict[str, Any]:
+		"""Procesa un mensaje: una búsqueda por paso y la primera transición que aplica."""
+		state = self.states.get(sess["step"], self.fallback)
+		text = (incoming or "").strip().lower()
+		value = state.normalizer(text, sess) if state.normalizer is not None else text
+		for tr in state.transitions:
+			if not tr.test(text, value, sess):
+				continue
+			for key, val in tr.set_values:
+				sess[key] = copy.deepcopy(val)
+			if tr.store is not None:
+				sess[tr.store] = value
+			if tr.goto is not None:
+				sess["step"] = tr.goto
+			if tr.action is not None:
+				out = tr.action(manager, Turn(session_id, sess, text, value))
+				if out is not None:
+					return out
+			if tr.resend is not None:
+				return self.dispatch(manager, session_id, sess, tr.resend)
+			if tr.reply is not None:
+				return tr.respond(sess, self.context)
+			return {}
+		return {}
+
+
+def _compile_test(spec: dict[str, Any], where: str, registry: Registry) -> Callable[[str, Any, dict], bool]:
+	unknown = set(spec) - {"value", "equals", "contains", "field"}
+	if unknown:
+		raise ValueError(f"{where}: condición desconocida {sorted(unknown)}")
+	checks: list[Callable[[str, Any, dict], bool]] = []
+	if "value" in spec:
+		if spec["value"] not in {"empty", "valid"}:
+			raise ValueError(f"{where}: 'value' debe ser 'empty' o 'valid'")
+		want = spec["value"] == "valid"
+		checks.append(lambda text, value, sess: bool(value) is want)
+	if "equals" in spec:
+		options = frozenset(spec["equals"])
+		checks.append(lambda text, value, sess: text in options)
+	if "contains" in spec:
+		parts = tuple(spec["contains"])
+		checks.append(lambda text, value, sess: any(p in text for p in parts))
+	if "field" in spec:
+		name = spec["field"]
+		if name not in registry.fields:
+			raise ValueError(f"{where}: campo desconocido {name}")
+		checks.append(lambda text, value, sess: bool(sess.get(name)))
+	if not checks:
+		return lambda text, value, sess: True
+	if len(checks) == 1:
+		return checks[0]
+	return lambda text, value, sess: all(c(text, value, sess) for c in checks)
+
+
+def _check_template(template: str, where: str, registry: Registry) -> bool:
+	"""Valida los campos de la plantilla; retorna si tiene alguno."""
+	names = [name for _, name, _, _ in string.Formatter().parse(template) if name is not None]
+	for name in names:
+		if name not in registry.context and name not in registry.fields:
+			raise ValueError(f"{where}: variable desconocida {{{name}}} en reply")
+	return bool(names)
+
+
+def _compile_transition(spec: dict[str, Any], where: str, states: Mapping[str, Any], registry: Registry, keyboards: dict[str, Any]) -> CompiledTransition:
+	allowed = {"if", "set", "store", "goto", "action", "resend", "reply", "keyboard"}
+	unknown = set(spec) - allowed
+	if unknown:
+		raise ValueError(f"{where}: claves desconocidas {sorted(unknown)}")
+	for key in spec.get("set", {}):
+		if key not in registry.fields:
+			raise ValueError(f"{where}: campo desconocido en set {key}")
+	store = spec.get("store")
+	if store is not None and store not in registry.fields:
+		raise ValueError(f"{where}: campo desconocido en store {store}")
+	goto = spec.get("goto")
+	if goto is not None and goto not in states:
+		raise ValueError(f"{where}: goto a estado inexistente {goto}")
+	action = None
+	if "action" in spec:
+		action = registry.actions.get(spec["action"])
+		if action is None:
+			raise ValueError(f"{where}: acción desconocida {spec['action']}")
+	reply = spec.get("reply")
+	reply_is_template = reply is not None and _check_template(reply, where, registry)
+	keyboard = factory = None
+	if "keyboard" in spec:
+		name = spec["keyboard"]
+		if name not in registry.keyboards:
+			raise ValueError(f"{where}: teclado desconocido {name}")
+		if name in registry.static_keyboards:
+			if name not in keyboards:
+				keyboards[name] = registry.keyboards[name]({})
+			keyboard = keyboards[name]
+		else:
+			factory = registry.keyboards[name]
+	if action is None and reply is None and "resend" not in spec:
+		raise ValueError(f"{where}: la transición no responde (falta reply, action o resend)")
+	return CompiledTransition(
+		test=_compile_test(spec.get("if", {}), where, registry),
+		set_values=tuple(spec.get("set", {}).items()),
+		store=store,
+		goto=goto,
+		action=action,
+		resend=spec.get("resend"),
+		reply=reply,
+		reply_is_template=reply_is_template,
+		keyboard=keyboard,
+		keyboard_factory=factory,
+	)
+
+
+def compile_tree(doc: dict[str, Any], registry: Registry, fingerprint: str = "") -> DialogueTree:
+	"""Valida y compila el árbol; ValueError si referencia algo que no existe."""
+	states_doc = doc.get("states")
+	if not isinstance(states_doc, dict) or not states_doc:
+		raise ValueError("dialogue.json inválido: falta 'states'")
+	for key in ("initial", "fallback"):
+		if doc.get(key) not in states_doc:
+			raise ValueError(f"dialogue.json: '{key}' no es un estado")
+	keyboards: dict[str, Any] = {}
+	states: dict[str, CompiledState] = {}
+	for name, spec in states_doc.items():
+		normalizer = None
+		if "normalizer" in spec:
+			normalizer = registry.normalizers.get(spec["normalizer"])
+			if normalizer is None:
+				raise ValueError(f"Estado {name}: normalizador desconocido {spec['normalizer']}")
+		transitions = spec.get("transitions")
+		if not transitions:
+			raise ValueError(f"Estado {name}: sin transiciones")
+		states[name] = CompiledState(
+			name=name,
+			normalizer=normalizer,
+			transitions=tuple(
+				_compile_transition(tr, f"Estado {name}, transición {i}", states_doc, registry, keyboards)
+				for i, tr in enumerate(transitions)
+			),
+		)
+	return DialogueTree(
+		version=int(doc.get("version", 1)),
+		initial=doc["initial"],
+		fingerprint=fingerprint,
+		states=states,
+		fallback=states[doc["fallback"]],
+		context=registry.context,
+	)
+
+
+def load_tree(raw: bytes, registry: Registry) -> DialogueTree:
+	return compile_tree(json.loads(raw.decode("utf-8")), registry, hashlib.sha256(raw).hexdigest())
+
+
+class DialogueTreeLoader:
+	"""Árbol compilado con recarga en caliente: un stat del archivo por get().
+
+	Si el archivo cambió se relee; solo se recompila si cambió el contenido.
+	Una versión inválida se registra en el log y se sigue con la anterior
+	(la primera carga sí lanza la excepción).
+	"""
+
+	def __init__(self, path: Path, registry: Registry) -> None:
+		self.path = path
+		self.registry = registry
+		self._lock = Lock()
+		self._tree: Optional[DialogueTree] = None
+		self._stat_key: Optional[tuple[int, int]] = None
+		self._stats = {"hits": 0, "reloads": 0, "revalidations": 0, "errors": 0}
+
+	def get(self) -> DialogueTree:
+		try:
+			st = self.path.stat()
+			stat_key = (st.st_mtime_ns, st.st_size)
+		except OSError:
+			if self._tree is None:
+				raise
+			stat_key = self._stat_key
+		tree = self._tree
+		if tree is not None and stat_key == self._stat_key:
+			self._stats["hits"] += 1
+			return tree
+		with self._lock:
+			if self._tree is not None and stat_key == self._stat_key:
+				return self._tree
+			raw = self.path.read_bytes()
+			if self._tree is not None and hashlib.sha256(raw).hexdigest() == self._tree.fingerprint:
+				self._stats["revalidations"] += 1
+				self._stat_key = stat_key
+				return self._tree
+			try:
+				nuevo = load_tree(raw, self.registry)
+			except Exception as e:
+				if self._tree is None:
+					raise
+				self._stats["errors"] += 1
+				# No reintentar hasta el próximo cambio del archivo
+				self._stat_key = stat_key
+				logger.error(f"{self.path.name} inválido, se mantiene la versión anterior: {e}")
+				return self._tree
+			if self._tree is not None:
+				self._stats["reloads"] += 1
+				logger.info(f"{self.path.name} recargado (versión {nuevo.version})")
+			self._tree = nuevo
+			self._stat_key = stat_key
+			return nuevo
+
+	def stats(self) -> dict[str, Any]:
+		out: dict[str, Any] = dict(self._stats)
+		out["fingerprint"] = self._tree.fingerprint if self._tree is not None else None
+		return out
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+import copy
+from pathlib import Path
+from typing import Any, Dict, Optional
 from datetime import date, datetime, timedelta
 
 from ..utils.normalize import parse_legajo, normalize_motivo, parse_date, sanitize_number_of_days
@@ -8,13 +10,60 @@ from .prompts import (
     msg_saludo, msg_pedir_legajo, msg_pedir_motivo, msg_pedir_fecha, msg_pedir_dias, 
     msg_pedir_certificado, msg_resumen, msg_confirmar, msg_ok_creado
 )
-from ..telegram.keyboards import kb_motivos, kb_fecha, kb_dias, ik_adjuntar, kb_si_no, kb_legajo_provisional
-from ..session_store import get_legajo, set_legajo
+from ..telegram.keyboards import kb_motivos, kb_fecha, kb_dias, ik_adjuntar, kb_si_no, kb_legajo_provisional, kb_sugerencias_legajo
+from ..config import settings
+from ..session_store import MemoryBackend, SessionStore, get_legajo, get_store, set_legajo
+from .fsm import DialogueTreeLoader, Registry, Turn
+
+
+# Árbol de diálogo (pasos y transiciones), recargado en caliente si cambia
+DIALOGUE_TREE_PATH = Path(__file__).resolve().parents[2] / "docs" / "dialogue.json"
+
+MOTIVOS: tuple[str, ...] = (
+    "enfermedad_inculpable",
+    "enfermedad_familiar",
+    "fallecimiento",
+    "nacimiento",
+    "matrimonio",
+    "paternidad",
+    "permiso_gremial",
+    "art",
+)
+
+
+# Estado inicial de una conversación (los registros persistidos guardan solo lo distinto)
+SESSION_DEFAULTS: Dict[str, Any] = {
+    "step": "inicio",
+    "legajo": None,
+    "legajo_validado": False,
+    "legajo_provisional": False,
+    "motivo": None,
+    "fecha_inicio": None,
+    "duracion_dias": None,
+    "requiere_certificado": False,
+    "certificado_recibido": False,
+    "certificado_path": None,
+    "nombre_provisional": None,
+    "sugerencias": {},
+}
+
+
+def dialogue_store() -> SessionStore:
+    """Store de sesiones compartido del proceso (SESSION_BACKEND): lo usan el bot y los workers."""
+    return get_store("dialogo", SESSION_DEFAULTS)
 
 
 class DialogueManager:
-    def __init__(self) -> None:
-        self.sessions: Dict[str, dict[str, Any]] = {}
+    def __init__(self, store: Optional[SessionStore] = None) -> None:
+        # Estado por chat: LRU+TTL en memoria delante de un backend (session_store). Sin store,
+        # uno propio en memoria: instancias distintas no comparten ni persisten sesiones
+        self.sessions = store if store is not None else SessionStore(
+            MemoryBackend(),
+            "dialogo",
+            maxsize=settings.SESSION_CACHE_SIZE,
+            ttl=settings.SESSION_CACHE_TTL,
+            defaults=SESSION_DEFAULTS,
+        )
     
     def set_legajo_validado(self, session_id: str, legajo: str) -> None:
         """Marca el legajo como validado desde el comando /id"""
@@ -22,40 +71,50 @@ class DialogueManager:
         sess["legajo"] = str(legajo)
         sess["legajo_validado"] = True
         sess["step"] = "motivo"
+        self.sessions.save(session_id, sess)
     
+    def get_facts(self, session_id: str) -> dict[str, Any]:
+        """Copia de los datos del documento adjunto guardados en la sesión"""
+        return dict(self._ensure_session(session_id).get("facts") or {})
+
+    def update_facts(self, session_id: str, values: dict[str, Any]) -> None:
+        """Agrega datos del documento adjunto a la sesión (handler de archivos del bot)"""
+        sess = self._ensure_session(session_id)
+        sess["facts"] = {**(sess.get("facts") or {}), **values}
+        self.sessions.save(session_id, sess)
+
     def _ensure_session(self, session_id: str) -> dict[str, Any]:
-        if session_id not in self.sessions:
-            self.sessions[session_id] = {
-                "step": "inicio",
-                "legajo": None,
-                "legajo_validado": False,
-                "legajo_provisional": False,
-                "motivo": None,
-                "fecha_inicio": None,
-                "duracion_dias": None,
-                "requiere_certificado": False,
-                "certificado_recibido": False,
-                "certificado_path": None,
-                "nombre_provisional": None,
-            }
-        return self.sessions[session_id]
+        sess = self.sessions.get(session_id)
+        if sess is None:
+            sess = copy.deepcopy(SESSION_DEFAULTS)
+            self.sessions[session_id] = sess
+        return sess
     
     def _validate_legajo_in_db(self, legajo_digits: str) -> tuple[bool, str]:
         """Retorna (existe, nombre_empleado)"""
         try:
-            from ..persistence.seed import ensure_schema
-            from ..persistence.dao import session_scope
-            from ..persistence.models import Employee
-            ensure_schema()
-            with session_scope() as s:
-                emp = s.query(Employee).filter(Employee.legajo == legajo_digits).first()
-                if emp:
-                    nombre = getattr(emp, "nombre", None) or "Empleado"
-                    return True, nombre
-                return False, ""
+            # Directorio en memoria (sin consulta por mensaje); el esquema se verifica al arrancar
+            from ..persistence.directory import employee_directory
+            emp = employee_directory.lookup(legajo_digits)
+            if emp:
+                return True, emp.nombre or "Empleado"
+            return False, ""
         except Exception:
             return False, ""
     
+    def _suggest_employees(self, nombre: str) -> list[tuple[str, str]]:
+        """[(legajo, nombre)] de empleados con nombre parecido (índice en memoria)"""
+        if settings.NAME_SUGGEST_MIN_SCORE <= 0:
+            return []
+        try:
+            from ..persistence.directory import employee_directory
+            sugerencias = employee_directory.suggest(
+                nombre, k=settings.NAME_SUGGEST_LIMIT, score_cutoff=settings.NAME_SUGGEST_MIN_SCORE
+            )
+            return [(r.legajo, r.nombre) for r, _score in sugerencias]
+        except Exception:
+            return []
+    
     def _requires_certificate(self, motivo: str) -> bool:
         """Determina si el motivo requiere certificado médico"""
         motivos_con_certificado = {"enfermedad_inculpable", "enfermedad_familiar"}
@@ -63,260 +122,100 @@ class DialogueManager:
     
     def _get_motivos_list(self) -> list[str]:
         """Retorna lista de motivos disponibles"""
-        return [
-            "enfermedad_inculpable",
-            "enfermedad_familiar", 
-            "fallecimiento",
-            "nacimiento",
-            "matrimonio",
-            "paternidad",
-            "permiso_gremial",
-            "art"
-        ]
+        return list(MOTIVOS)
     
     def process_message(self, session_id: str, incoming: str) -> dict[str, Any]:
         sess = self._ensure_session(session_id)
-        text = (incoming or "").strip().lower()
-        step = sess["step"]
-        
-        # PASO 1: INICIO - Presentación
-        if step == "inicio":
-            if text.startswith("/start") or text.startswith("hola") or text == "":
-                sess["step"] = "legajo"
-                return {
-                    "reply_text": msg_saludo()
-                }
-            else:
-                # Si no es start, asumir que quiere empezar el proceso
-                sess["step"] = "legajo"
-                return {
-                    "reply_text": msg_saludo()
-                }
-        
-        # PASO 2: LEGAJO - Validación
-        elif step == "legajo":
-            legajo_digits = parse_legajo(text)
-            if not legajo_digits:
-                return {
-                    "reply_text": "Formato inválido. Por favor ingresá tu legajo (4 dígitos). Ejemplo: 1234"
-                }
-            
-            exists, nombre = self._validate_legajo_in_db(legajo_digits)
-            sess["legajo"] = legajo_digits
-            
-            if exists:
-                sess["legajo_validado"] = True
-                sess["legajo_provisional"] = False
-                sess["step"] = "motivo"
-                motivos = self._get_motivos_list()
-                return {
-                    "reply_text": f"Perfecto, {nombre} (legajo {legajo_digits}) verificado.\n\n" + msg_pedir_motivo(motivos),
-                    "reply_markup": kb_motivos(motivos)
-                }
-            else:
-                sess["step"] = "pedir_nombre_provisional"
-                return {
-                    "reply_text": f"No encontré el legajo {legajo_digits} en el sistema.\n\nPara continuar necesito tu nombre y apellido completo para que RRHH pueda identificarte:"
-                }
-        
-        # PASO 2.5: PEDIR NOMBRE PARA LEGAJO PROVISIONAL
-        elif step == "pedir_nombre_provisional":
-            nombre_completo = (text or "").strip()
-            if len(nombre_completo) < 5:  # Mínimo validación
-                return {
-                    "reply_text": "Por favor ingresá tu nombre y apellido completo (ej: Juan Pérez):"
-                }
-            
-            # Guardar el nombre y continuar con confirmación
-            sess["nombre_provisional"] = nombre_completo
-            sess["step"] = "confirmar_legajo_provisional"
-            return {
-                "reply_text": f"Nombre: {nombre_completo}\nLegajo: {sess['legajo']} (provisional)\n\n¿Querés continuar? Tu registro será validado por RRHH.",
-                "reply_markup": kb_legajo_provisional()
-            }
-        
-        # PASO 2.6: CONFIRMAR LEGAJO PROVISIONAL
-        elif step == "confirmar_legajo_provisional":
-            if "continuar" in text or "provisional" in text:
-                sess["legajo_provisional"] = True
-                sess["step"] = "motivo"
-                motivos = self._get_motivos_list()
-                return {
-                    "reply_text": f"OK, continuamos con legajo {sess['legajo']} de forma provisional.\n\n" + msg_pedir_motivo(motivos),
-                    "reply_markup": kb_motivos(motivos)
-                }
-            elif "reingresar" in text or "nuevo" in text:
-                sess["step"] = "legajo"
-                return {
-                    "reply_text": msg_pedir_legajo()
-                }
-            else:
-                return {
-                    "reply_text": "Por favor responde: 'continuar provisional' o 'reingresar legajo'"
-                }
-        
-        # PASO 3: MOTIVO
-        elif step == "motivo":
-            motivo = normalize_motivo(text)
-            motivos_validos = self._get_motivos_list()
-            
-            if motivo not in motivos_validos:
-                return {
-                    "reply_text": f"Motivo no reconocido. Por favor elegí uno de: {', '.join(motivos_validos)}",
-                    "reply_markup": kb_motivos(motivos_validos)
-                }
-            
-            sess["motivo"] = motivo
-            sess["requiere_certificado"] = self._requires_certificate(motivo)
-            sess["step"] = "fecha"
-            
-            return {
-                "reply_text": f"Motivo registrado: {motivo}\n\n" + msg_pedir_fecha(),
-                "reply_markup": kb_fecha()
-            }
+        try:
+            return self._process_message(session_id, sess, incoming)
+        finally:
+            # Los pasos modifican la sesión en lugar: persistir el dict vivo al terminar
+            # cada mensaje (aunque el LRU lo haya desalojado mientras tanto)
+            self.sessions.save(session_id, sess)
+    
+    def _process_message(self, session_id: str, sess: dict[str, Any], incoming: str) -> dict[str, Any]:
+        # Pasos y transiciones en docs/dialogue.json (fsm.py); acá solo las acciones
+        return _tree_loader.get().dispatch(self, session_id, sess, incoming)
+    
+    # --- Acciones del árbol de diálogo (registradas en ACTIONS) ---
+    
+    def _accion_validar_legajo(self, turno: Turn) -> dict[str, Any]:
+        """PASO 2: legajo con formato válido, buscarlo en el directorio"""
+        sess, legajo_digits = turno.sess, turno.value
+        exists, nombre = self._validate_legajo_in_db(legajo_digits)
+        sess["legajo"] = legajo_digits
         
-        # PASO 4: FECHA
-        elif step == "fecha":
-            if text == "hoy":
-                fecha = date.today()
-            elif text == "mañana":
-                fecha = date.today() + timedelta(days=1)
-            elif text == "otra fecha":
-                sess["step"] = "fecha_especifica"
-                return {
-                    "reply_text": "Ingresá la fecha en formato DD/MM/AAAA (ejemplo: 15/12/2024):"
-                }
-            else:
-                # Intentar parsear fecha directamente
-                fecha_str = parse_date(text)
-                if not fecha_str:
-                    return {
-                        "reply_text": "Fecha no reconocida. Elegí: Hoy, Mañana, o Otra fecha",
-                        "reply_markup": kb_fecha()
-                    }
-                fecha = datetime.fromisoformat(fecha_str).date()
-            
-            sess["fecha_inicio"] = fecha.isoformat()
-            sess["step"] = "dias"
+        if exists:
+            sess["legajo_validado"] = True
+            sess["legajo_provisional"] = False
+            sess["step"] = "motivo"
+            motivos = self._get_motivos_list()
             return {
-                "reply_text": f"Fecha registrada: {fecha.strftime('%d/%m/%Y')}\n\n" + msg_pedir_dias(),
-                "reply_markup": kb_dias()
+                "reply_text": f"Perfecto, {nombre} (legajo {legajo_digits}) verificado.\n\n" + msg_pedir_motivo(motivos),
+                "reply_markup": kb_motivos(motivos)
             }
-        
-        # PASO 4.5: FECHA ESPECÍFICA
-        elif step == "fecha_especifica":
-            fecha_str = parse_date(text)
-            if not fecha_str:
-                return {
-                    "reply_text": "Formato incorrecto. Ingresá la fecha como DD/MM/AAAA (ejemplo: 15/12/2024):"
-                }
-            
-            fecha = datetime.fromisoformat(fecha_str).date()
-            sess["fecha_inicio"] = fecha.isoformat()
-            sess["step"] = "dias"
+        else:
+            sess["step"] = "pedir_nombre_provisional"
             return {
-                "reply_text": f"Fecha registrada: {fecha.strftime('%d/%m/%Y')}\n\n" + msg_pedir_dias(),
-                "reply_markup": kb_dias()
+                "reply_text": f"No encontré el legajo {legajo_digits} en el sistema.\n\nPara continuar necesito tu nombre y apellido completo para que RRHH pueda identificarte:"
             }
-        
-        # PASO 5: DÍAS
-        elif step == "dias":
-            if text == "otro":
-                sess["step"] = "dias_especifico"
-                return {
-                    "reply_text": "¿Cuántos días de ausencia? Ingresá un número:"
-                }
-            
-            dias = sanitize_number_of_days(text)
-            if not dias or dias <= 0:
-                return {
-                    "reply_text": "Número de días inválido. Elegí: 1, 2, 3, 5, 10, o Otro",
-                    "reply_markup": kb_dias()
-                }
-            
-            sess["duracion_dias"] = dias
-            
-            # Decidir siguiente paso
-            if sess["requiere_certificado"]:
-                sess["step"] = "certificado"
-                return {
-                    "reply_text": f"Duración: {dias} día(s)\n\n" + msg_pedir_certificado(sess["motivo"]),
-                    "reply_markup": ik_adjuntar()
-                }
-            else:
-                sess["step"] = "confirmacion"
-                return self._generate_summary(sess)
-        
-        # PASO 5.5: DÍAS ESPECÍFICO
-        elif step == "dias_especifico":
-            dias = sanitize_number_of_days(text)
-            if not dias or dias <= 0:
-                return {
-                    "reply_text": "Número inválido. Ingresá la cantidad de días (ejemplo: 7):"
-                }
-            
-            sess["duracion_dias"] = dias
-            
-            # Decidir siguiente paso
-            if sess["requiere_certificado"]:
-                sess["step"] = "certificado"
-                return {
-                    "reply_text": f"Duración: {dias} día(s)\n\n" + msg_pedir_certificado(sess["motivo"]),
-                    "reply_markup": ik_adjuntar()
-                }
-            else:
-                sess["step"] = "confirmacion"
-                return self._generate_summary(sess)
-        
-        # PASO 6: CERTIFICADO
-        elif step == "certificado":
-            if "adjuntar ahora" in text or "adjuntar" in text:
-                sess["step"] = "esperando_certificado"
-                return {
-                    "reply_text": "Por favor adjuntá el certificado enviando la imagen o PDF:"
-                }
-            elif "enviar mas tarde" in text or "enviar más tarde" in text or "despues" in text:
-                sess["certificado_recibido"] = False
-                sess["step"] = "confirmacion"
-                return self._generate_summary(sess, certificado_pendiente=True)
-            else:
-                return {
-                    "reply_text": "Por favor elegí una opción:",
-                    "reply_markup": ik_adjuntar()
-                }
-        
-        # PASO 6.5: ESPERANDO CERTIFICADO
-        elif step == "esperando_certificado":
+    
+    def _accion_sugerir_empleados(self, turno: Turn) -> dict[str, Any]:
+        """PASO 2.5: antes de crear un provisional, sugerir empleados con nombre parecido"""
+        sess, nombre_completo = turno.sess, turno.value
+        sugerencias = self._suggest_employees(nombre_completo)
+        if sugerencias:
+            sess["sugerencias"] = dict(sugerencias)
+            sess["step"] = "elegir_sugerencia"
+            opciones = [f"{legajo} - {nombre}" for legajo, nombre in sugerencias]
             return {
-                "reply_text": "Estoy esperando que adjuntes el certificado. Por favor envía la imagen o PDF del certificado médico."
+                "reply_text": "Encontré empleados con un nombre parecido. ¿Sos alguno de ellos?\n\n" + "\n".join(opciones),
+                "reply_markup": kb_sugerencias_legajo(opciones)
             }
         
-        # PASO 7: CONFIRMACIÓN
-        elif step == "confirmacion":
-            if "confirmar" in text or "si" in text or text == "sí":
-                return self._create_absence_record(session_id, sess)
-            elif "editar" in text or "cambiar" in text:
-                sess["step"] = "motivo"
-                motivos = self._get_motivos_list()
-                return {
-                    "reply_text": "OK, editemos el registro.\n\n" + msg_pedir_motivo(motivos),
-                    "reply_markup": kb_motivos(motivos)
-                }
-            else:
-                return {
-                    "reply_text": "Por favor responde: 'Confirmar' o 'Editar'"
-                }
-        
-        # Si llegamos acá, estado desconocido - reiniciar
-        else:
-            sess["step"] = "legajo"
-            return {
-                "reply_text": msg_saludo()
-            }
+        sess["step"] = "confirmar_legajo_provisional"
+        return {
+            "reply_text": f"Nombre: {nombre_completo}\nLegajo: {sess['legajo']} (provisional)\n\n¿Querés continuar? Tu registro será validado por RRHH.",
+            "reply_markup": kb_legajo_provisional()
+        }
+    
+    def _accion_elegir_sugerencia(self, turno: Turn) -> dict[str, Any]:
+        """PASO 2.55: eligió uno de los empleados sugeridos"""
+        sess, elegido = turno.sess, turno.value
+        nombre = sess["sugerencias"][elegido]
+        sess["legajo"] = elegido
+        sess["legajo_validado"] = True
+        sess["legajo_provisional"] = False
+        sess["nombre_provisional"] = None
+        sess["sugerencias"] = {}
+        sess["step"] = "motivo"
+        motivos = self._get_motivos_list()
+        return {
+            "reply_text": f"Perfecto, {nombre} (legajo {elegido}) verificado.\n\n" + msg_pedir_motivo(motivos),
+            "reply_markup": kb_motivos(motivos)
+        }
+    
+    def _accion_derivar_certificado(self, turno: Turn) -> None:
+        turno.sess["requiere_certificado"] = self._requires_certificate(turno.value)
+    
+    def _accion_resumen(self, turno: Turn) -> dict[str, Any]:
+        return self._generate_summary(turno.sess)
+    
+    def _accion_resumen_certificado_pendiente(self, turno: Turn) -> dict[str, Any]:
+        return self._generate_summary(turno.sess, certificado_pendiente=True)
+    
+    def _accion_crear_aviso(self, turno: Turn) -> dict[str, Any]:
+        return self._create_absence_record(turno.session_id, turno.sess)
     
     def handle_certificate_upload(self, session_id: str, file_path: str) -> dict[str, Any]:
         """Maneja la subida de certificado"""
         sess = self._ensure_session(session_id)
+        try:
+            return self._handle_certificate_upload(session_id, sess, file_path)
+        finally:
+            self.sessions.save(session_id, sess)
+    
+    def _handle_certificate_upload(self, session_id: str, sess: dict[str, Any], file_path: str) -> dict[str, Any]:
         
         if sess["step"] in ["certificado", "esperando_certificado"] or (sess["step"] == "confirmacion" and sess["requiere_certificado"]):
             sess["certificado_recibido"] = True
@@ -362,6 +261,10 @@ RESUMEN DE TU SOLICITUD:
         try:
             from ..persistence.dao import crear_aviso_simple
             
+            # Certificado recibido en el paso del diálogo, o adjuntado antes por el handler de archivos (facts)
+            adjunto = sess.get("facts") or {}
+            certificado_path = sess.get("certificado_path") or adjunto.get("certificado_archivo_path")
+            
             # Crear el aviso
             aviso_data = {
                 "legajo": sess["legajo"],
@@ -369,7 +272,7 @@ RESUMEN DE TU SOLICITUD:
                 "fecha_inicio": sess["fecha_inicio"],
                 "duracion_dias": sess["duracion_dias"],
                 "requiere_certificado": sess["requiere_certificado"],
-                "certificado_path": sess.get("certificado_path"),
+                "certificado_path": certificado_path,
                 "legajo_provisional": sess["legajo_provisional"],
                 "nombre_provisional": sess.get("nombre_provisional", ""),
                 "telegram_user_id": session_id
@@ -381,8 +284,9 @@ RESUMEN DE TU SOLICITUD:
                 codigo = result["id_aviso"]
                 tipo_registro = "PROVISIONAL" if sess["legajo_provisional"] else "CONFIRMADO"
                 
-                # Limpiar sesión
+                # Limpiar sesión (el adjunto queda usado por este aviso)
                 sess["step"] = "completado"
+                sess.pop("facts", None)
                 
                 # Mensaje personalizado según motivo
                 motivo_display = {
@@ -414,14 +318,19 @@ Motivo: {motivo_display}
                 if sess["legajo_provisional"]:
                     mensaje += "IMPORTANTE: Tu legajo será validado por RRHH.\n"
                 
-                if sess["requiere_certificado"] and not sess["certificado_recibido"]:
+                if sess["requiere_certificado"] and not (sess["certificado_recibido"] or certificado_path):
                     mensaje += "RECORDATORIO: Debes enviar el certificado médico antes de las 24 hs.\n"
                 
                 mensaje += "\nGracias por usar el sistema de ausencias."
                 
-                return {
-                    "reply_text": mensaje
+                respuesta = {
+                    "reply_text": mensaje,
+                    "id_aviso": codigo
                 }
+                if adjunto:
+                    # El bot registra el aviso como destino de la subida a Drive del adjunto
+                    respuesta["adjunto"] = adjunto
+                return respuesta
             else:
                 error_msg = result.get("error", "Error desconocido") if result else "Sin respuesta del sistema"
                 return {
@@ -431,4 +340,88 @@ Motivo: {motivo_display}
         except Exception as e:
             return {
                 "reply_text": f"Error al procesar la solicitud: {str(e)}"
-            }
\ No newline at end of file
+            }
+
+
+# --- Registro del árbol de diálogo: nombres que puede usar docs/dialogue.json ---
+
+def _norm_nombre(text: str, sess: dict) -> Optional[str]:
+    return text if len(text) >= 5 else None
+
+
+def _norm_sugerencia(text: str, sess: dict) -> Optional[str]:
+    elegido = text.split(" - ")[0].strip()
+    return next((leg for leg in (sess.get("sugerencias") or {}) if elegido == str(leg).lower()), None)
+
+
+def _norm_motivo(text: str, sess: dict) -> Optional[str]:
+    motivo = normalize_motivo(text)
+    return motivo if motivo in MOTIVOS else None
+
+
+def _norm_fecha_exacta(text: str, sess: dict) -> Optional[str]:
+    fecha_str = parse_date(text)
+    return datetime.fromisoformat(fecha_str).date().isoformat() if fecha_str else None
+
+
+def _norm_fecha(text: str, sess: dict) -> Optional[str]:
+    if text == "hoy":
+        return date.today().isoformat()
+    if text == "mañana":
+        return (date.today() + timedelta(days=1)).isoformat()
+    return _norm_fecha_exacta(text, sess)
+
+
+def _norm_dias(text: str, sess: dict) -> Optional[int]:
+    dias = sanitize_number_of_days(text)
+    return dias if dias and dias > 0 else None
+
+
+REGISTRY = Registry(
+    normalizers={
+        "legajo": lambda text, sess: parse_legajo(text),
+        "nombre": _norm_nombre,
+        "sugerencia": _norm_sugerencia,
+        "motivo": _norm_motivo,
+        "fecha": _norm_fecha,
+        "fecha_exacta": _norm_fecha_exacta,
+        "dias": _norm_dias,
+    },
+    context={
+        "saludo": lambda sess: msg_saludo(),
+        "pedir_legajo": lambda sess: msg_pedir_legajo(),
+        "pedir_motivo": lambda sess: msg_pedir_motivo(list(MOTIVOS)),
+        "pedir_fecha": lambda sess: msg_pedir_fecha(),
+        "pedir_dias": lambda sess: msg_pedir_dias(),
+        "pedir_certificado": lambda sess: msg_pedir_certificado(sess["motivo"]),
+        "motivos": lambda sess: ", ".join(MOTIVOS),
+        "fecha_inicio_dmy": lambda sess: date.fromisoformat(sess["fecha_inicio"]).strftime("%d/%m/%Y"),
+    },
+    keyboards={
+        "motivos": lambda sess: kb_motivos(list(MOTIVOS)),
+        "fecha": lambda sess: kb_fecha(),
+        "dias": lambda sess: kb_dias(),
+        "adjuntar": lambda sess: ik_adjuntar(),
+        "sugerencias": lambda sess: kb_sugerencias_legajo(
+            [f"{legajo} - {nombre}" for legajo, nombre in (sess.get("sugerencias") or {}).items()]
+        ),
+    },
+    actions={
+        "validar_legajo": DialogueManager._accion_validar_legajo,
+        "sugerir_empleados": DialogueManager._accion_sugerir_empleados,
+        "elegir_sugerencia": DialogueManager._accion_elegir_sugerencia,
+        "derivar_certificado": DialogueManager._accion_derivar_certificado,
+        "resumen": DialogueManager._accion_resumen,
+        "resumen_certificado_pendiente": DialogueManager._accion_resumen_certificado_pendiente,
+        "crear_aviso": DialogueManager._accion_crear_aviso,
+    },
+    fields=frozenset(SESSION_DEFAULTS),
+    static_keyboards=frozenset({"motivos", "fecha", "dias", "adjuntar"}),
+)
+
+_tree_loader = DialogueTreeLoader(DIALOGUE_TREE_PATH, REGISTRY)
+
+
+def dialogue_tree_stats() -> dict[str, Any]:
+    """Contadores de recarga del árbol de diálogo (hits/reloads/revalidations/errors)."""
+    return _tree_loader.stats()
@@ -0,0 +1,207 @@
+"""Compilador de reglas: convierte when/then de rules.json en objetos precompilados.
+
+Única definición de la semántica de comparación (==, !=, in, >=, <= con
+fechas ISO o números) y de las acciones set/append: el operador se resuelve al
+compilar, las fechas literales se parsean una vez y las listas de `in` se
+convierten a frozenset.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Callable
+
+
+Predicate = Callable[[Any], bool]
+Action = Callable[[dict[str, Any]], None]
+
+
+@dataclass(frozen=True)
+class CompiledCondition:
+	var: str | None
+	op: str
+	value: Any
+	test: Predicate
+
+
+@dataclass(frozen=True)
+class CompiledAction:
+	var: str
+	op: str
+	value: Any
+	certainty: float
+	apply: Action
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+	index: int
+	id: str
+	explanation: str | None
+	conditions: tuple[CompiledCondition, ...]
+	actions: tuple[CompiledAction, ...]
+	# Variables leídas en when / escritas en then (sin repetidos, en orden)
+	reads: tuple[str | None, ...] = field(init=False, repr=False)
+	writes: tuple[str, ...] = field(init=False, repr=False)
+
+	def __post_init__(self) -> None:
+		object.__setattr__(self, "reads", tuple(dict.fromkeys(c.var for c in self.conditions)))
+		object.__setattr__(self, "writes", tuple(dict.fromkeys(a.var for a in self.actions)))
+
+	def match(self, facts: dict[str, Any]) -> dict[str, Any] | None:
+		"""Evalúa las condiciones; retorna hechos_usados si matchea, sino None."""
+		hechos_usados: dict[str, Any] = {}
+		for c in self.conditions:
+			left = facts.get(c.var)
+			if not c.test(left):
+				return None
+			hechos_usados[c.var] = left
+		return hechos_usados
+
+
+@lru_cache(maxsize=8192)
+def _parse_iso(value: str) -> date | None:
+	# date es inmutable: se comparte entre evaluaciones (y lotes de forward_chain_batch)
+	try:
+		return date.fromisoformat(value)
+	except Exception:
+		return None
+
+
+def _parse_date(value: Any) -> date | None:
+	if value is None:
+		return None
+	if isinstance(value, date) and not isinstance(value, datetime):
+		return value
+	if isinstance(value, str):
+		return _parse_iso(value)
+	return None
+
+
+def _to_float(value: Any) -> float | None:
+	try:
+		return float(value)
+	except Exception:
+		return None
+
+
+def _never(_left: Any) -> bool:
+	return False
+
+
+def _compile_eq(right: Any) -> Predicate:
+	return lambda left: left == right
+
+
+def _compile_ne(right: Any) -> Predicate:
+	return lambda left: left != right
+
+
+def _compile_in(right: Any) -> Predicate:
+	if not isinstance(right, (list, tuple, set)):
+		return _never
+	seq = tuple(right)
+	try:
+		members = frozenset(seq)
+	except TypeError:
+		# Valores no hasheables en la lista: pertenencia lineal
+		return lambda left: left in seq
+
+	def test(left: Any) -> bool:
+		try:
+			return left in members
+		except TypeError:
+			return left in seq
+	return test
+
+
+def _compile_order(op: str, right: Any) -> Predicate:
+	ge = op == ">="
+	r_dt = _parse_date(right)
+	r_num = _to_float(right)
+
+	def test(left: Any) -> bool:
+		if r_dt is not None:
+			l_dt = _parse_date(left)
+			if l_dt is not None:
+				return l_dt >= r_dt if ge else l_dt <= r_dt
+		if r_num is None:
+			return False
+		l_num = _to_float(left)
+		if l_num is None:
+			return False
+		return l_num >= r_num if ge else l_num <= r_num
+	return test
+
+
+def compile_condition(cond: dict[str, Any]) -> CompiledCondition:
+	op = cond.get("op")
+	val = cond.get("value")
+	if op == "==":
+		test = _compile_eq(val)
+	elif op == "!=":
+		test = _compile_ne(val)
+	elif op == "in":
+		test = _compile_in(val)
+	elif op in {">=", "<="}:
+		test = _compile_order(op, val)
+	else:
+		test = _never
+	return CompiledCondition(var=cond.get("var"), op=str(op), value=val, test=test)
+
+
+def _compile_set(var: str, val: Any) -> Action:
+	def apply(facts: dict[str, Any]) -> None:
+		facts[var] = val
+	return apply
+
+
+def _compile_append(var: str, val: Any) -> Action:
+	def apply(facts: dict[str, Any]) -> None:
+		curr = facts.get(var)
+		if curr is None:
+			facts[var] = [val]
+		elif isinstance(curr, list):
+			if val not in curr:
+				curr.append(val)
+		else:
+			facts[var] = [curr, val] if curr != val else [curr]
+	return apply
+
+
+def _noop(_facts: dict[str, Any]) -> None:
+	return None
+
+
+def compile_action(action: dict[str, Any]) -> CompiledAction:
+	var = action["var"]
+	op = action["op"]
+	val = action.get("value")
+	if op == "set":
+		apply = _compile_set(var, val)
+	elif op == "append":
+		apply = _compile_append(var, val)
+	else:
+		apply = _noop
+	return CompiledAction(
+		var=var,
+		op=op,
+		value=val,
+		certainty=float(action.get("certainty", 1.0)),
+		apply=apply,
+	)
+
+
+def compile_rules(rules: list[dict[str, Any]]) -> tuple[CompiledRule, ...]:
+	"""Compila la lista de reglas (ya validada) preservando el orden."""
+	return tuple(
+		CompiledRule(
+			index=i,
+			id=rule.get("id", ""),
+			explanation=rule.get("explanation"),
+			conditions=tuple(compile_condition(c) for c in rule.get("when", [])),
+			actions=tuple(compile_action(a) for a in rule.get("then", [])),
+		)
+		for i, rule in enumerate(rules)
+	)
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
-from typing import Any, Callable
+from typing import Any, Callable, Iterable, Iterator
 
-from .kb_loader import KnowledgeBase, load_knowledge_base
+from ..config import settings
+from ..utils.intervals import SolapeIndex
+from .compiler import CompiledAction, CompiledRule, _parse_date, compile_rules
+from .kb_loader import KnowledgeBase, get_knowledge_base
 from .explain import explain_traces
+from .memo import _MISS, FactCache, fact_key
+from .rete import ReteSession, build_network
 
 
 @dataclass
@@ -18,63 +25,6 @@ class Conclusion:
 	porque: str | None = None
 
 
-def _parse_date(value: Any) -> date | None:
-	if value is None:
-		return None
-	if isinstance(value, date) and not isinstance(value, datetime):
-		return value
-	if isinstance(value, str):
-		try:
-			return date.fromisoformat(value)
-		except Exception:
-			return None
-	return None
-
-
-def _compare(op: str, left: Any, right: Any) -> bool:
-	if op == "==":
-		return left == right
-	if op == "!=":
-		return left != right
-	if op == "in":
-		if isinstance(right, (list, tuple, set)):
-			return left in right
-		return False
-	# Soporte numérico y fechas para >= <=
-	if op in {">=", "<="}:
-		l_dt = _parse_date(left)
-		r_dt = _parse_date(right)
-		if l_dt is not None and r_dt is not None:
-			if op == ">=":
-				return l_dt >= r_dt
-			return l_dt <= r_dt
-		try:
-			l = float(left)
-			r = float(right)
-			return l >= r if op == ">=" else l <= r
-		except Exception:
-			return False
-	return False
-
-
-def _apply_action(facts: dict[str, Any], action: dict[str, Any]) -> None:
-	var = action["var"]
-	op = action["op"]
-	val = action.get("value")
-	if op == "set":
-		facts[var] = val
-	elif op == "append":
-		curr = facts.get(var)
-		if curr is None:
-			facts[var] = [val]
-		elif isinstance(curr, list):
-			if val not in curr:
-				curr.append(val)
-			facts[var] = curr
-		else:
-			facts[var] = [curr, val] if curr != val else [curr]
-
-
 def _certainties_combine(existing: float | None, new: float) -> float:
 	if existing is None:
 		return new
@@ -82,7 +32,19 @@ def _certainties_combine(existing: float | None, new: float) -> float:
 	return (existing + new) / 2.0
 
 
-def _derive_helper_states(facts: dict[str, Any]) -> None:
+def _solape_index(avisos: Any) -> SolapeIndex | None:
+	"""Índice de avisos_abiertos por legajo (acepta uno ya construido)."""
+	if isinstance(avisos, SolapeIndex):
+		return avisos
+	if not avisos:
+		return None
+	return SolapeIndex(
+		(a.get("legajo"), _parse_date(a.get("inicio")), _parse_date(a.get("fin")), a)
+		for a in avisos
+	)
+
+
+def _derive_helper_states(facts: dict[str, Any], solapes: SolapeIndex | None = None) -> None:
 	# fecha_fin_estimada
 	fi = _parse_date(facts.get("fecha_inicio"))
 	days = facts.get("duracion_estimdays")
@@ -110,16 +72,14 @@ def _derive_helper_states(facts: dict[str, Any]) -> None:
 		delta_h = (datetime.combine(fr, datetime.min.time()) - datetime.combine(fi, datetime.min.time())).total_seconds() / 3600.0
 		facts["fuera_de_termino"] = bool(delta_h > plazo_h)
 
-	# Duplicado solapado
+	# Duplicado solapado (índice por legajo; se construye una vez por evaluación)
 	if fi is not None and isinstance(days, int):
+		if solapes is None:
+			solapes = _solape_index(facts.get("avisos_abiertos"))
 		fin_actual = fi + timedelta(days=days)
-		for a in facts.get("avisos_abiertos", []) or []:
-			if a.get("legajo") == facts.get("legajo"):
-				ai = _parse_date(a.get("inicio"))
-				af = _parse_date(a.get("fin"))
-				if ai and af and not (fin_actual < ai or fi > af):
-					facts["estado_aviso"] = "rechazado"
-					_append_notify(facts, "rrhh")
+		if solapes is not None and solapes.overlaps(facts.get("legajo"), fi, fin_actual):
+			facts["estado_aviso"] = "rechazado"
+			_append_notify(facts, "rrhh")
 
 	# R-EST-02: Estado final del aviso
 	# - Si hay duplicado/solape (rechazado) o pendiente_validacion → no tocar
@@ -161,51 +121,66 @@ def forward_chain(facts: dict[str, Any]) -> dict[str, Any]:
 	- facts: estado final de hechos
 	- conclusiones: top-3 por certeza
 	- traces: lista de trazas {regla_id, porque, hechos_usados}
+	- stats: pasadas, disparos y condiciones evaluadas vs. recorrido completo
+
+	Memoizado por huella de los hechos + KB (ver engine.memo); cada llamada
+	recibe su propia copia del resultado.
 	"""
-	kb: KnowledgeBase = load_knowledge_base()
+	kb = get_knowledge_base()
+	return _memoized(kb, "fc", facts, lambda: _forward_chain_kb(kb, facts))
+
+
+_result_cache = FactCache(maxsize=settings.ENGINE_CACHE_SIZE, ttl=settings.ENGINE_CACHE_TTL)
+
+
+def _memoized(kb: KnowledgeBase, kind: str, facts: dict[str, Any], compute: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+	if not _result_cache.enabled:
+		return compute()
+	_result_cache.bind_kb(f"{kb.version}:{kb.fingerprint}")
+	key = (kind, fact_key(facts))
+	hit = _result_cache.get(key)
+	if hit is not _MISS:
+		return hit
+	res = compute()
+	_result_cache.put(key, res)
+	return res
+
+
+def engine_cache_stats() -> dict[str, Any]:
+	"""Aciertos, fallos, desalojos (LRU/TTL) e invalidaciones por recarga de KB."""
+	return _result_cache.stats()
+
+
+def clear_engine_cache() -> None:
+	_result_cache.clear()
+
+
+def _forward_chain_kb(kb: KnowledgeBase, facts: dict[str, Any]) -> dict[str, Any]:
 	facts_mut = dict(facts)
 	conclusions: dict[str, Conclusion] = {}
 	traces: list[dict[str, Any]] = []
 
-	# Ciclo fijo (sin bucle infinito): reevaluar hasta estabilidad o límite
-	for _ in range(5):
-		fired_any = False
-		for rule in kb.rules:
-			conds = rule.get("when", [])
-			ok = True
-			hechos_usados: dict[str, Any] = {}
-			for c in conds:
-				var = c.get("var")
-				op = c.get("op")
-				val = c.get("value")
-				left = facts_mut.get(var)
-				if not _compare(op, left, val):
-					ok = False
-					break
-				hechos_usados[var] = left
-			if not ok:
-				continue
-			# Acciones
-			for act in rule.get("then", []):
-				_apply_action(facts_mut, act)
-				certainty = float(act.get("certainty", 1.0))
-				var = act["var"]
-				concl = conclusions.get(var)
-				new_val = facts_mut.get(var)
-				new_cert = _certainties_combine(concl.certainty, certainty) if concl else certainty
-				conclusions[var] = Conclusion(
-					var=var,
-					value=new_val,
-					certainty=new_cert,
-					regla_id=rule.get("id", ""),
-					hechos_usados=hechos_usados,
-					porque=rule.get("explanation"),
-				)
-				fired_any = True
-		if fired_any:
-			_derive_helper_states(facts_mut)
-		else:
-			break
+	network = kb.network or build_network(kb.compiled or compile_rules(kb.rules))
+
+	def on_fire(rule: CompiledRule, act: CompiledAction, hechos_usados: dict[str, Any]) -> None:
+		var = act.var
+		concl = conclusions.get(var)
+		new_cert = _certainties_combine(concl.certainty, act.certainty) if concl else act.certainty
+		conclusions[var] = Conclusion(
+			var=var,
+			value=facts_mut.get(var),
+			certainty=new_cert,
+			regla_id=rule.id,
+			hechos_usados=hechos_usados,
+			porque=rule.explanation,
+		)
+
+	# Agenda incremental hasta punto fijo: solo se reevalúan las reglas que leen
+	# variables modificadas (por acciones o por _derive_helper_states, que se detectan
+	# comparando antes/después las variables que leen las reglas según kb.deps)
+	solapes = _solape_index(facts_mut.get("avisos_abiertos"))
+	session = ReteSession(network, facts_mut)
+	session.run(on_fire, lambda f: _derive_helper_states(f, solapes), kb.deps.read_vars if kb.deps is not None else None)
 
 	# Top-3 por certeza
 	top3 = sorted(conclusions.values(), key=lambda c: c.certainty, reverse=True)[:3]
@@ -221,9 +196,66 @@ def forward_chain(facts: dict[str, Any]) -> dict[str, Any]:
 		"facts": facts_mut,
 		"conclusiones": [c.__dict__ for c in top3],
 		"traces": explain_traces(traces),
+		"stats": session.stats(),
 	}
 
 
+def _evaluar_lote(lote: list[dict[str, Any]]) -> list[dict[str, Any]]:
+	# Se ejecuta en el worker: usa la KB cacheada del proceso (se carga una vez)
+	kb = get_knowledge_base()
+	return [_forward_chain_kb(kb, f) for f in lote]
+
+
+def _lotes(facts_iter: Iterable[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+	lote: list[dict[str, Any]] = []
+	for f in facts_iter:
+		lote.append(f)
+		if len(lote) >= size:
+			yield lote
+			lote = []
+	if lote:
+		yield lote
+
+
+def forward_chain_batch(
+	facts_iter: Iterable[dict[str, Any]],
+	*,
+	workers: int | None = None,
+	chunksize: int = 500,
+) -> Iterator[dict[str, Any]]:
+	"""Evalúa muchos conjuntos de hechos; devuelve un generador en el mismo orden.
+
+	- Sin `workers` (o 1): evalúa en este proceso con una única KB compilada.
+	- Con `workers` > 1: reparte lotes de `chunksize` en un ProcessPoolExecutor,
+	  con a lo sumo 2 lotes en vuelo por worker (memoria acotada aunque la
+	  entrada sea un generador de millones de filas).
+	"""
+	if not workers or workers <= 1:
+		kb = get_knowledge_base()
+		for f in facts_iter:
+			yield _forward_chain_kb(kb, f)
+		return
+
+	pool = ProcessPoolExecutor(max_workers=workers)
+	pendientes: deque[Future] = deque()
+	try:
+		for lote in _lotes(facts_iter, chunksize):
+			pendientes.append(pool.submit(_evaluar_lote, lote))
+			if len(pendientes) >= workers * 2:
+				yield from pendientes.popleft().result()
+		while pendientes:
+			yield from pendientes.popleft().result()
+	finally:
+		# Si el consumidor corta el generador, no esperar lotes que ya no se leerán
+		pool.shutdown(wait=True, cancel_futures=True)
+
+
+def forward_chain_columnar(query: Any = None, *, extra: dict[str, Any] | None = None) -> Any:
+	"""Re-clasificación masiva por columnas sobre un SELECT de dao (ver engine.vectorized)."""
+	from .vectorized import forward_chain_columnar as _columnar
+	return _columnar(query, extra=extra)
+
+
 def backward_chain(goal: str, facts: dict[str, Any]) -> dict[str, Any]:
 	"""Backward chaining muy simple basado en slots faltantes.
 
@@ -232,6 +264,11 @@ def backward_chain(goal: str, facts: dict[str, Any]) -> dict[str, Any]:
 
 	Devuelve {status: need_info|concluded|no_match, ask?: [slots]}
 	"""
+	kb = get_knowledge_base()
+	return _memoized(kb, f"bc:{goal}", facts, lambda: _backward_chain(goal, facts))
+
+
+def _backward_chain(goal: str, facts: dict[str, Any]) -> dict[str, Any]:
 	# Requisitos por meta (desde docs/Arbol_Dialogo_v1.md)
 	if goal == "crear_aviso":
 		required = ["legajo", "motivo", "fecha_inicio", "duracion_estimdays"]
@@ -282,6 +319,6 @@ def backward_chain(goal: str, facts: dict[str, Any]) -> dict[str, Any]:
 					"hechos_usados": {"vinculo_familiar": facts.get("vinculo_familiar")},
 				}]
 			}
-	fc = forward_chain(facts)
+	fc = _forward_chain_kb(get_knowledge_base(), facts)
 	return {"status": "concluded", "facts": fc["facts"], "traces": fc["traces"]}
 
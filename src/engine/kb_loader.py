@@ -1,21 +1,63 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from threading import Lock
 from typing import Any, Literal
 
+import hashlib
 import json
 
+from .compiler import CompiledRule, compile_rules
+from .rete import ReteNetwork, build_network
+
 
 GLOSSARY_PATH = Path(__file__).resolve().parents[2] / "docs" / "glossary.json"
 RULES_PATH = Path(__file__).resolve().parents[2] / "docs" / "rules.json"
 
 
+@dataclass(frozen=True)
+class DependencyIndex:
+	"""Índice variable → reglas (por índice) que la leen en `when` / escriben en `then`.
+
+	read_vars es el conjunto que forward_chain vigila tras _derive_helper_states;
+	el reencolado por variable lo hace la red (ReteNetwork.alphas_by_var).
+	"""
+	reads: dict[str, tuple[int, ...]]
+	writes: dict[str, tuple[int, ...]]
+
+	@property
+	def read_vars(self) -> frozenset[str]:
+		return frozenset(v for v, rules in self.reads.items() if rules)
+
+
+def build_dependency_index(glossary: dict[str, Any], compiled: tuple[CompiledRule, ...]) -> DependencyIndex:
+	reads: dict[str, list[int]] = {v: [] for v in glossary.get("variables", {})}
+	writes: dict[str, list[int]] = {v: [] for v in glossary.get("variables", {})}
+	for rule in compiled:
+		for var in rule.reads:
+			reads.setdefault(var, []).append(rule.index)
+		for var in rule.writes:
+			writes.setdefault(var, []).append(rule.index)
+	return DependencyIndex(
+		reads={k: tuple(v) for k, v in reads.items()},
+		writes={k: tuple(v) for k, v in writes.items()},
+	)
+
+
 @dataclass(frozen=True)
 class KnowledgeBase:
 	glossary: dict[str, Any]
 	rules: list[dict[str, Any]]
 	version: int
+	# Hash del contenido de glossary.json + rules.json (identifica la carga)
+	fingerprint: str = ""
+	# Reglas precompiladas (mismo orden que `rules`)
+	compiled: tuple[CompiledRule, ...] = field(default=(), repr=False, compare=False)
+	# Red alfa/beta construida a partir de `compiled`
+	network: ReteNetwork | None = field(default=None, repr=False, compare=False)
+	# Índice de dependencias variable → reglas
+	deps: DependencyIndex | None = field(default=None, repr=False, compare=False)
 
 
 def _validate_glossary(gl: dict[str, Any]) -> None:
@@ -60,17 +102,103 @@ def _validate_rules(rules_doc: dict[str, Any], glossary: dict[str, Any]) -> list
 	return rules
 
 
-def load_knowledge_base() -> KnowledgeBase:
-	"""Carga y valida glossary.json y rules.json.
+def _read_bytes(path: Path) -> bytes:
+	with path.open("rb") as f:
+		return f.read()
 
-	Retorna un objeto KnowledgeBase con reglas y glosario.
-	"""
-	with GLOSSARY_PATH.open("r", encoding="utf-8") as f:
-		glossary = json.load(f)
+
+def _build_knowledge_base(glossary_raw: bytes, rules_raw: bytes) -> KnowledgeBase:
+	glossary = json.loads(glossary_raw.decode("utf-8"))
 	_validate_glossary(glossary)
-	with RULES_PATH.open("r", encoding="utf-8") as f:
-		rules_doc = json.load(f)
+	rules_doc = json.loads(rules_raw.decode("utf-8"))
 	rules = _validate_rules(rules_doc, glossary)
 	version = int(rules_doc.get("version", 1))
-	return KnowledgeBase(glossary=glossary, rules=rules, version=version)
+	compiled = compile_rules(rules)
+	return KnowledgeBase(
+		glossary=glossary,
+		rules=rules,
+		version=version,
+		fingerprint=_content_hash(glossary_raw, rules_raw),
+		compiled=compiled,
+		network=build_network(compiled),
+		deps=build_dependency_index(glossary, compiled),
+	)
+
+
+def _content_hash(glossary_raw: bytes, rules_raw: bytes) -> str:
+	h = hashlib.sha256()
+	h.update(glossary_raw)
+	h.update(b"\0")
+	h.update(rules_raw)
+	return h.hexdigest()
+
+
+def load_knowledge_base() -> KnowledgeBase:
+	"""Carga y valida glossary.json y rules.json.
+
+	Retorna un objeto KnowledgeBase con reglas y glosario. Siempre lee disco;
+	para el camino caliente usar get_knowledge_base().
+	"""
+	return _build_knowledge_base(_read_bytes(GLOSSARY_PATH), _read_bytes(RULES_PATH))
+
+
+# --- Caché de proceso ---
+
+_cache_lock = Lock()
+_cache_kb: KnowledgeBase | None = None
+_cache_stat_key: tuple[Any, ...] | None = None
+_cache_stats = {"hits": 0, "misses": 0, "reloads": 0, "revalidations": 0}
+
+
+def _stat_key() -> tuple[Any, ...]:
+	key: list[Any] = []
+	for path in (GLOSSARY_PATH, RULES_PATH):
+		st = path.stat()
+		key.append((str(path), st.st_mtime_ns, st.st_size))
+	return tuple(key)
+
+
+def get_knowledge_base() -> KnowledgeBase:
+	"""Devuelve la KB cacheada a nivel de proceso.
+
+	La caché se valida con mtime/tamaño de ambos archivos (un stat por archivo).
+	Si cambian, se relee el contenido y solo se reparsea si el hash difiere;
+	un touch sin cambios de contenido cuenta como revalidación.
+	"""
+	global _cache_kb, _cache_stat_key
+	stat_key = _stat_key()
+	with _cache_lock:
+		if _cache_kb is not None and stat_key == _cache_stat_key:
+			_cache_stats["hits"] += 1
+			return _cache_kb
+		glossary_raw = _read_bytes(GLOSSARY_PATH)
+		rules_raw = _read_bytes(RULES_PATH)
+		if _cache_kb is None:
+			_cache_stats["misses"] += 1
+		elif _content_hash(glossary_raw, rules_raw) == _cache_kb.fingerprint:
+			_cache_stats["revalidations"] += 1
+			_cache_stat_key = stat_key
+			return _cache_kb
+		else:
+			_cache_stats["reloads"] += 1
+		_cache_kb = _build_knowledge_base(glossary_raw, rules_raw)
+		_cache_stat_key = stat_key
+		return _cache_kb
+
+
+def kb_cache_stats() -> dict[str, Any]:
+	"""Contadores de la caché de KB (hits/misses/reloads/revalidations) y huella actual."""
+	with _cache_lock:
+		out: dict[str, Any] = dict(_cache_stats)
+		out["fingerprint"] = _cache_kb.fingerprint if _cache_kb is not None else None
+		return out
+
 
+def clear_kb_cache() -> None:
+	"""Vacía la caché y reinicia contadores (útil para tests)."""
+	global _cache_kb, _cache_stat_key
+	with _cache_lock:
+		_cache_kb = None
+		_cache_stat_key = None
+		for k in _cache_stats:
+			_cache_stats[k] = 0
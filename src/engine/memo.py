@@ -0,0 +1,120 @@
+"""Caché LRU + TTL de resultados del motor, por huella canónica de los hechos.
+
+La clave combina la huella de los hechos con la versión y el hash de contenido
+de la KB; cuando la KB se recarga la caché se vacía sola. Cada acierto devuelve
+una copia nueva del resultado, así el llamador puede mutarlo.
+"""
+from __future__ import annotations
+
+import hashlib
+import pickle
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable
+
+
+_MISS = object()
+
+
+def _canonical(value: Any) -> Any:
+	# Etiqueta de tipo: True/1/1.0, lista/tupla y str/fecha no colisionan
+	if isinstance(value, dict):
+		return ("d", tuple(sorted(((repr(k), _canonical(v)) for k, v in value.items()))))
+	if isinstance(value, list):
+		return ("l", tuple(_canonical(v) for v in value))
+	if isinstance(value, tuple):
+		return ("t", tuple(_canonical(v) for v in value))
+	if isinstance(value, (set, frozenset)):
+		return ("s", tuple(sorted(repr(_canonical(v)) for v in value)))
+	return (type(value).__name__, repr(value))
+
+
+def fact_key(facts: dict[str, Any]) -> tuple[Any, ...]:
+	"""Clave canónica (independiente del orden) de un dict de hechos.
+
+	Camino rápido: tupla ordenada de (var, tipo, valor) cuando todo es hasheable;
+	si hay listas/dicts anidados se usa la forma canónica etiquetada.
+	"""
+	try:
+		key = tuple(sorted((k, v.__class__, v) for k, v in facts.items()))
+		hash(key)
+		return key
+	except TypeError:
+		return ("~", _canonical(facts))
+
+
+def fingerprint_facts(facts: Any) -> str:
+	"""Hash estable (hex) de un set de hechos, para logs o claves externas."""
+	return hashlib.blake2b(repr(_canonical(facts)).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class FactCache:
+	"""LRU acotado con TTL; se invalida completo al cambiar la huella de la KB.
+
+	Los valores se guardan serializados con pickle: cada `get` devuelve una copia
+	nueva (más barato que deepcopy sobre dicts de resultados chicos).
+	"""
+
+	def __init__(self, maxsize: int = 1024, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic) -> None:
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self._clock = clock
+		self._data: OrderedDict[Any, tuple[float, bytes]] = OrderedDict()
+		self._kb_fingerprint: str | None = None
+		self._lock = Lock()
+		self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+	@property
+	def enabled(self) -> bool:
+		return self.maxsize > 0
+
+	def bind_kb(self, fingerprint: str) -> None:
+		"""Vacía la caché si la KB cambió desde la última llamada."""
+		if fingerprint == self._kb_fingerprint:
+			return
+		with self._lock:
+			if self._kb_fingerprint is not None and self._data:
+				self._stats["invalidations"] += 1
+			self._data.clear()
+			self._kb_fingerprint = fingerprint
+
+	def get(self, key: Any) -> Any:
+		with self._lock:
+			item = self._data.get(key)
+			if item is None:
+				self._stats["misses"] += 1
+				return _MISS
+			expires, value = item
+			if self.ttl > 0 and expires < self._clock():
+				del self._data[key]
+				self._stats["expirations"] += 1
+				self._stats["misses"] += 1
+				return _MISS
+			self._data.move_to_end(key)
+			self._stats["hits"] += 1
+			return pickle.loads(value)
+
+	def put(self, key: Any, value: Any) -> None:
+		if not self.enabled:
+			return
+		blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+		with self._lock:
+			self._data[key] = (self._clock() + self.ttl, blob)
+			self._data.move_to_end(key)
+			while len(self._data) > self.maxsize:
+				self._data.popitem(last=False)
+				self._stats["evictions"] += 1
+
+	def clear(self) -> None:
+		with self._lock:
+			self._data.clear()
+			for k in self._stats:
+				self._stats[k] = 0
+
+	def stats(self) -> dict[str, Any]:
+		with self._lock:
+			out: dict[str, Any] = dict(self._stats)
+			out["size"] = len(self._data)
+			out["maxsize"] = self.maxsize
+			return out
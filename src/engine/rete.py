@@ -0,0 +1,209 @@
+"""Red de discriminación (estilo Rete/TREAT) para el encadenamiento hacia adelante.
+
+- Nodos alfa: una condición (var, op, value) compartida entre reglas; se indexan
+  por variable para reevaluar solo los nodos de la variable que cambió.
+- Memoria beta: sin joins entre hechos (hay un único dict de hechos), alcanza con
+  contar por regla cuántos nodos alfa siguen sin cumplirse (TREAT).
+- Agenda: reglas activas ordenadas por índice; refracción por token (valores
+  leídos al disparar), de modo que una regla solo vuelve a disparar si cambió
+  alguna de las variables que lee.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from .compiler import CompiledAction, CompiledCondition, CompiledRule
+
+
+logger = logging.getLogger(__name__)
+
+# Corte de seguridad ante reglas que oscilan (A→B→A...)
+MAX_PASSES = 50
+
+
+@dataclass(frozen=True)
+class AlphaNode:
+	index: int
+	condition: CompiledCondition
+	rules: tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class ReteNetwork:
+	rules: tuple[CompiledRule, ...]
+	alphas: tuple[AlphaNode, ...]
+	alphas_by_var: dict[str | None, tuple[int, ...]]
+	rule_alphas: tuple[tuple[int, ...], ...]
+
+	@property
+	def read_vars(self) -> frozenset[str | None]:
+		return frozenset(self.alphas_by_var)
+
+
+def _alpha_key(cond: CompiledCondition) -> tuple[Any, ...]:
+	try:
+		value_key = json.dumps(cond.value, sort_keys=True, default=repr)
+	except Exception:
+		value_key = repr(cond.value)
+	return (cond.var, cond.op, type(cond.value).__name__, value_key)
+
+
+def build_network(rules: tuple[CompiledRule, ...]) -> ReteNetwork:
+	"""Construye la red a partir de reglas compiladas (una vez por carga de KB)."""
+	keys: dict[tuple[Any, ...], int] = {}
+	conditions: list[CompiledCondition] = []
+	alpha_rules: list[list[int]] = []
+	rule_alphas: list[tuple[int, ...]] = []
+	for rule in rules:
+		mine: list[int] = []
+		for cond in rule.conditions:
+			key = _alpha_key(cond)
+			idx = keys.get(key)
+			if idx is None:
+				idx = len(conditions)
+				keys[key] = idx
+				conditions.append(cond)
+				alpha_rules.append([])
+			if idx not in mine:
+				mine.append(idx)
+				alpha_rules[idx].append(rule.index)
+		rule_alphas.append(tuple(mine))
+	alphas = tuple(
+		AlphaNode(index=i, condition=c, rules=tuple(alpha_rules[i]))
+		for i, c in enumerate(conditions)
+	)
+	by_var: dict[str | None, list[int]] = {}
+	for a in alphas:
+		by_var.setdefault(a.condition.var, []).append(a.index)
+	return ReteNetwork(
+		rules=rules,
+		alphas=alphas,
+		alphas_by_var={k: tuple(v) for k, v in by_var.items()},
+		rule_alphas=tuple(rule_alphas),
+	)
+
+
+def _freeze(value: Any) -> Any:
+	"""Copia inmutable para detectar cambios (las acciones append mutan listas in-place)."""
+	if isinstance(value, list):
+		return ("__list__", tuple(_freeze(v) for v in value))
+	if isinstance(value, dict):
+		return ("__dict__", tuple((k, _freeze(v)) for k, v in value.items()))
+	return value
+
+
+FireCallback = Callable[[CompiledRule, CompiledAction, dict[str, Any]], None]
+
+
+class ReteSession:
+	"""Memoria de trabajo de una evaluación sobre un dict de hechos."""
+
+	def __init__(self, network: ReteNetwork, facts: dict[str, Any]) -> None:
+		self.network = network
+		self.facts = facts
+		self.alpha_mem = [False] * len(network.alphas)
+		self.missing = [len(a) for a in network.rule_alphas]
+		self._fired: dict[int, Any] = {}
+		self.passes = 0
+		self.evaluations = len(network.alphas)
+		self.firings = 0
+		for alpha in network.alphas:
+			if alpha.condition.test(facts.get(alpha.condition.var)):
+				self.alpha_mem[alpha.index] = True
+				for r in alpha.rules:
+					self.missing[r] -= 1
+
+	def _token(self, rule: CompiledRule) -> Any:
+		return tuple(_freeze(self.facts.get(v)) for v in rule.reads)
+
+	def active(self) -> list[int]:
+		return [i for i, m in enumerate(self.missing) if m == 0]
+
+	def assert_change(self, var: str | None) -> set[int]:
+		"""Reevalúa los nodos alfa de `var`; retorna reglas afectadas que quedan activas."""
+		affected: set[int] = set()
+		value = self.facts.get(var)
+		for ai in self.network.alphas_by_var.get(var, ()):
+			alpha = self.network.alphas[ai]
+			self.evaluations += 1
+			new = bool(alpha.condition.test(value))
+			if new != self.alpha_mem[ai]:
+				self.alpha_mem[ai] = new
+				delta = -1 if new else 1
+				for r in alpha.rules:
+					self.missing[r] += delta
+			affected.update(alpha.rules)
+		return {r for r in affected if self.missing[r] == 0}
+
+	def stats(self) -> dict[str, int]:
+		"""Evaluaciones de condiciones realizadas vs. un recorrido completo por pasada."""
+		full_scan = self.passes * sum(len(r.conditions) for r in self.network.rules)
+		return {
+			"pasadas": self.passes,
+			"disparos": self.firings,
+			"condiciones_evaluadas": self.evaluations,
+			"condiciones_full_scan": full_scan,
+			"condiciones_evitadas": max(full_scan - self.evaluations, 0),
+		}
+
+	def run(
+		self,
+		on_fire: FireCallback,
+		after_pass: Callable[[dict[str, Any]], None],
+		watch: Iterable[str | None] | None = None,
+	) -> None:
+		"""Dispara reglas hasta punto fijo.
+
+		Dentro de una pasada las reglas se disparan en orden de índice (como el
+		recorrido lineal); tras cada acción solo se reencolan las reglas que leen
+		la variable modificada. `after_pass` se ejecuta al final de cada pasada
+		que disparó algo; lo que cambió se detecta comparando antes y después
+		las variables de `watch` (default: todas las que leen las reglas), así
+		que no hace falta declarar qué escribe `after_pass`.
+		"""
+		rules = self.network.rules
+		read_vars = self.network.read_vars
+		derived_watch = read_vars if watch is None else read_vars & frozenset(watch)
+		agenda: set[int] = set(self.active())
+		while agenda:
+			if self.passes >= MAX_PASSES:
+				logger.warning("forward_chain: sin punto fijo tras %s pasadas", MAX_PASSES)
+				break
+			self.passes += 1
+			heap = sorted(agenda)
+			agenda = set()
+			fired_any = False
+			while heap:
+				r = heapq.heappop(heap)
+				if self.missing[r] != 0:
+					continue
+				rule = rules[r]
+				token = self._token(rule)
+				if r in self._fired and self._fired[r] == token:
+					continue
+				self._fired[r] = token
+				self.firings += 1
+				hechos_usados = {c.var: self.facts.get(c.var) for c in rule.conditions}
+				for act in rule.actions:
+					watched = act.var in read_vars
+					before = _freeze(self.facts.get(act.var)) if watched else None
+					act.apply(self.facts)
+					on_fire(rule, act, hechos_usados)
+					fired_any = True
+					if watched and _freeze(self.facts.get(act.var)) != before:
+						for r2 in self.assert_change(act.var):
+							if r2 > r:
+								heapq.heappush(heap, r2)
+							else:
+								agenda.add(r2)
+			if not fired_any:
+				break
+			snapshot = {v: _freeze(self.facts.get(v)) for v in derived_watch}
+			after_pass(self.facts)
+			for v, before in snapshot.items():
+				if _freeze(self.facts.get(v)) != before:
+					agenda.update(self.assert_change(v))
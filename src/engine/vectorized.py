@@ -0,0 +1,374 @@
+"""Modo columnar del motor para re-clasificación masiva de avisos.
+
+Cada variable es una columna codificada por diccionario (valores únicos + array
+de códigos NumPy). Las condiciones se evalúan una vez por valor único y se
+difunden como máscara booleana; las acciones y _derive_helper_states se aplican
+por columna sobre la máscara de filas. El resultado (hechos por fila) es el
+mismo que forward_chain fila a fila; no se calculan conclusiones/trazas.
+
+NumPy es opcional (listado en requirements.txt): si no está instalado, o la KB
+usa algo que este modo no soporta (condiciones sobre listas, avisos_abiertos),
+se evalúa fila a fila con forward_chain_batch.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime
+from typing import Any, Callable, Iterable
+
+from .compiler import CompiledRule, _parse_date
+from .inference import forward_chain_batch
+from .kb_loader import KnowledgeBase, get_knowledge_base
+from .rete import MAX_PASSES
+
+try:
+	import numpy as np
+except Exception:  # pragma: no cover - numpy es opcional
+	np = None  # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Missing:
+	"""Marca de 'clave ausente' (distinta de None) dentro de una columna."""
+
+	def __repr__(self) -> str:
+		return "<ausente>"
+
+
+MISSING = _Missing()
+
+
+def _clave(value: Any) -> tuple[Any, ...]:
+	# El tipo es parte de la clave: 1, 1.0 y True no se mezclan en un mismo código
+	try:
+		hash(value)
+		return (type(value), value)
+	except TypeError:
+		return (type(value), repr(value))
+
+
+class _Columna:
+	__slots__ = ("valores", "codigos", "_indice")
+
+	def __init__(self, valores: list[Any], codigos: Any) -> None:
+		self.valores = valores
+		self.codigos = codigos
+		self._indice = {_clave(v): i for i, v in enumerate(valores)}
+
+	@classmethod
+	def desde_lista(cls, datos: Iterable[Any]) -> "_Columna":
+		valores: list[Any] = []
+		indice: dict[tuple[Any, ...], int] = {}
+		codigos = []
+		for v in datos:
+			k = _clave(v)
+			c = indice.get(k)
+			if c is None:
+				c = len(valores)
+				indice[k] = c
+				valores.append(v)
+			codigos.append(c)
+		return cls(valores, np.asarray(codigos, dtype=np.int32))
+
+	@classmethod
+	def constante(cls, value: Any, n: int) -> "_Columna":
+		return cls([value], np.zeros(n, dtype=np.int32))
+
+	def codigo(self, value: Any) -> int:
+		k = _clave(value)
+		c = self._indice.get(k)
+		if c is None:
+			c = len(self.valores)
+			self._indice[k] = c
+			self.valores.append(value)
+		return c
+
+	def mapear(self, fn: Callable[[Any], Any], dtype: Any = object, crudo: bool = False) -> Any:
+		"""Aplica fn una vez por valor único y difunde el resultado a todas las filas.
+
+		fn recibe None para claves ausentes (como facts.get) salvo con crudo=True,
+		donde recibe MISSING.
+		"""
+		por_valor = np.empty(len(self.valores), dtype=dtype)
+		for i, v in enumerate(self.valores):
+			por_valor[i] = fn(v if crudo or v is not MISSING else None)
+		return por_valor[self.codigos]
+
+	def mascara(self, fn: Callable[[Any], bool], crudo: bool = False) -> Any:
+		return self.mapear(lambda v: bool(fn(v)), dtype=bool, crudo=crudo)
+
+	def asignar(self, mask: Any, value: Any) -> None:
+		self.codigos[mask] = self.codigo(value)
+
+	def asignar_valores(self, mask: Any, valores: Any) -> None:
+		"""Asigna un valor distinto por fila (valores alineados con mask.nonzero())."""
+		if len(valores) == 0:
+			return
+		unicos, inversa = np.unique(valores, return_inverse=True)
+		codigos = np.fromiter((self.codigo(v.item() if hasattr(v, "item") else v) for v in unicos), dtype=np.int32, count=len(unicos))
+		self.codigos[mask] = codigos[inversa]
+
+	def valor(self, fila: int) -> Any:
+		return self.valores[self.codigos[fila]]
+
+
+class _ColumnaLista:
+	"""Variable con acciones append: base por fila + orden del primer append de cada valor."""
+
+	__slots__ = ("base", "orden")
+
+	def __init__(self, base: _Columna) -> None:
+		self.base = base
+		self.orden: dict[tuple[Any, ...], tuple[Any, Any]] = {}
+
+	def append(self, mask: Any, value: Any, paso: int) -> None:
+		k = _clave(value)
+		if k not in self.orden:
+			self.orden[k] = (value, np.full(len(self.base.codigos), -1, dtype=np.int64))
+		pasos = self.orden[k][1]
+		pasos[mask & (pasos < 0)] = paso
+
+	def valor(self, fila: int) -> Any:
+		agregados = sorted(
+			(int(pasos[fila]), value) for value, pasos in self.orden.values() if pasos[fila] >= 0
+		)
+		base = self.base.valor(fila)
+		if not agregados:
+			return base
+		if base is MISSING or base is None:
+			out: list[Any] = []
+		elif isinstance(base, list):
+			out = list(base)
+		else:
+			out = [base]
+		for _, value in agregados:
+			if value not in out:
+				out.append(value)
+		return out
+
+
+def _hechos_de_fila(fila: dict[str, Any]) -> dict[str, Any]:
+	out: dict[str, Any] = {}
+	for k, v in fila.items():
+		if isinstance(v, datetime):
+			v = v.date().isoformat()
+		elif isinstance(v, date):
+			v = v.isoformat()
+		out[k] = v
+	return out
+
+
+def _soportado(kb: KnowledgeBase, columnas: dict[str, list[Any]]) -> str | None:
+	"""Retorna el motivo por el que no se puede usar el modo columnar (o None)."""
+	if np is None:
+		return "numpy no disponible"
+	set_vars = {a.var for r in kb.compiled for a in r.actions if a.op == "set"}
+	append_vars = {a.var for r in kb.compiled for a in r.actions if a.op == "append"}
+	read_vars = {v for r in kb.compiled for v in r.reads}
+	if set_vars & append_vars:
+		return "variable con acciones set y append"
+	if read_vars & (append_vars | {"notificar_a"}):
+		return "condición sobre una variable lista"
+	if any(v and v is not MISSING for v in columnas.get("avisos_abiertos", ())):
+		return "avisos_abiertos (solape) no soportado en modo columnar"
+	return None
+
+
+class ColumnarResult:
+	"""Hechos resultantes en formato columnar; rows() materializa dicts por fila."""
+
+	def __init__(self, n: int, columnas: dict[str, Any], pasadas: int) -> None:
+		self.n = n
+		self._columnas = columnas
+		self.pasadas = pasadas
+
+	@property
+	def variables(self) -> list[str]:
+		return list(self._columnas)
+
+	def column(self, var: str) -> list[Any]:
+		col = self._columnas.get(var)
+		if col is None:
+			return [None] * self.n
+		return [None if (v := col.valor(i)) is MISSING else v for i in range(self.n)]
+
+	def rows(self) -> list[dict[str, Any]]:
+		out = []
+		for i in range(self.n):
+			fila = {}
+			for var, col in self._columnas.items():
+				v = col.valor(i)
+				if v is not MISSING:
+					fila[var] = v
+			out.append(fila)
+		return out
+
+
+class _FilasResult(ColumnarResult):
+	"""Resultado del camino de respaldo fila a fila (misma interfaz)."""
+
+	def __init__(self, filas: list[dict[str, Any]]) -> None:
+		self._filas = filas
+		self.n = len(filas)
+		self.pasadas = 0
+
+	@property
+	def variables(self) -> list[str]:
+		return list(dict.fromkeys(k for f in self._filas for k in f))
+
+	def column(self, var: str) -> list[Any]:
+		return [f.get(var) for f in self._filas]
+
+	def rows(self) -> list[dict[str, Any]]:
+		return self._filas
+
+
+def _derive_columnar(cols: dict[str, Any], m: Any, n: int) -> None:
+	"""Versión por columnas de inference._derive_helper_states (sin solape)."""
+
+	def col(var: str) -> _Columna:
+		if var not in cols:
+			cols[var] = _Columna.constante(MISSING, n)
+		return cols[var]
+
+	nat = np.datetime64("NaT", "D")
+
+	def a_dt64(var: str) -> Any:
+		return col(var).mapear(lambda v: (np.datetime64(d, "D") if (d := _parse_date(v)) is not None else nat), dtype="datetime64[D]")
+
+	fi = a_dt64("fecha_inicio")
+	fi_ok = ~np.isnat(fi)
+	dias_ok = col("duracion_estimdays").mascara(lambda v: isinstance(v, int))
+	dias = col("duracion_estimdays").mapear(lambda v: v if isinstance(v, int) else 0, dtype=np.int64)
+
+	# fecha_fin_estimada
+	ok = m & fi_ok & dias_ok
+	if ok.any():
+		fin = fi[ok] + dias[ok].astype("timedelta64[D]")
+		col("fecha_fin_estimada").asignar_valores(ok, np.datetime_as_string(fin, unit="D").astype(object))
+
+	# estado_certificado según adjunto + documento_legible
+	con_doc = m & col("documento_tipo").mascara(lambda v: v is not None)
+	if con_doc.any():
+		adj = col("adjunto_certificado").mascara(lambda v: bool(v))
+		ilegible = col("documento_legible").mascara(lambda v: v is False)
+		ec = col("estado_certificado")
+		ec.asignar(con_doc & adj & ilegible, "pendiente_revision")
+		ec.asignar(con_doc & adj & ~ilegible, "validado")
+		ec.asignar(con_doc & ~adj, "pendiente")
+
+	# fuera_de_termino
+	fr = a_dt64("fecha_recepcion")
+	# facts.get("plazo_cert_horas", 48): solo la clave ausente toma el default
+	plazo_col = col("plazo_cert_horas")
+	plazo_ok = plazo_col.mascara(lambda v: v is MISSING or isinstance(v, int), crudo=True)
+	plazo = plazo_col.mapear(lambda v: 48 if v is MISSING else (v if isinstance(v, int) else 0), dtype=np.int64, crudo=True)
+	ok = m & fi_ok & ~np.isnat(fr) & plazo_ok
+	if ok.any():
+		delta_h = (fr[ok] - fi[ok]).astype(np.int64) * 24
+		col("fuera_de_termino").asignar_valores(ok, (delta_h > plazo[ok]).astype(object))
+
+	# R-EST-02: estado final del aviso
+	ea = col("estado_aviso")
+	bloqueado = ea.mascara(lambda v: v in {"rechazado", "pendiente_validacion"})
+	m2 = m & ~bloqueado
+	art = col("motivo").mascara(lambda v: v == "art")
+	sin_estado = ea.mascara(lambda v: not v)
+	ea.asignar(m2 & art & sin_estado, "incompleto")
+	resto = m2 & ~art
+	requiere_doc = col("documento_tipo").mascara(lambda v: v is not None)
+	validado = col("estado_certificado").mascara(lambda v: v == "validado")
+	ea.asignar(resto & ~requiere_doc, "completo")
+	ea.asignar(resto & requiere_doc & validado, "completo")
+	ea.asignar(resto & requiere_doc & ~validado, "incompleto")
+
+
+def forward_chain_columns(
+	filas: list[dict[str, Any]],
+	*,
+	kb: KnowledgeBase | None = None,
+) -> ColumnarResult:
+	"""Evalúa la KB sobre filas de hechos en modo columnar.
+
+	Todas las filas deben tener las mismas claves (como las de un SELECT).
+	"""
+	kb = kb or get_knowledge_base()
+	n = len(filas)
+	claves = list(dict.fromkeys(k for f in filas for k in f))
+	datos = {k: [f.get(k, MISSING) for f in filas] for k in claves}
+	motivo = _soportado(kb, datos)
+	if motivo is not None:
+		logger.info("forward_chain_columnar: evaluando fila a fila (%s)", motivo)
+		return _FilasResult([r["facts"] for r in forward_chain_batch(filas)])
+	if n == 0:
+		return ColumnarResult(0, {}, 0)
+
+	cols: dict[str, Any] = {k: _Columna.desde_lista(v) for k, v in datos.items()}
+	rules: tuple[CompiledRule, ...] = kb.compiled
+	append_vars = {a.var for r in rules for a in r.actions if a.op == "append"}
+	for r in rules:
+		for var in list(r.reads) + list(r.writes):
+			if var not in cols:
+				cols[var] = _Columna.constante(MISSING, n)
+	listas = {v: _ColumnaLista(cols[v]) for v in append_vars}
+
+	disparadas = [np.zeros(n, dtype=bool) for _ in rules]
+	tokens = [np.zeros((len(r.reads), n), dtype=np.int32) for r in rules]
+	vivas = np.ones(n, dtype=bool)
+	paso = 0
+	pasadas = 0
+	while vivas.any():
+		if pasadas >= MAX_PASSES:
+			logger.warning("forward_chain_columnar: sin punto fijo tras %s pasadas", MAX_PASSES)
+			break
+		pasadas += 1
+		fired_any = np.zeros(n, dtype=bool)
+		for rule in rules:
+			mask = vivas.copy()
+			for c in rule.conditions:
+				mask &= cols[c.var].mascara(c.test)
+				if not mask.any():
+					break
+			if not mask.any():
+				continue
+			# Refracción: no redisparar si los valores leídos no cambiaron
+			tok = np.stack([cols[v].codigos for v in rule.reads]) if rule.reads else tokens[rule.index]
+			iguales = disparadas[rule.index] & (tok == tokens[rule.index]).all(axis=0)
+			mask &= ~iguales
+			if not mask.any():
+				continue
+			disparadas[rule.index] |= mask
+			tokens[rule.index][:, mask] = tok[:, mask]
+			for act in rule.actions:
+				if act.op == "append":
+					listas[act.var].append(mask, act.value, paso)
+					paso += 1
+				elif act.op == "set":
+					cols[act.var].asignar(mask, act.value)
+			if rule.actions:
+				fired_any |= mask
+		vivas = fired_any
+		if fired_any.any():
+			_derive_columnar(cols, fired_any, n)
+
+	salida: dict[str, Any] = {}
+	for k, col in cols.items():
+		salida[k] = listas.get(k, col)
+	return ColumnarResult(n, salida, pasadas)
+
+
+def forward_chain_columnar(query: Any = None, *, extra: dict[str, Any] | None = None) -> ColumnarResult:
+	"""Re-clasifica avisos en bloque a partir de un SELECT con columnas rotuladas.
+
+	- query: por defecto dao.query_hechos_avisos() (cada label es una variable).
+	- extra: hechos constantes para todas las filas (p. ej. {"plazo_cert_horas": 72}).
+	"""
+	from ..persistence.dao import query_hechos_avisos, session_scope
+
+	if query is None:
+		query = query_hechos_avisos()
+	with session_scope() as session:
+		filas = [_hechos_de_fila(dict(r)) | (extra or {}) for r in session.execute(query).mappings()]
+	return forward_chain_columns(filas)
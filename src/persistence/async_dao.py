@@ -0,0 +1,101 @@
+"""Equivalentes async del DAO para los handlers de aiohttp y aiogram.
+
+SQLite no tiene un driver async real (aiosqlite también usa un hilo por
+conexión), así que las funciones de dao.py se ejecutan en un pool de hilos
+acotado a DB_THREADS: el event loop no espera ninguna consulta y la base no
+recibe más conexiones simultáneas que hilos haya en el pool.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from ..config import settings
+from . import dao
+from .directory import employee_directory
+from .version import current_data_version, peek_data_version
+
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+	global _executor
+	with _executor_lock:
+		if _executor is None:
+			_executor = ThreadPoolExecutor(max_workers=settings.DB_THREADS, thread_name_prefix="db")
+		return _executor
+
+
+def shutdown(wait: bool = True) -> None:
+	"""Cierra el pool de hilos (se vuelve a crear con la próxima consulta)."""
+	global _executor
+	with _executor_lock:
+		executor, _executor = _executor, None
+	if executor is not None:
+		executor.shutdown(wait=wait)
+
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+	"""Ejecuta `fn(*args, **kwargs)` en el pool de la base y espera el resultado.
+
+	Con DB_THREADS=0 se ejecuta directamente (comportamiento síncrono anterior).
+	"""
+	if settings.DB_THREADS <= 0:
+		return fn(*args, **kwargs)
+	loop = asyncio.get_running_loop()
+	ctx = contextvars.copy_context()
+	return await loop.run_in_executor(_get_executor(), functools.partial(ctx.run, fn, *args, **kwargs))
+
+
+async def create_aviso(facts: dict[str, Any]) -> dict[str, Any]:
+	return await run_db(dao.create_aviso, facts)
+
+
+async def crear_aviso_simple(aviso_data: dict[str, Any]) -> dict[str, Any]:
+	return await run_db(dao.crear_aviso_simple, aviso_data)
+
+
+async def update_certificado(id_aviso: str, meta_doc: dict[str, Any]) -> dict[str, Any]:
+	return await run_db(dao.update_certificado, id_aviso, meta_doc)
+
+
+async def historial_empleado(legajo: str, limit: int = 10) -> list[dict[str, Any]]:
+	return await run_db(dao.historial_empleado, legajo, limit)
+
+
+async def get_aviso_status(id_aviso: str) -> Optional[dict[str, Any]]:
+	return await run_db(dao.get_aviso_status, id_aviso)
+
+
+def _lookup_employee(legajo: str) -> Optional[dict[str, Any]]:
+	record = employee_directory.lookup(legajo)
+	return record.as_dict() if record is not None else None
+
+
+async def get_employee(legajo: str) -> Optional[dict[str, Any]]:
+	"""Como dao.get_employee, resuelto con el EmployeeDirectory en memoria."""
+	return await run_db(_lookup_employee, legajo)
+
+
+async def get_certificado_path(id_aviso: str) -> Optional[str]:
+	return await run_db(dao.get_certificado_path, id_aviso)
+
+
+async def get_stats() -> dict[str, int]:
+	return await run_db(dao.get_stats)
+
+
+async def data_version() -> int:
+	"""current_data_version sin salir del loop mientras el valor cacheado esté vigente."""
+	version = peek_data_version()
+	if version is not None:
+		return version
+	return await run_db(current_data_version)
@@ -1,18 +1,23 @@
 from __future__ import annotations
 from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Iterator, Optional, Any, List
+from typing import Iterable, Iterator, Optional, Any, List
 
 from datetime import date, datetime, timedelta
 
-from sqlalchemy import create_engine, select, func
+from sqlalchemy import Integer, cast, select, func, update, Select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from ..config import settings
-from .models import Base, Employee, Aviso, Certificado
+from ..utils.intervals import SolapeIndex
+from .engine import build_engine
+from .models import Base, Employee, Aviso, AvisoSecuencia, Certificado
+from .queries import apply_stats_delta, nombre_provisional_de_observaciones, stats_contrib
+from . import version as _data_version  # noqa: F401  (registra los eventos de Session)
 
 
-_engine = create_engine(settings.DATABASE_URL, echo=False, future=True)
+_engine = build_engine(settings.DATABASE_URL)
 
 
 @contextmanager
@@ -30,11 +35,54 @@ def session_scope() -> Iterator[Session]:
 
 def _gen_id_aviso(session: Session, fecha: date) -> str:
 	"""Genera id_aviso con formato A-YYYYMMDD-#### (#### secuencial por día)."""
+	return reservar_ids_aviso(session, fecha, 1)[0]
+
+
+def _max_seq_existente(session: Session, prefix: str) -> int:
+	# Rango sobre la PK (no LIKE): solo se usa al crear la fila del día
+	sufijo = func.substr(Aviso.id_aviso, len(prefix) + 1)
+	q = (
+		select(func.max(cast(sufijo, Integer)))
+		.where(Aviso.id_aviso >= prefix)
+		.where(Aviso.id_aviso < prefix + "~")
+	)
+	return session.execute(q).scalar() or 0
+
+
+def reservar_ids_aviso(session: Session, fecha: date, n: int = 1) -> list[str]:
+	"""Reserva `n` id_aviso consecutivos del día dentro de la transacción de `session`.
+
+	El UPDATE sobre aviso_secuencias toma el lock de escritura antes de leer el
+	valor, así dos workers nunca obtienen el mismo número. La primera reserva del
+	día crea la fila partiendo del máximo existente en avisos; si otro worker la
+	creó en paralelo, se reintenta el UPDATE. Para importaciones masivas pedir
+	un bloque (n > 1) en una sola llamada.
+	"""
+	if n < 1:
+		raise ValueError("n debe ser >= 1")
 	prefix = fecha.strftime("A-%Y%m%d-")
-	q = select(func.count()).select_from(Aviso).where(Aviso.id_aviso.like(f"{prefix}%"))
-	n = session.execute(q).scalar_one()
-	seq = n + 1
-	return f"{prefix}{seq:04d}"
+	upd = (
+		update(AvisoSecuencia)
+		.where(AvisoSecuencia.fecha == fecha)
+		.values(ultimo=AvisoSecuencia.ultimo + n)
+		.execution_options(synchronize_session=False)
+	)
+	for _ in range(3):
+		if session.execute(upd).rowcount:
+			ultimo = session.execute(
+				select(AvisoSecuencia.ultimo).where(AvisoSecuencia.fecha == fecha)
+			).scalar_one()
+			break
+		try:
+			with session.begin_nested():
+				ultimo = _max_seq_existente(session, prefix) + n
+				session.add(AvisoSecuencia(fecha=fecha, ultimo=ultimo))
+			break
+		except IntegrityError:
+			continue
+	else:
+		raise RuntimeError(f"No se pudo reservar id_aviso para {fecha}")
+	return [f"{prefix}{seq:04d}" for seq in range(ultimo - n + 1, ultimo + 1)]
 
 
 def _to_date_iso(d: Any) -> date:
@@ -45,15 +93,70 @@ def _to_date_iso(d: Any) -> date:
 	raise ValueError("fecha inválida")
 
 
-def find_solape(session: Session, legajo: str, fecha_inicio: date, fecha_fin: date) -> Optional[Aviso]:
-	"""Busca un aviso que se solape para el mismo legajo y rango."""
-	q = (
-		select(Aviso)
+def _solape_query(legajo: str, fecha_inicio: date, fecha_fin: date) -> Select:
+	# Solo id_aviso: se resuelve con el índice cubriente ix_avisos_legajo_fechas
+	return (
+		select(Aviso.id_aviso)
 		.where(Aviso.legajo == legajo)
 		.where(~(Aviso.fecha_fin_estimada < fecha_inicio))
 		.where(~(Aviso.fecha_inicio > fecha_fin))
+		.limit(1)
+	)
+
+
+def build_solape_index(session: Session, legajos: Optional[Iterable[str]] = None) -> SolapeIndex[str]:
+	"""Carga (legajo, fecha_inicio, fecha_fin_estimada) → id_aviso en un índice por legajo.
+
+	Para validar muchos rangos contra la base sin una consulta por rango. El
+	índice es una foto: los avisos creados después no se reflejan.
+	"""
+	q = select(Aviso.legajo, Aviso.fecha_inicio, Aviso.fecha_fin_estimada, Aviso.id_aviso)
+	if legajos is not None:
+		q = q.where(Aviso.legajo.in_(list(legajos)))
+	return SolapeIndex(session.execute(q))
+
+
+def find_solape(
+	session: Session,
+	legajo: str,
+	fecha_inicio: date,
+	fecha_fin: date,
+	indice: Optional[SolapeIndex[str]] = None,
+) -> Optional[Aviso]:
+	"""Busca un aviso que se solape para el mismo legajo y rango.
+
+	Con `indice` (ver build_solape_index) la búsqueda es O(log n) en memoria.
+	"""
+	if indice is not None:
+		id_aviso = indice.find(legajo, fecha_inicio, fecha_fin)
+		return session.get(Aviso, id_aviso) if id_aviso is not None else None
+	id_aviso = session.execute(_solape_query(legajo, fecha_inicio, fecha_fin)).scalar()
+	return session.get(Aviso, id_aviso) if id_aviso is not None else None
+
+
+def query_hechos_avisos() -> Select:
+	"""Select de avisos con columnas rotuladas con nombres del glosario.
+
+	Pensado para re-clasificación masiva con el motor (una fila = un set de hechos).
+	Se puede filtrar con .where(...) antes de pasarlo a forward_chain_columnar.
+	"""
+	return (
+		select(
+			Aviso.id_aviso.label("id_aviso"),
+			Aviso.legajo.label("legajo"),
+			Employee.nombre.label("empleado_nombre"),
+			Employee.area.label("area"),
+			Aviso.motivo.label("motivo"),
+			Aviso.fecha_inicio.label("fecha_inicio"),
+			Aviso.duracion_estimdays.label("duracion_estimdays"),
+			Aviso.adjunto.label("adjunto_certificado"),
+			Certificado.valido.label("documento_legible"),
+			Certificado.recibido_en.label("fecha_recepcion"),
+		)
+		.outerjoin(Employee, Aviso.legajo == Employee.legajo)
+		.outerjoin(Certificado, Certificado.id_aviso == Aviso.id_aviso)
+		.order_by(Aviso.id_aviso)
 	)
-	return session.execute(q).scalars().first()
 
 
 def create_aviso(facts: dict[str, Any]) -> dict[str, Any]:
@@ -88,6 +191,7 @@ def create_aviso(facts: dict[str, Any]) -> dict[str, Any]:
 			adjunto=bool(facts.get("adjunto", False)),
 		)
 		session.add(av)
+		apply_stats_delta(session, None, stats_contrib(av.estado_aviso, av.estado_certificado, session.get(Employee, av.legajo)))
 		return {"id_aviso": id_aviso}
 
 
@@ -102,6 +206,8 @@ def update_certificado(id_aviso: str, meta_doc: dict[str, Any]) -> dict[str, Any
 		av = session.execute(select(Aviso).where(Aviso.id_aviso == id_aviso)).scalars().first()
 		if not av:
 			raise ValueError("id_aviso inexistente")
+		empleado = session.get(Employee, av.legajo)
+		stats_antes = stats_contrib(av.estado_aviso, av.estado_certificado, empleado)
 		# Upsert de certificado
 		cert = session.execute(select(Certificado).where(Certificado.id_aviso == id_aviso)).scalars().first()
 		if not cert:
@@ -142,6 +248,7 @@ def update_certificado(id_aviso: str, meta_doc: dict[str, Any]) -> dict[str, Any
 			av.estado_aviso = "completo"
 		else:
 			av.estado_aviso = "incompleto"
+		apply_stats_delta(session, stats_antes, stats_contrib(av.estado_aviso, av.estado_certificado, empleado))
 		return {
 			"estado_aviso": av.estado_aviso,
 			"estado_certificado": av.estado_certificado,
@@ -150,16 +257,20 @@ def update_certificado(id_aviso: str, meta_doc: dict[str, Any]) -> dict[str, Any
 		}
 
 
+def _historial_query(legajo: str, limit: int) -> Select:
+	# Usa ix_avisos_legajo_created_at (sin ordenamiento temporal)
+	return (
+		select(Aviso)
+		.where(Aviso.legajo == legajo)
+		.order_by(Aviso.created_at.desc())
+		.limit(limit)
+	)
+
+
 def historial_empleado(legajo: str, limit: int = 10) -> list[dict[str, Any]]:
 	"""Devuelve últimos avisos de un legajo (máx. limit)."""
 	with session_scope() as session:
-		q = (
-			select(Aviso)
-			.where(Aviso.legajo == str(legajo))
-			.order_by(Aviso.created_at.desc())
-			.limit(limit)
-		)
-		rows = session.execute(q).scalars().all()
+		rows = session.execute(_historial_query(str(legajo), limit)).scalars().all()
 		return [
 			{
 				"id_aviso": r.id_aviso,
@@ -188,6 +299,41 @@ def get_aviso_status(id_aviso: str) -> Optional[dict[str, Any]]:
 		}
 
 
+def get_employee(legajo: str) -> Optional[dict[str, Any]]:
+	"""Datos básicos de un empleado por legajo (None si no existe)."""
+	with session_scope() as session:
+		emp = session.get(Employee, str(legajo))
+		if not emp:
+			return None
+		return {"legajo": emp.legajo, "nombre": emp.nombre, "area": emp.area, "puesto": emp.puesto}
+
+
+def set_certificado_archivo_path(id_aviso: str, archivo_path: str) -> bool:
+	"""Reemplaza la ruta del certificado (p. ej. spool local -> link de Drive); False si no hay certificado."""
+	with session_scope() as session:
+		cert = session.execute(select(Certificado).where(Certificado.id_aviso == id_aviso)).scalars().first()
+		if cert is None:
+			return False
+		cert.archivo_path = str(archivo_path)[:255]
+		return True
+
+
+def get_certificado_path(id_aviso: str) -> Optional[str]:
+	"""Ruta (o link) del archivo del certificado de un aviso, si fue adjuntado."""
+	with session_scope() as session:
+		return session.execute(
+			select(Certificado.archivo_path).where(Certificado.id_aviso == id_aviso)
+		).scalars().first()
+
+
+def get_stats() -> dict[str, int]:
+	"""Métricas del dashboard (ver queries.fetch_stats)."""
+	from .queries import fetch_stats
+
+	with session_scope() as session:
+		return fetch_stats(session)
+
+
 def crear_aviso_simple(aviso_data: dict[str, Any]) -> dict[str, Any]:
 	"""Crea un aviso de ausencia de forma simple para el nuevo flujo."""
 	try:
@@ -221,6 +367,7 @@ def crear_aviso_simple(aviso_data: dict[str, Any]) -> dict[str, Any]:
 					documento_tipo = "certificado_medico"
 			
 			# Crear aviso
+			observaciones = f"Legajo {'PROVISIONAL - ' + nombre_provisional + ' - validar con RRHH' if legajo_provisional else 'verificado'}"
 			aviso = Aviso(
 				id_aviso=id_aviso,
 				legajo=legajo,
@@ -232,7 +379,8 @@ def crear_aviso_simple(aviso_data: dict[str, Any]) -> dict[str, Any]:
 				adjunto=bool(certificado_path),
 				estado_aviso="incompleto" if requiere_certificado and not certificado_path else "completo",
 				estado_certificado="pendiente" if requiere_certificado and not certificado_path else None,
-				observaciones=f"Legajo {'PROVISIONAL - ' + nombre_provisional + ' - validar con RRHH' if legajo_provisional else 'verificado'}",
+				observaciones=observaciones,
+				nombre_provisional=nombre_provisional_de_observaciones(observaciones) or None,
 				telegram_user_id=telegram_user_id
 			)
 			
@@ -254,6 +402,8 @@ def crear_aviso_simple(aviso_data: dict[str, Any]) -> dict[str, Any]:
 				aviso.estado_certificado = "validado"
 				aviso.estado_aviso = "completo"
 			
+			apply_stats_delta(session, None, stats_contrib(aviso.estado_aviso, aviso.estado_certificado, session.get(Employee, legajo)))
+			
 			return {
 				"success": True,
 				"id_aviso": id_aviso,
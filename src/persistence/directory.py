@@ -0,0 +1,162 @@
+"""Directorio de empleados en memoria: lookup O(1) por legajo sin ir a la base.
+
+Carga employees una vez en un dict legajo -> EmployeeRecord (__slots__) y se
+mantiene al día de forma incremental: cuando cambia la versión de datos
+(data_version, también para escrituras de otros procesos) trae solo las filas
+con updated_at >= la marca de agua. Si la cantidad de filas no coincide (bajas)
+recarga todo.
+
+Las ediciones por SQL directo (fuera de las sesiones de la aplicación) no suben
+data_version ni updated_at, así que no se detectan: después de modificar
+employees de esa forma hay que llamar a refresh(full=True).
+"""
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import func, select
+
+from ..utils.name_index import NameIndex
+from .models import Employee
+from .version import current_data_version
+
+
+class EmployeeRecord:
+	__slots__ = ("legajo", "nombre", "area", "puesto", "activo")
+
+	def __init__(self, legajo: str, nombre: Optional[str], area: Optional[str], puesto: Optional[str], activo: Optional[bool]) -> None:
+		self.legajo = legajo
+		self.nombre = nombre
+		self.area = area
+		self.puesto = puesto
+		self.activo = activo
+
+	def __repr__(self) -> str:
+		return f"EmployeeRecord({self.legajo!r}, {self.nombre!r})"
+
+	@property
+	def requiere_validacion(self) -> bool:
+		"""Sin nombre o sin área (misma regla que queries.requiere_validacion_expr)."""
+		return not self.nombre or not self.area
+
+	def as_dict(self) -> dict[str, Any]:
+		return {"legajo": self.legajo, "nombre": self.nombre, "area": self.area, "puesto": self.puesto}
+
+
+_COLUMNS = (Employee.legajo, Employee.nombre, Employee.area, Employee.puesto, Employee.activo, Employee.updated_at)
+
+
+class EmployeeDirectory:
+	def __init__(self) -> None:
+		self._records: dict[str, EmployeeRecord] = {}
+		self._watermark: Optional[datetime] = None
+		self._version: Optional[int] = None
+		self._lock = threading.Lock()
+		# Cambia cuando un registro nuevo o su nombre/estado cambian: invalida el índice de nombres
+		self._revision = 0
+		self._name_index: Optional[NameIndex[EmployeeRecord]] = None
+		self._name_index_revision = -1
+		self.hits = 0
+		self.misses = 0
+		self.refreshes = 0
+		self.full_loads = 0
+
+	def __len__(self) -> int:
+		return len(self._records)
+
+	def _load(self, rows: Iterable[Any]) -> None:
+		for legajo, nombre, area, puesto, activo, updated_at in rows:
+			actual = self._records.get(legajo)
+			if actual is not None and (actual.nombre, actual.activo) == (nombre, activo):
+				# Nada que cambie el índice de nombres (p. ej. la fila de la marca de agua, que
+				# vuelve en cada refresco): se actualiza en lugar y el índice se reutiliza
+				actual.area, actual.puesto = area, puesto
+			else:
+				self._records[legajo] = EmployeeRecord(legajo, nombre, area, puesto, activo)
+				self._revision += 1
+			if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+				self._watermark = updated_at
+
+	def _full_load(self, session: Any) -> None:
+		# Dict nuevo: quien tenga el anterior (snapshot) sigue leyendo uno consistente
+		self._records, self._watermark = {}, None
+		self._revision += 1
+		self._load(session.execute(select(*_COLUMNS)))
+		self.full_loads += 1
+
+	def refresh(self, full: bool = False) -> None:
+		"""Sincroniza con la base: incremental por updated_at, o completa si `full`."""
+		from .dao import session_scope
+
+		with self._lock:
+			version = current_data_version()
+			with session_scope() as session:
+				if full or self._version is None:
+					self._full_load(session)
+				else:
+					# >= : filas escritas en el mismo instante que la marca no se pierden
+					query = select(*_COLUMNS)
+					if self._watermark is not None:
+						query = query.where(Employee.updated_at >= self._watermark)
+					self._load(session.execute(query))
+					total = session.execute(select(func.count()).select_from(Employee)).scalar() or 0
+					if total != len(self._records):
+						self._full_load(session)
+			self._version = version
+			self.refreshes += 1
+
+	def _ensure_fresh(self) -> None:
+		# current_data_version está cacheada (DATA_VERSION_TTL): casi siempre sin consulta
+		if self._version is None or current_data_version() != self._version:
+			self.refresh()
+
+	def lookup(self, legajo: str) -> Optional[EmployeeRecord]:
+		self._ensure_fresh()
+		record = self._records.get(str(legajo))
+		if record is None:
+			self.misses += 1
+		else:
+			self.hits += 1
+		return record
+
+	def snapshot(self) -> dict[str, EmployeeRecord]:
+		"""Dict legajo -> registro, para resolver muchas filas sin pasar por lookup (solo lectura)."""
+		self._ensure_fresh()
+		return self._records
+
+	def name_index(self) -> NameIndex[EmployeeRecord]:
+		"""Índice de nombres de empleados activos; se reconstruye solo si hubo cambios."""
+		self._ensure_fresh()
+		with self._lock:
+			if self._name_index is None or self._name_index_revision != self._revision:
+				self._name_index = NameIndex(
+					(r.nombre, r) for r in self._records.values() if r.nombre and r.activo is not False
+				)
+				self._name_index_revision = self._revision
+			return self._name_index
+
+	def suggest(self, nombre: str, k: int = 3, score_cutoff: float = 80.0) -> list[tuple[EmployeeRecord, float]]:
+		"""Empleados cuyo nombre se parece a `nombre` (para no crear un legajo provisional)."""
+		return [(record, score) for record, _nombre, score in self.name_index().search(nombre, k, score_cutoff)]
+
+	def clear(self) -> None:
+		with self._lock:
+			self._records, self._watermark, self._version = {}, None, None
+			self._revision += 1
+
+	def stats(self) -> dict[str, Any]:
+		total = self.hits + self.misses
+		return {
+			"size": len(self._records),
+			"hits": self.hits,
+			"misses": self.misses,
+			"hit_rate": round(self.hits / total, 4) if total else 0.0,
+			"refreshes": self.refreshes,
+			"full_loads": self.full_loads,
+			"watermark": self._watermark.isoformat() if self._watermark else None,
+		}
+
+
+employee_directory = EmployeeDirectory()
@@ -0,0 +1,98 @@
+"""Creación del Engine con pool y PRAGMAs de SQLite configurables (ver Settings.DB_* / SQLITE_*).
+
+En SQLite cada conexión nueva recibe journal_mode=WAL (lectores y un escritor
+sin bloquearse entre bot, recordatorios y dashboard), synchronous=NORMAL
+(seguro con WAL), busy_timeout (espera en vez de "database is locked"),
+mmap_size y cache_size. En Postgres aplican pool_pre_ping y pool_recycle.
+"""
+from __future__ import annotations
+
+import threading
+import weakref
+from typing import Any
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+from ..config import settings
+
+
+_counters_lock = threading.Lock()
+# Contadores acumulados por engine (conexiones abiertas, checkouts del pool)
+_counters: "weakref.WeakKeyDictionary[Engine, dict[str, int]]" = weakref.WeakKeyDictionary()
+
+
+def _is_sqlite_memory(url: Any) -> bool:
+	database = url.database or ""
+	return database in ("", ":memory:") or "mode=memory" in str(url)
+
+
+def sqlite_pragmas() -> dict[str, Any]:
+	"""PRAGMAs aplicados a cada conexión SQLite, en orden."""
+	return {
+		"journal_mode": settings.SQLITE_JOURNAL_MODE,
+		"synchronous": settings.SQLITE_SYNCHRONOUS,
+		"busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+		"mmap_size": settings.SQLITE_MMAP_SIZE,
+		"cache_size": settings.SQLITE_CACHE_SIZE,
+	}
+
+
+def build_engine(database_url: str) -> Engine:
+	url = make_url(database_url)
+	kwargs: dict[str, Any] = {"echo": False, "future": True}
+	sqlite = url.get_backend_name() == "sqlite"
+	memory = sqlite and _is_sqlite_memory(url)
+	if not memory:
+		# En memoria SQLAlchemy usa un pool de una conexión: no admite tamaño
+		kwargs.update(
+			poolclass=QueuePool,
+			pool_size=settings.DB_POOL_SIZE,
+			max_overflow=settings.DB_MAX_OVERFLOW,
+			pool_timeout=settings.DB_POOL_TIMEOUT,
+			pool_recycle=settings.DB_POOL_RECYCLE,
+			pool_pre_ping=settings.DB_POOL_PRE_PING,
+		)
+	engine = create_engine(url, **kwargs)
+	counters = _counters[engine] = {"connects": 0, "checkouts": 0}
+
+	@event.listens_for(engine, "connect")
+	def _on_connect(dbapi_conn: Any, _record: Any) -> None:
+		with _counters_lock:
+			counters["connects"] += 1
+		if not sqlite:
+			return
+		cursor = dbapi_conn.cursor()
+		try:
+			for pragma, value in sqlite_pragmas().items():
+				if pragma == "journal_mode" and memory:
+					continue
+				cursor.execute(f"PRAGMA {pragma}={value}")
+		finally:
+			cursor.close()
+
+	@event.listens_for(engine, "checkout")
+	def _on_checkout(*_args: Any) -> None:
+		with _counters_lock:
+			counters["checkouts"] += 1
+
+	return engine
+
+
+def pool_status(engine: Engine) -> dict[str, Any]:
+	"""Estado del pool para /health: ocupación actual y contadores acumulados."""
+	pool = engine.pool
+	status: dict[str, Any] = {"pool": type(pool).__name__, "dialect": engine.dialect.name}
+	if isinstance(pool, QueuePool):
+		status.update(
+			size=pool.size(),
+			checked_in=pool.checkedin(),
+			checked_out=pool.checkedout(),
+			overflow=pool.overflow(),
+			max_overflow=settings.DB_MAX_OVERFLOW,
+			timeout=pool.timeout(),
+		)
+	with _counters_lock:
+		status.update(_counters.get(engine, {}))
+	return status
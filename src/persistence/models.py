@@ -1,7 +1,7 @@
 from __future__ import annotations
 from typing import Optional
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Integer, Date, Boolean, Text, DateTime, JSON, ForeignKey
+from sqlalchemy import String, Integer, Date, Boolean, Text, DateTime, JSON, ForeignKey, Index, LargeBinary
 from datetime import datetime, date
 
 
@@ -20,10 +20,30 @@ class Employee(Base):
 	fecha_ingreso: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
 	turno: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
 	activo: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+	# Marca de cambio para la recarga incremental de EmployeeDirectory
+	updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
+
+	__table_args__ = (
+		Index("ix_employees_updated_at", "updated_at"),
+	)
 
 
 class Aviso(Base):
 	__tablename__ = "avisos"
+	__table_args__ = (
+		# find_solape: legajo + rango de fechas; id_aviso al final para que sea cubriente
+		Index("ix_avisos_legajo_fechas", "legajo", "fecha_inicio", "fecha_fin_estimada", "id_aviso"),
+		# historial_empleado: últimos avisos por legajo
+		Index("ix_avisos_legajo_created_at", "legajo", "created_at"),
+		# Filtros de /api/ausencias y conteos de /api/stats; created_at evita ordenar
+		# en memoria el listado filtrado por estado (ORDER BY created_at DESC LIMIT n)
+		Index("ix_avisos_estado_aviso", "estado_aviso", "created_at"),
+		Index("ix_avisos_estado_certificado", "estado_certificado"),
+		Index("ix_avisos_motivo", "motivo"),
+		Index("ix_avisos_fecha_inicio", "fecha_inicio"),
+		# Paginación keyset de /api/ausencias sin filtros
+		Index("ix_avisos_created_at_id", "created_at", "id_aviso"),
+	)
 
 	# id_aviso como PK textual
 	id_aviso: Mapped[str] = mapped_column(String(64), primary_key=True)
@@ -39,12 +59,22 @@ class Aviso(Base):
 	fuera_de_termino: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
 	adjunto: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
 	observaciones: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+	# Nombre informado para legajos provisionales (ya capitalizado, para el dashboard)
+	nombre_provisional: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
 	created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 	# Campos para sistema de recordatorios
 	recordatorio_22h_enviado: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
 	telegram_user_id: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
 
 
+class AvisoSecuencia(Base):
+	__tablename__ = "aviso_secuencias"
+
+	# Último número asignado por día para id_aviso (A-YYYYMMDD-####)
+	fecha: Mapped[date] = mapped_column(Date, primary_key=True)
+	ultimo: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
 class Certificado(Base):
 	__tablename__ = "certificados"
 
@@ -58,6 +88,42 @@ class Certificado(Base):
 	created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
 
+class EstadisticasAvisos(Base):
+	__tablename__ = "estadisticas_avisos"
+
+	# Fila única (id=1) con las métricas de /api/stats, mantenida por delta
+	id: Mapped[int] = mapped_column(Integer, primary_key=True)
+	total_ausencias: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+	ausencias_activas: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+	requieren_validacion: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+	certificados_pendientes: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+	completadas: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+	alta_prioridad: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+	actualizado_en: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class DataVersion(Base):
+	__tablename__ = "data_version"
+
+	# Fila única (id=1): se incrementa en cada commit que toca avisos/certificados/empleados
+	id: Mapped[int] = mapped_column(Integer, primary_key=True)
+	version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+	actualizado_en: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class SesionBot(Base):
+	__tablename__ = "sesiones_bot"
+	__table_args__ = (
+		# Purga de conversaciones abandonadas
+		Index("ix_sesiones_bot_actualizado_en", "actualizado_en"),
+	)
+
+	# Estado de conversación de session_store: clave "<espacio>:<chat id>", datos serializados compactos
+	clave: Mapped[str] = mapped_column(String(100), primary_key=True)
+	datos: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+	actualizado_en: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 class Notificacion(Base):
 	__tablename__ = "notificaciones"
 
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import Boolean, and_, case, delete, func, literal, or_, select, type_coerce, update, Select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from .models import Aviso, Employee, EstadisticasAvisos
+
+
+STATS_KEYS = (
+	"total_ausencias",
+	"ausencias_activas",
+	"requieren_validacion",
+	"certificados_pendientes",
+	"completadas",
+	"alta_prioridad",
+)
+
+CERT_PENDIENTES = ("pendiente", "en_revision")
+
+
+def stats_query() -> Select:
+	"""Las seis métricas de /api/stats en un solo recorrido (SUM de CASE)."""
+	requiere_validacion = or_(Employee.legajo.is_(None), Employee.nombre.is_(None), Employee.area.is_(None))
+	cert_pendiente = Aviso.estado_certificado.in_(CERT_PENDIENTES)
+
+	def contar(cond: Any) -> Any:
+		return func.coalesce(func.sum(case((cond, 1), else_=0)), 0)
+
+	return (
+		select(
+			func.count().label("total_ausencias"),
+			contar(Aviso.estado_aviso != "completo").label("ausencias_activas"),
+			contar(requiere_validacion).label("requieren_validacion"),
+			contar(cert_pendiente).label("certificados_pendientes"),
+			contar(Aviso.estado_aviso == "completo").label("completadas"),
+			contar(requiere_validacion & cert_pendiente).label("alta_prioridad"),
+		)
+		.select_from(Aviso)
+		.outerjoin(Employee, Aviso.legajo == Employee.legajo)
+	)
+
+
+def compute_stats(session: Session) -> dict[str, int]:
+	row = session.execute(stats_query()).one()
+	return {k: int(getattr(row, k) or 0) for k in STATS_KEYS}
+
+
+def stats_contrib(estado_aviso: Optional[str], estado_certificado: Optional[str], empleado: Optional[Employee]) -> dict[str, int]:
+	"""Aporte de un aviso a cada métrica (misma lógica que stats_query, NULL no cuenta)."""
+	valida = empleado is None or empleado.nombre is None or empleado.area is None
+	cert_pendiente = estado_certificado in CERT_PENDIENTES
+	return {
+		"total_ausencias": 1,
+		"ausencias_activas": int(estado_aviso is not None and estado_aviso != "completo"),
+		"requieren_validacion": int(valida),
+		"certificados_pendientes": int(cert_pendiente),
+		"completadas": int(estado_aviso == "completo"),
+		"alta_prioridad": int(valida and cert_pendiente),
+	}
+
+
+def apply_stats_delta(session: Session, before: Optional[dict[str, int]], after: Optional[dict[str, int]]) -> None:
+	"""Suma after - before a la fila materializada (si está habilitada y existe).
+
+	UPDATE col = col + delta es atómico: no hace falta leer la fila.
+	"""
+	if not settings.STATS_MATERIALIZED:
+		return
+	delta = {k: (after or {}).get(k, 0) - (before or {}).get(k, 0) for k in STATS_KEYS}
+	valores = {k: getattr(EstadisticasAvisos, k) + v for k, v in delta.items() if v}
+	if not valores:
+		return
+	# Si la fila no existe todavía, la primera lectura la reconstruye completa
+	session.execute(
+		update(EstadisticasAvisos)
+		.where(EstadisticasAvisos.id == 1)
+		.values(**valores, actualizado_en=datetime.utcnow())
+		.execution_options(synchronize_session=False)
+	)
+
+
+def invalidate_stats(session: Session) -> None:
+	"""Descarta la fila materializada (la próxima lectura la reconstruye).
+
+	La usa version.py en la transacción de escrituras sin delta: cambios de
+	empleados, avisos eliminados e INSERT/UPDATE/DELETE masivos.
+	"""
+	if settings.STATS_MATERIALIZED:
+		session.execute(
+			delete(EstadisticasAvisos).where(EstadisticasAvisos.id == 1).execution_options(synchronize_session=False)
+		)
+
+
+def rebuild_stats(session: Session) -> dict[str, int]:
+	"""Recalcula la tabla materializada desde avisos (primera lectura tras invalidate_stats)."""
+	# El DELETE toma el lock de escritura antes del recuento: ningún delta se pierde
+	session.execute(delete(EstadisticasAvisos).where(EstadisticasAvisos.id == 1))
+	stats = compute_stats(session)
+	try:
+		with session.begin_nested():
+			session.add(EstadisticasAvisos(id=1, actualizado_en=datetime.utcnow(), **stats))
+	except IntegrityError:
+		pass
+	return stats
+
+
+def fetch_stats(session: Session) -> dict[str, int]:
+	"""Métricas del dashboard: tabla materializada si STATS_MATERIALIZED, sino agregado en vivo."""
+	if not settings.STATS_MATERIALIZED:
+		return compute_stats(session)
+	row = session.get(EstadisticasAvisos, 1, populate_existing=True)
+	if row is None:
+		return rebuild_stats(session)
+	return {k: int(getattr(row, k)) for k in STATS_KEYS}
+
+
+# Página máxima de /api/ausencias (el cliente puede pedir menos, nunca más)
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(created_at: datetime, id_aviso: str, rango: Optional[int] = None) -> str:
+	"""Token opaco (base64url) con la clave (created_at, id_aviso[, rango]) de la última fila."""
+	clave: list[Any] = [created_at.isoformat(), id_aviso]
+	if rango is not None:
+		clave.append(int(rango))
+	raw = json.dumps(clave, separators=(",", ":")).encode("utf-8")
+	return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple[Any, ...]:
+	"""Inversa de encode_cursor; ValueError si el token no es válido."""
+	try:
+		raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+		clave = json.loads(raw)
+		if len(clave) == 3:
+			return datetime.fromisoformat(clave[0]), str(clave[1]), int(clave[2])
+		ts, id_aviso = clave
+		return datetime.fromisoformat(ts), str(id_aviso)
+	except Exception as e:
+		raise ValueError("cursor inválido") from e
+
+
+def keyset_page(query: Select, cursor: Optional[tuple[Any, ...]], limit: int, rango: Any = None) -> Select:
+	"""Ordena por (created_at, id_aviso) DESC y se posiciona después de `cursor`.
+
+	Con `rango` (p. ej. prioridad_rango_expr()) ese criterio va primero, ASC, y
+	el cursor lleva su valor. Pide limit + 1 filas: si vuelve la extra, hay
+	página siguiente. Sin rango, created_at <= c va aparte para que SQLite haga
+	un seek por el índice.
+	"""
+	if cursor is not None:
+		ts, id_aviso = cursor[0], cursor[1]
+		despues = or_(Aviso.created_at < ts, and_(Aviso.created_at == ts, Aviso.id_aviso < id_aviso))
+		if rango is None:
+			query = query.where(Aviso.created_at <= ts).where(despues)
+		else:
+			r = cursor[2] if len(cursor) > 2 else 0
+			query = query.where(or_(rango > r, and_(rango == r, despues)))
+	orden = [Aviso.created_at.desc(), Aviso.id_aviso.desc()]
+	if rango is not None:
+		orden.insert(0, rango.asc())
+	return query.order_by(*orden).limit(limit + 1)
+
+
+# --- Campos derivados del dashboard, calculados en SQL -----------------------
+
+def requiere_validacion_expr() -> Any:
+	"""Empleado inexistente o sin nombre/área (vacío cuenta como faltante)."""
+	return or_(
+		Employee.legajo.is_(None),
+		func.coalesce(Employee.nombre, "") == "",
+		func.coalesce(Employee.area, "") == "",
+	)
+
+
+def prioridad_expr() -> Any:
+	return case(
+		(requiere_validacion_expr(), "alta"),
+		(Aviso.estado_aviso == "completo", "baja"),
+		else_="media",
+	)
+
+
+def prioridad_rango_expr() -> Any:
+	"""0 = alta, 1 = media, 2 = baja (para ordenar por prioridad)."""
+	return case(
+		(requiere_validacion_expr(), 0),
+		(Aviso.estado_aviso == "completo", 2),
+		else_=1,
+	)
+
+
+def accion_requerida_expr() -> Any:
+	return case(
+		(requiere_validacion_expr(), "Validar empleado"),
+		(Aviso.estado_certificado.in_(CERT_PENDIENTES), "Revisar certificado"),
+		(Aviso.estado_aviso == "pendiente", "Seguimiento"),
+		else_="Sin acción",
+	)
+
+
+def ausencias_select() -> Select:
+	"""Filas de /api/ausencias listas para serializar (Aviso LEFT JOIN Employee).
+
+	Sin entidades ORM: cada fila trae las columnas ya con los valores por defecto
+	y campos derivados del dashboard.
+	"""
+	sin_empleado = Employee.legajo.is_(None)
+	return (
+		select(
+			Aviso.id_aviso.label("id_aviso"),
+			Aviso.legajo.label("legajo"),
+			case(
+				(~sin_empleado, Employee.nombre),
+				(func.coalesce(Aviso.nombre_provisional, "") != "", Aviso.nombre_provisional),
+				else_=literal("No encontrado"),
+			).label("nombre_empleado"),
+			case((sin_empleado, literal("N/A")), else_=Employee.area).label("area"),
+			case((sin_empleado, literal("N/A")), else_=Employee.puesto).label("puesto"),
+			Aviso.motivo.label("motivo"),
+			Aviso.fecha_inicio.label("fecha_inicio"),
+			Aviso.duracion_estimdays.label("dias_estimados"),
+			Aviso.fecha_fin_estimada.label("fecha_fin_estimada"),
+			func.coalesce(Aviso.estado_aviso, "pendiente").label("estado_aviso"),
+			func.coalesce(Aviso.estado_certificado, "N/A").label("estado_certificado"),
+			type_coerce(case((requiere_validacion_expr(), True), else_=False), Boolean).label("requiere_validacion_rrhh"),
+			prioridad_expr().label("prioridad"),
+			accion_requerida_expr().label("accion_requerida"),
+			Aviso.created_at.label("fecha_creacion"),
+			func.coalesce(Aviso.observaciones, "").label("observaciones"),
+		)
+		.select_from(Aviso)
+		.outerjoin(Employee, Aviso.legajo == Employee.legajo)
+	)
+
+
+def nombre_provisional_de_observaciones(observaciones: Optional[str]) -> str:
+	"""Formato heredado: "Legajo PROVISIONAL - juan carlos pérez - validar con RRHH"."""
+	if observaciones and "PROVISIONAL -" in observaciones:
+		parts = observaciones.split(" - ")
+		if len(parts) >= 2:
+			return parts[1].title()
+	return ""
+
+
+def avisos_select() -> Select:
+	"""Columnas de Aviso para armar las filas de ausencias_select sin JOIN.
+
+	Los datos del empleado y los campos derivados los completa fila_ausencia
+	con el EmployeeDirectory en memoria.
+	"""
+	return select(
+		Aviso.id_aviso.label("id_aviso"),
+		Aviso.legajo.label("legajo"),
+		Aviso.nombre_provisional.label("nombre_provisional"),
+		Aviso.motivo.label("motivo"),
+		Aviso.fecha_inicio.label("fecha_inicio"),
+		Aviso.duracion_estimdays.label("dias_estimados"),
+		Aviso.fecha_fin_estimada.label("fecha_fin_estimada"),
+		Aviso.estado_aviso.label("estado_aviso"),
+		Aviso.estado_certificado.label("estado_certificado"),
+		Aviso.created_at.label("fecha_creacion"),
+		Aviso.observaciones.label("observaciones"),
+	).select_from(Aviso)
+
+
+def fila_ausencia(row: Any, empleado: Any) -> dict[str, Any]:
+	"""Fila de avisos_select + empleado (None si no existe) -> misma fila que ausencias_select."""
+	valida = empleado is None or not empleado.nombre or not empleado.area
+	if valida:
+		prioridad = "alta"
+		accion = "Validar empleado"
+	else:
+		prioridad = "baja" if row.estado_aviso == "completo" else "media"
+		if row.estado_certificado in CERT_PENDIENTES:
+			accion = "Revisar certificado"
+		elif row.estado_aviso == "pendiente":
+			accion = "Seguimiento"
+		else:
+			accion = "Sin acción"
+	if empleado is not None:
+		nombre, area, puesto = empleado.nombre, empleado.area, empleado.puesto
+	else:
+		nombre, area, puesto = row.nombre_provisional or "No encontrado", "N/A", "N/A"
+	return {
+		"id_aviso": row.id_aviso,
+		"legajo": row.legajo,
+		"nombre_empleado": nombre,
+		"area": area,
+		"puesto": puesto,
+		"motivo": row.motivo,
+		"fecha_inicio": row.fecha_inicio,
+		"dias_estimados": row.dias_estimados,
+		"fecha_fin_estimada": row.fecha_fin_estimada,
+		"estado_aviso": row.estado_aviso if row.estado_aviso is not None else "pendiente",
+		"estado_certificado": row.estado_certificado if row.estado_certificado is not None else "N/A",
+		"requiere_validacion_rrhh": valida,
+		"prioridad": prioridad,
+		"accion_requerida": accion,
+		"fecha_creacion": row.fecha_creacion,
+		"observaciones": row.observaciones or "",
+	}
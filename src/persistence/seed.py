@@ -1,8 +1,11 @@
 from __future__ import annotations
+import threading
+import weakref
 from random import choice, randint
 
 from .models import Base, Employee
 from .dao import session_scope, _engine
+from .queries import nombre_provisional_de_observaciones
 from sqlalchemy import text
 
 try:
@@ -11,11 +14,26 @@ except Exception:  # pragma: no cover - Faker puede no estar instalado antes de
 	Faker = None  # type: ignore
 
 
-def ensure_schema() -> None:
+# Engines cuyo esquema ya se verificó en este proceso
+_schema_verified: "weakref.WeakSet" = weakref.WeakSet()
+_schema_lock = threading.Lock()
+
+
+def ensure_schema(force: bool = False) -> None:
 	"""Crea tablas si no existen y agrega columnas faltantes para el nuevo esquema.
 
-	Diseñado para SQLite sin migraciones complejas.
+	Diseñado para SQLite sin migraciones complejas. Se ejecuta una vez por
+	engine y proceso (al arrancar bot / dashboard); las llamadas siguientes no
+	tocan la base. `force=True` vuelve a verificar (p. ej. tras cambios
+	manuales del esquema).
 	"""
+	with _schema_lock:
+		if force or _engine not in _schema_verified:
+			_migrate_schema()
+			_schema_verified.add(_engine)
+
+
+def _migrate_schema() -> None:
 	Base.metadata.create_all(bind=_engine)
 	with _engine.begin() as conn:
 		def existing_columns(table: str) -> set[str]:
@@ -35,15 +53,20 @@ def ensure_schema() -> None:
 			"fecha_ingreso DATE",
 			"turno TEXT",
 			"activo BOOLEAN DEFAULT 1",
+			"updated_at DATETIME",
 		):
 			add_column_if_missing("employees", coldef)
+		# Filas previas a updated_at: marcarlas para que la recarga incremental no las repita
+		conn.exec_driver_sql("UPDATE employees SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
 
 		# avisos: aseguramos columnas modernas y eliminamos dependencia de fecha_fin_estimada
 		for coldef in (
 			"fecha_fin DATE",
 			"adjunto BOOLEAN DEFAULT 0",
+			"nombre_provisional TEXT",
 		):
 			add_column_if_missing("avisos", coldef)
+		backfill_nombre_provisional(conn)
 		# Si existe columna antigua obligatoria, intentar relajarlo creando si falta y dejando NULL permitido.
 		# Nota: SQLite no permite DROP COLUMN fácilmente; los tests usan solo columnas modernas.
 
@@ -76,6 +99,45 @@ def ensure_schema() -> None:
 		):
 			add_column_if_missing("auditoria", coldef)
 
+		# Índices declarados en los modelos (create_all no los agrega a tablas ya existentes)
+		create_missing_indexes(conn)
+
+
+def backfill_nombre_provisional(conn) -> int:
+	"""Completa avisos.nombre_provisional desde observaciones (avisos previos a la columna).
+
+	Los que no se pueden parsear quedan en "" para no reprocesarlos.
+	"""
+	rows = conn.exec_driver_sql(
+		"SELECT id_aviso, observaciones FROM avisos"
+		" WHERE nombre_provisional IS NULL AND observaciones LIKE '%PROVISIONAL -%'"
+	).fetchall()
+	if rows:
+		conn.exec_driver_sql(
+			"UPDATE avisos SET nombre_provisional = ? WHERE id_aviso = ?",
+			[(nombre_provisional_de_observaciones(obs), id_aviso) for id_aviso, obs in rows],
+		)
+	return len(rows)
+
+
+def create_missing_indexes(conn) -> list[str]:
+	"""Crea los índices de los modelos que falten; retorna los nombres creados.
+
+	Se saltean índices cuyas columnas no existen en bases viejas.
+	"""
+	created: list[str] = []
+	for table in Base.metadata.sorted_tables:
+		if not table.indexes:
+			continue
+		cols = {r[1] for r in conn.exec_driver_sql(f"PRAGMA table_info({table.name})").fetchall()}
+		existing = {r[1] for r in conn.exec_driver_sql(f"PRAGMA index_list({table.name})").fetchall()}
+		for index in sorted(table.indexes, key=lambda ix: ix.name or ""):
+			if index.name in existing or not {c.name for c in index.columns} <= cols:
+				continue
+			index.create(bind=conn, checkfirst=True)
+			created.append(str(index.name))
+	return created
+
 
 def seed_employees() -> None:
 	with session_scope() as session:
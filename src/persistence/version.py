@@ -0,0 +1,189 @@
+"""Versión de datos: contador que sube en cada commit que modifica datos del dashboard.
+
+Los eventos de Session marcan la sesión cuando se escriben Aviso, Certificado o
+Employee (flush u UPDATE/DELETE masivos) y, antes del commit, incrementan la
+fila única de data_version en la misma transacción. Así otros procesos (bot vs.
+dashboard) ven el cambio. En el proceso que escribe, la versión cacheada se
+invalida al instante y se avisa a los suscriptores con el detalle (Cambios).
+
+Con STATS_MATERIALIZED, las escrituras que los deltas de dao.py no contemplan
+(empleados, avisos eliminados, INSERT/UPDATE/DELETE masivos) borran la fila de
+estadisticas_avisos en la misma transacción; la próxima lectura la reconstruye.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock
+from typing import Any, Callable, Optional
+
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from ..config import settings
+from .models import Aviso, Certificado, DataVersion, Employee
+from .queries import invalidate_stats
+
+
+VERSIONED = (Aviso, Certificado, Employee)
+
+_PENDING = "_data_version_pending"
+_BUMPED = "_data_version_bumped"
+
+
+@dataclass(frozen=True)
+class Cambios:
+	"""Qué cambió en un commit: ids de avisos tocados/eliminados, o `completo` si no se
+	puede precisar (UPDATE/DELETE masivos, cambios de empleados)."""
+	avisos: frozenset[str] = frozenset()
+	eliminados: frozenset[str] = frozenset()
+	completo: bool = False
+
+
+_lock = Lock()
+_cached: int | None = None
+_cached_at = 0.0
+# Se incrementa en cada invalidación: una lectura lenta no pisa un valor más nuevo
+_generation = 0
+_listeners: list[Callable[[Cambios], None]] = []
+
+
+def _pending(session: Session) -> dict[str, Any]:
+	# estadisticas: hubo cambios que afectan las métricas sin delta aplicado (ver queries.apply_stats_delta)
+	return session.info.setdefault(_PENDING, {"avisos": set(), "eliminados": set(), "completo": False, "estadisticas": False})
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, _ctx: Any) -> None:
+	tocados = [o for o in (*session.new, *session.dirty) if isinstance(o, VERSIONED)]
+	borrados = [o for o in session.deleted if isinstance(o, VERSIONED)]
+	if not tocados and not borrados:
+		return
+	pend = _pending(session)
+	for obj in tocados:
+		if isinstance(obj, Employee):
+			# nombre/area deciden requieren_validacion y alta_prioridad de sus avisos
+			pend["completo"] = pend["estadisticas"] = True
+		else:
+			pend["avisos"].add(obj.id_aviso)
+	for obj in borrados:
+		if isinstance(obj, Aviso):
+			pend["eliminados"].add(obj.id_aviso)
+			pend["estadisticas"] = True
+		elif isinstance(obj, Certificado):
+			pend["avisos"].add(obj.id_aviso)
+		else:
+			pend["completo"] = pend["estadisticas"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(state: ORMExecuteState) -> None:
+	# UPDATE / DELETE masivos (query().delete(), update(Aviso)...) no pasan por flush
+	if (state.is_update or state.is_delete or state.is_insert) and state.bind_mapper is not None:
+		if issubclass(state.bind_mapper.class_, VERSIONED):
+			pend = _pending(state.session)
+			pend["completo"] = True
+			if issubclass(state.bind_mapper.class_, (Aviso, Employee)):
+				pend["estadisticas"] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session: Session) -> None:
+	session.flush()
+	pend = session.info.pop(_PENDING, None)
+	if not pend:
+		return
+	if pend["estadisticas"]:
+		invalidate_stats(session)
+	bump_data_version(session)
+	session.info[_BUMPED] = Cambios(
+		avisos=frozenset(pend["avisos"] - pend["eliminados"]),
+		eliminados=frozenset(pend["eliminados"]),
+		completo=pend["completo"],
+	)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+	cambios = session.info.pop(_BUMPED, None)
+	if cambios is not None:
+		invalidate_local(cambios)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_soft_rollback(session: Session, previous_transaction: Any) -> None:
+	# Solo al deshacer la transacción externa (un SAVEPOINT fallido no descarta lo anterior)
+	if previous_transaction.parent is None:
+		session.info.pop(_PENDING, None)
+		session.info.pop(_BUMPED, None)
+
+
+def bump_data_version(session: Session) -> None:
+	"""Incrementa data_version dentro de la transacción de `session`."""
+	upd = (
+		update(DataVersion)
+		.where(DataVersion.id == 1)
+		.values(version=DataVersion.version + 1, actualizado_en=datetime.utcnow())
+		.execution_options(synchronize_session=False)
+	)
+	if session.execute(upd).rowcount:
+		return
+	try:
+		with session.begin_nested():
+			session.add(DataVersion(id=1, version=1, actualizado_en=datetime.utcnow()))
+	except IntegrityError:
+		session.execute(upd)
+
+
+def invalidate_local(cambios: Cambios = Cambios(completo=True)) -> None:
+	"""Fuerza releer la versión en la próxima consulta y notifica a los suscriptores.
+
+	Se llama desde after_commit: no abre conexiones (la sesión aún tiene la suya).
+	"""
+	global _cached, _generation
+	with _lock:
+		_cached = None
+		_generation += 1
+	for fn in list(_listeners):
+		fn(cambios)
+
+
+def peek_data_version() -> Optional[int]:
+	"""Versión cacheada si sigue vigente, sin tocar la base (None si hay que releer)."""
+	with _lock:
+		if _cached is not None and time.monotonic() - _cached_at < settings.DATA_VERSION_TTL:
+			return _cached
+	return None
+
+
+def current_data_version() -> int:
+	"""Versión actual; se relee de la base como mucho cada DATA_VERSION_TTL segundos."""
+	global _cached, _cached_at
+	now = time.monotonic()
+	with _lock:
+		if _cached is not None and now - _cached_at < settings.DATA_VERSION_TTL:
+			return _cached
+		generation = _generation
+	from .dao import session_scope
+
+	with session_scope() as session:
+		version = session.execute(select(DataVersion.version).where(DataVersion.id == 1)).scalar() or 0
+	with _lock:
+		if generation == _generation:
+			_cached, _cached_at = version, now
+	return version
+
+
+def subscribe(fn: Callable[[Cambios], None]) -> Callable[[], None]:
+	"""Registra `fn(cambios)` para escrituras de este proceso; retorna la baja.
+
+	Se invoca en el hilo que hizo commit: debe ser rápido y no tocar la base.
+	"""
+	_listeners.append(fn)
+
+	def unsubscribe() -> None:
+		if fn in _listeners:
+			_listeners.remove(fn)
+	return unsubscribe
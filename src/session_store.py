@@ -1,23 +1,355 @@
+"""Estado de conversación del bot: capa LRU+TTL en memoria delante de un backend durable.
+
+- SessionStore guarda en memoria como mucho SESSION_CACHE_SIZE sesiones (las
+  menos usadas se descartan: su copia durable sigue en el backend) y las carga
+  recién con el primer mensaje del chat.
+- Cada cambio se escribe al backend (SqlBackend: tabla sesiones_bot, compartida
+  entre procesos del bot); si el registro serializado no cambió, no se escribe.
+- Pasados SESSION_CACHE_TTL segundos la copia en memoria se relee del backend.
+- Los registros son JSON compacto sin las claves que valen lo mismo que los
+  valores por defecto, comprimidos con zlib si son grandes.
+"""
 from __future__ import annotations
 
-from typing import Dict, Optional
+import copy
+import json
+import logging
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+# Registros de más de esto se comprimen
+_COMPRESS_OVER = 512
+
+
+def encode_record(data: Dict[str, Any], defaults: Optional[Dict[str, Any]] = None) -> bytes:
+	"""dict -> bytes: omite claves iguales al valor por defecto; b"j" JSON / b"z" JSON+zlib."""
+	if defaults:
+		data = {k: v for k, v in data.items() if defaults.get(k, _MISSING) != v}
+	raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+	if len(raw) > _COMPRESS_OVER:
+		return b"z" + zlib.compress(raw)
+	return b"j" + raw
+
+
+def decode_record(blob: bytes, defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+	raw = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+	data = copy.deepcopy(defaults) if defaults else {}
+	data.update(json.loads(raw))
+	return data
+
+
+class SessionBackend(ABC):
+	"""Almacenamiento durable de registros serializados por clave."""
+
+	@abstractmethod
+	def load(self, key: str) -> Optional[bytes]:
+		...
+
+	@abstractmethod
+	def save(self, key: str, blob: bytes) -> None:
+		...
+
+	@abstractmethod
+	def delete(self, key: str) -> None:
+		...
+
+	@abstractmethod
+	def delete_prefix(self, prefix: str) -> int:
+		...
+
+	@abstractmethod
+	def purge(self, older_than: datetime) -> int:
+		"""Elimina registros sin cambios desde `older_than`; retorna cuántos."""
+
+
+class MemoryBackend(SessionBackend):
+	"""Backend en proceso (sin durabilidad): tests y SESSION_BACKEND=memory."""
+
+	def __init__(self) -> None:
+		self._data: Dict[str, tuple[datetime, bytes]] = {}
+
+	def load(self, key: str) -> Optional[bytes]:
+		row = self._data.get(key)
+		return row[1] if row else None
+
+	def save(self, key: str, blob: bytes) -> None:
+		self._data[key] = (datetime.utcnow(), blob)
+
+	def delete(self, key: str) -> None:
+		self._data.pop(key, None)
+
+	def delete_prefix(self, prefix: str) -> int:
+		keys = [k for k in self._data if k.startswith(prefix)]
+		for k in keys:
+			del self._data[k]
+		return len(keys)
+
+	def purge(self, older_than: datetime) -> int:
+		keys = [k for k, (ts, _) in self._data.items() if ts < older_than]
+		for k in keys:
+			del self._data[k]
+		return len(keys)
+
+
+class SqlBackend(SessionBackend):
+	"""Tabla sesiones_bot en la base de la aplicación (SQLite o Postgres)."""
+
+	def _session(self):
+		from .persistence.dao import session_scope
+		from .persistence.seed import ensure_schema
+
+		ensure_schema()  # memoizado: crea sesiones_bot la primera vez
+		return session_scope()
+
+	def load(self, key: str) -> Optional[bytes]:
+		from sqlalchemy import select
+		from .persistence.models import SesionBot
+
+		with self._session() as session:
+			return session.execute(select(SesionBot.datos).where(SesionBot.clave == key)).scalar()
+
+	def save(self, key: str, blob: bytes) -> None:
+		from sqlalchemy import update
+		from sqlalchemy.exc import IntegrityError
+		from .persistence.models import SesionBot
+
+		# UPDATE primero; si la fila no existe se inserta (otro proceso pudo crearla: reintento)
+		upd = (
+			update(SesionBot)
+			.where(SesionBot.clave == key)
+			.values(datos=blob, actualizado_en=datetime.utcnow())
+			.execution_options(synchronize_session=False)
+		)
+		with self._session() as session:
+			for _ in range(2):
+				if session.execute(upd).rowcount:
+					return
+				try:
+					with session.begin_nested():
+						session.add(SesionBot(clave=key, datos=blob, actualizado_en=datetime.utcnow()))
+					return
+				except IntegrityError:
+					continue
 
+	def delete(self, key: str) -> None:
+		from sqlalchemy import delete
+		from .persistence.models import SesionBot
 
-_legajo_by_user: Dict[str, str] = {}
+		with self._session() as session:
+			session.execute(delete(SesionBot).where(SesionBot.clave == key))
+
+	def delete_prefix(self, prefix: str) -> int:
+		from sqlalchemy import delete
+		from .persistence.models import SesionBot
+
+		with self._session() as session:
+			return session.execute(delete(SesionBot).where(SesionBot.clave.startswith(prefix, autoescape=True))).rowcount
+
+	def purge(self, older_than: datetime) -> int:
+		from sqlalchemy import delete
+		from .persistence.models import SesionBot
+
+		with self._session() as session:
+			return session.execute(delete(SesionBot).where(SesionBot.actualizado_en < older_than)).rowcount
+
+
+class SessionStore:
+	"""Mapping chat id -> dict de estado, acotado en memoria y persistido en `backend`.
+
+	Los dicts que devuelve son los mismos que quedan en memoria: quien los
+	modifica en lugar debe llamar a save(key) al terminar (DialogueManager lo
+	hace después de cada mensaje). Si el backend falla se sigue en memoria.
+	"""
+
+	def __init__(
+		self,
+		backend: SessionBackend,
+		namespace: str,
+		maxsize: int = 1024,
+		ttl: float = 300.0,
+		defaults: Optional[Dict[str, Any]] = None,
+		clock: Callable[[], float] = time.monotonic,
+	) -> None:
+		self.backend = backend
+		self.namespace = namespace
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self.defaults = defaults
+		self._clock = clock
+		# key -> (cargado_en, dict vivo, último registro escrito/leído)
+		self._data: OrderedDict[str, tuple[float, Dict[str, Any], Optional[bytes]]] = OrderedDict()
+		self._lock = threading.RLock()
+		self._stats = {"hits": 0, "loads": 0, "writes": 0, "skipped_writes": 0, "evictions": 0, "errors": 0}
+
+	def _key(self, key: Any) -> str:
+		return f"{self.namespace}:{key}"
+
+	def _remember(self, key: str, data: Dict[str, Any], blob: Optional[bytes]) -> None:
+		self._data[key] = (self._clock(), data, blob)
+		self._data.move_to_end(key)
+		while len(self._data) > self.maxsize:
+			self._data.popitem(last=False)
+			self._stats["evictions"] += 1
+
+	def get(self, key: Any, default: Any = None) -> Any:
+		key = str(key)
+		with self._lock:
+			entry = self._data.get(key)
+			if entry is not None and self._clock() - entry[0] < self.ttl:
+				self._data.move_to_end(key)
+				self._stats["hits"] += 1
+				return entry[1]
+			# Primer mensaje del chat en este proceso (o copia vencida): se lee del backend
+			self._stats["loads"] += 1
+			try:
+				blob = self.backend.load(self._key(key))
+			except Exception as e:
+				self._stats["errors"] += 1
+				logger.warning(f"No se pudo leer la sesión {key}: {e}")
+				return entry[1] if entry is not None else default
+			if blob is None:
+				self._data.pop(key, None)
+				return default
+			data = decode_record(blob, self.defaults)
+			self._remember(key, data, blob)
+			return data
+
+	def save(self, key: Any, data: Optional[Dict[str, Any]] = None) -> None:
+		"""Persiste la sesión de `key` tras modificarla en lugar.
+
+		Con `data` se escribe ese dict aunque la entrada ya no esté en memoria:
+		con más hilos que lugares en el LRU, la sesión puede desalojarse entre
+		`get()` y `save()`, y sin el dict vivo los cambios se perderían.
+		Sin `data` se usa la copia en memoria (si no hay, no se escribe nada).
+		"""
+		key = str(key)
+		with self._lock:
+			entry = self._data.get(key)
+			if data is None:
+				if entry is None:
+					return
+				data = entry[1]
+			# Último blob leído/escrito en el backend; sin entrada no se sabe: se escribe
+			previo = entry[2] if entry is not None else None
+			blob = encode_record(data, self.defaults)
+			if blob == previo:
+				self._stats["skipped_writes"] += 1
+				self._remember(key, data, blob)
+				return
+			try:
+				self.backend.save(self._key(key), blob)
+				self._stats["writes"] += 1
+			except Exception as e:
+				self._stats["errors"] += 1
+				logger.warning(f"No se pudo guardar la sesión {key}: {e}")
+				blob = previo
+			self._remember(key, data, blob)
+
+	def __getitem__(self, key: Any) -> Dict[str, Any]:
+		data = self.get(key, _MISSING)
+		if data is _MISSING:
+			raise KeyError(key)
+		return data
+
+	def __setitem__(self, key: Any, data: Dict[str, Any]) -> None:
+		key = str(key)
+		with self._lock:
+			entry = self._data.get(key)
+			self._remember(key, data, entry[2] if entry is not None else None)
+			self.save(key, data)
+
+	def __contains__(self, key: Any) -> bool:
+		return self.get(key, _MISSING) is not _MISSING
+
+	def __delitem__(self, key: Any) -> None:
+		self.pop(key)
+
+	def pop(self, key: Any, default: Any = None) -> Any:
+		key = str(key)
+		with self._lock:
+			entry = self._data.pop(key, None)
+			try:
+				self.backend.delete(self._key(key))
+			except Exception as e:
+				self._stats["errors"] += 1
+				logger.warning(f"No se pudo borrar la sesión {key}: {e}")
+			return entry[1] if entry is not None else default
+
+	def __len__(self) -> int:
+		"""Sesiones en memoria (no las del backend)."""
+		return len(self._data)
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(list(self._data))
+
+	def clear(self) -> None:
+		"""Vacía memoria y backend de este espacio de nombres."""
+		with self._lock:
+			self._data.clear()
+			try:
+				self.backend.delete_prefix(f"{self.namespace}:")
+			except Exception as e:
+				self._stats["errors"] += 1
+				logger.warning(f"No se pudo vaciar {self.namespace}: {e}")
+
+	def purge(self, max_age_days: Optional[int] = None) -> int:
+		"""Elimina del backend conversaciones sin actividad (default SESSION_MAX_AGE_DAYS)."""
+		days = settings.SESSION_MAX_AGE_DAYS if max_age_days is None else max_age_days
+		return self.backend.purge(datetime.utcnow() - timedelta(days=days))
+
+	def stats(self) -> Dict[str, int]:
+		with self._lock:
+			return {**self._stats, "size": len(self._data), "maxsize": self.maxsize}
+
+
+_backend: Optional[SessionBackend] = None
+_stores: Dict[str, SessionStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_backend() -> SessionBackend:
+	global _backend
+	if _backend is None:
+		_backend = SqlBackend() if settings.SESSION_BACKEND == "sql" else MemoryBackend()
+	return _backend
+
+
+def get_store(namespace: str, defaults: Optional[Dict[str, Any]] = None) -> SessionStore:
+	"""Store compartido del proceso para `namespace` (configurado por Settings.SESSION_*)."""
+	with _stores_lock:
+		store = _stores.get(namespace)
+		if store is None:
+			store = _stores[namespace] = SessionStore(
+				get_backend(),
+				namespace,
+				maxsize=settings.SESSION_CACHE_SIZE,
+				ttl=settings.SESSION_CACHE_TTL,
+				defaults=defaults,
+			)
+		return store
 
 
 def set_legajo(user_id: str, legajo: str) -> None:
-	"""Guarda el legajo preferido para un usuario/chat en memoria."""
-	_legajo_by_user[str(user_id)] = str(legajo)
+	"""Guarda el legajo preferido para un usuario/chat."""
+	get_store("legajo")[str(user_id)] = {"legajo": str(legajo)}
 
 
 def get_legajo(user_id: str) -> Optional[str]:
 	"""Obtiene el legajo guardado para un usuario/chat si existe."""
-	return _legajo_by_user.get(str(user_id))
+	record = get_store("legajo").get(str(user_id))
+	return record.get("legajo") if record else None
 
 
 def clear_store() -> None:
-	"""Limpia el store en memoria (útil para tests)."""
-	_legajo_by_user.clear()
-
-
+	"""Limpia los legajos guardados (útil para tests)."""
+	get_store("legajo").clear()
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
 from typing import Optional
 
 try:
@@ -12,18 +14,18 @@ except Exception:  # aiogram no instalado aún
 	exists_aiogram = False
 	Bot = Dispatcher = Message = object  # type: ignore
 
-from ..dialogue.manager import DialogueManager
-from ..session_store import set_legajo
+from ..dialogue.manager import DialogueManager, dialogue_store
+from .middleware import ChatSerializerMiddleware
+from .sharding import build_dialogue
+from ..session_store import get_store, set_legajo
 from ..persistence.seed import ensure_schema
-from ..persistence.dao import session_scope
-from ..persistence.models import Employee
+from ..persistence import async_dao
+from ..utils.upload_spool import get_upload_spool
 from ..config import settings
 
 logging.basicConfig(level=logging.INFO)
 
 
-_dm = DialogueManager()
-
 
 async def start_bot(token: str) -> None:
 	"""Inicia el bot de Telegram (aiogram 3.x)."""
@@ -31,6 +33,15 @@ async def start_bot(token: str) -> None:
 		print("aiogram no está disponible. Instálalo con requirements.txt")
 		return
 	
+	# Esquema verificado una sola vez al arrancar (no en cada mensaje)
+	ensure_schema()
+	# Conversaciones abandonadas hace más de SESSION_MAX_AGE_DAYS
+	for store in (dialogue_store(), get_store("legajo")):
+		try:
+			store.purge()
+		except Exception as e:
+			logging.warning(f"No se pudieron purgar sesiones viejas ({store.namespace}): {e}")
+
 	print(f"Inicializando DialogueManager...")
 	try:
 		_dm_test = DialogueManager()
@@ -38,11 +49,27 @@ async def start_bot(token: str) -> None:
 	except Exception as e:
 		print(f"Error inicializando DialogueManager: {e}")
 		return
+	# Con BOT_WORKERS > 0 los chats se reparten entre procesos worker (sharding.py)
+	dialogue = build_dialogue()
+	# Subidas de adjuntos a Drive en segundo plano (incluye las que quedaron pendientes)
+	spool = get_upload_spool().start()
+	pendientes = spool.resume()
+	if pendientes:
+		logging.info(f"Reanudando {pendientes} subida(s) pendiente(s) a Drive")
 	
 	bot = Bot(token)
 	dp = Dispatcher()
+	# Updates de un mismo chat en serie, hasta BOT_MAX_CONCURRENCY en paralelo
+	serializer = ChatSerializerMiddleware()
+	dp.update.outer_middleware(serializer)
 	print(f"Bot configurado, registrando handlers...")
 
+	async def vincular_adjunto(result: dict) -> None:
+		"""Aviso recién creado con un certificado del spool: recibe el link de Drive al terminar la subida."""
+		digest = (result.get("adjunto") or {}).get("certificado_digest")
+		if result.get("id_aviso") and digest:
+			await asyncio.to_thread(spool.add_target, digest, result["id_aviso"])
+
 	# Comando /id <legajo>
 	@dp.message(Command("id"))
 	async def handle_id(msg: Message) -> None:
@@ -57,16 +84,14 @@ async def start_bot(token: str) -> None:
 				await msg.reply("Formato inválido. Usá /id 1234 (4 dígitos)")
 				return
 			# Validar en BD mínima
-			ensure_schema()
-			with session_scope() as s:
-				emp = s.query(Employee).filter(Employee.legajo == legajo_digits).first()
+			emp = await async_dao.get_employee(legajo_digits)
 			if not emp:
 				await msg.reply("No encontré ese legajo en el sistema. Revisá y volvé a intentar.")
 				return
-			set_legajo(str(msg.chat.id), legajo_digits)
-			_dm.set_legajo_validado(str(msg.chat.id), legajo_digits)
+			await async_dao.run_db(set_legajo, str(msg.chat.id), legajo_digits)
+			await dialogue.set_legajo_validado(str(msg.chat.id), legajo_digits)
 			# Incluir nombre si está disponible
-			nombre = getattr(emp, "nombre", None)
+			nombre = emp.get("nombre")
 			if nombre:
 				await msg.reply(f"Listo, {nombre} (legajo {legajo_digits}) verificado")
 			else:
@@ -81,9 +106,8 @@ async def start_bot(token: str) -> None:
 			if not settings.DEMO_EXPORT:
 				await msg.reply("Comando no disponible en este entorno.")
 				return
-			ensure_schema()
 			from ..persistence.export_powerbi import export_all_csv
-			export_all_csv(out_dir="./exports")
+			await async_dao.run_db(export_all_csv, out_dir="./exports")
 			await msg.reply("Export listo en /exports (employees.csv, avisos.csv, certificados.csv, notificaciones.csv, auditoria.csv)")
 		except Exception as e:
 			await msg.reply(f"Error en export: {e}")
@@ -103,7 +127,8 @@ async def start_bot(token: str) -> None:
 			elif msg.text:
 				print(f"Procesando con DialogueManager: {msg.text}")
 				session_id = str(msg.chat.id)
-				result = _dm.process_message(session_id, msg.text)
+				result = await dialogue.process_message(session_id, msg.text)
+				await vincular_adjunto(result)
 				# No imprimir el resultado completo para evitar emojis
 				# Limpiar preview de respuesta
 				reply_preview = str(result.get('reply_text', ''))[:50]
@@ -143,12 +168,9 @@ async def start_bot(token: str) -> None:
 					if f is None:
 						await msg.reply("Documento o tipo de mensaje no soportado aún")
 						return
-					# Descargar archivo a uploads/ y además subirlo a Google Drive.
-					# Estructura local: uploads/<chat_id>/[<id_aviso>/]<file_id>.<ext>
-					path_dir = "uploads"
-					import os
+					# Descargar directo al spool (uploads/spool/objects/<sha256>.<ext>) y responder; la subida
+					# a Google Drive corre en segundo plano y después reemplaza archivo_path por el link
 					from datetime import date
-					os.makedirs(path_dir, exist_ok=True)
 					file = await bot.get_file(f.file_id)  # type: ignore[attr-defined]
 					# Extensión: si es Document usamos su nombre; si es Photo, forzamos .jpg
 					file_ext = ""
@@ -157,43 +179,35 @@ async def start_bot(token: str) -> None:
 					elif getattr(msg, "photo", None):
 						file_ext = ".jpg"
 					local_name = f"{f.file_id}{file_ext}"  # type: ignore[attr-defined]
-					# Carpeta por chat siempre
-					chat_dir = os.path.join(path_dir, str(msg.chat.id))
-					os.makedirs(chat_dir, exist_ok=True)
-					local_path = os.path.join(chat_dir, local_name)
-					await bot.download_file(file.file_path, destination=local_path)
-
-					# Subir a Google Drive y obtener enlace (opcional)
-					drive_link = ""
-					try:
-						from ..utils.drive_upload import upload_file  # import aquí para evitar carga lenta inicial
-						drive_link = upload_file(local_path, filename=os.path.basename(local_path), mime_type="image/jpeg" if file_ext.lower() in {".jpg", ".jpeg", ".png"} else "application/octet-stream")
-						logging.info(f"Archivo subido a Drive: {drive_link}")
-					except Exception as exc:
-						logging.warning(f"Google Drive no configurado o error: {exc}")
-						drive_link = ""  # Continuar sin Drive
+					mime_type = "image/jpeg" if file_ext.lower() in {".jpg", ".jpeg", ".png"} else "application/octet-stream"
+					tmp_path = spool.temp_path()
+					await bot.download_file(file.file_path, destination=tmp_path)
+					digest, spool_path = await asyncio.to_thread(spool.put_file, tmp_path, file_ext)
+					local_path = str(spool_path)
+					# Sin GD_FOLDER_ID el archivo queda solo en el spool local (como antes sin Drive)
+					subir_a_drive = bool(os.getenv("GD_FOLDER_ID"))
 
 					# Intentar vincular a último aviso del usuario (simple: por legajo en sesión si existe id_aviso en facts)
 					session_id = str(msg.chat.id)
-					state = _dm.sessions.get(session_id, {})
-					facts = state.get("facts", {})
+					facts = await dialogue.call(session_id, "get_facts")
 					id_aviso = facts.get("id_aviso")
 					if not id_aviso:
 						# Nuevo flujo: guardar certificado en facts para usar al crear aviso
-						facts["certificado_archivo_nombre"] = os.path.basename(local_path)
-						facts["certificado_archivo_path"] = drive_link or local_path
-						facts["certificado_documento_legible"] = True
-						facts["certificado_fecha_recepcion"] = date.today().isoformat()
-						facts["certificado_recibido"] = True
-						
-						# Actualizar sesión
-						state["facts"] = facts
-						_dm.sessions[session_id] = state
+						if subir_a_drive:
+							await asyncio.to_thread(spool.submit, digest, file_ext, local_name, mime_type)
+						await dialogue.call(session_id, "update_facts", {
+							"certificado_archivo_nombre": local_name,
+							"certificado_archivo_path": local_path,
+							"certificado_digest": digest,
+							"certificado_documento_legible": True,
+							"certificado_fecha_recepcion": date.today().isoformat(),
+							"certificado_recibido": True,
+						})
 						
 						await msg.reply("Certificado recibido y guardado.")
 						
 						# Continuar automáticamente con el flujo (simular "adjuntar ahora")
-						result = _dm.process_message(session_id, "adjuntar ahora")
+						result = await dialogue.process_message(session_id, "adjuntar ahora")
 						if result and result.get("reply_text"):
 							reply_text = result["reply_text"]
 							# Limpiar emojis
@@ -207,22 +221,16 @@ async def start_bot(token: str) -> None:
 									text2 = re.sub(r'[\U0001F600-\U0001F6FF\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF\U00002600-\U000027BF\U0001F900-\U0001F9FF]+', '', text2)
 									await msg.reply(text2)
 					else:
-						from ..persistence.dao import update_certificado
-						# Mover a carpeta por id_aviso
-						id_dir = os.path.join(path_dir, str(msg.chat.id), id_aviso)
-						os.makedirs(id_dir, exist_ok=True)
-						new_path = os.path.join(id_dir, os.path.basename(local_path))
-						try:
-							os.replace(local_path, new_path)
-						except Exception:
-							new_path = local_path
-						res = update_certificado(id_aviso, {
-							"archivo_nombre": os.path.basename(local_path),
-							"archivo_path": drive_link or new_path,
+						res = await async_dao.update_certificado(id_aviso, {
+							"archivo_nombre": local_name,
+							"archivo_path": local_path,
 							"documento_tipo": facts.get("documento_tipo"),
 							"documento_legible": True,
 							"fecha_recepcion": facts.get("fecha_recepcion") or facts.get("fecha_inicio") or date.today().isoformat(),
 						})
+						# Al terminar la subida, archivo_path pasa a ser el link de Drive
+						if subir_a_drive:
+							await asyncio.to_thread(spool.submit, digest, file_ext, local_name, mime_type, id_aviso)
 						await msg.reply(f"Documento recibido. Estado certificado: {res.get('estado_certificado')}")
 				except Exception as e:
 					await msg.reply(f"No pude procesar el archivo: {e}")
@@ -242,7 +250,7 @@ async def start_bot(token: str) -> None:
 			session_id = str(cb.message.chat.id) if getattr(cb, "message", None) else str(cb.from_user.id)
 			if data in {"adjuntar_ahora", "adjuntar_despues"}:
 				text = "adjuntar ahora" if data == "adjuntar_ahora" else "enviar más tarde"
-				result = _dm.process_message(session_id, text)
+				result = await dialogue.process_message(session_id, text)
 				reply_text = result.get("reply_text", "OK")
 				# Limpiar emojis
 				import re
@@ -289,3 +297,7 @@ async def start_bot(token: str) -> None:
 	except Exception as e:
 		print(f"Error durante polling: {e}")
 		logging.error(f"Error durante polling: {e}", exc_info=True)
+	finally:
+		logging.info(f"Cola de updates: {serializer.stats()}")
+		await dialogue.close()
+		spool.close()
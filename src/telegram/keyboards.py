@@ -174,3 +174,22 @@ def kb_legajo_provisional(*, as_text: bool = False) -> Any:
 		input_field_placeholder="Elegí una opción…",
 	)
 	return keyboard
+
+
+def kb_sugerencias_legajo(opciones: Sequence[str], *, as_text: bool = False) -> Any:
+	"""Teclado con empleados sugeridos ("1234 - Nombre"), uno por fila.
+
+	Al final: Continuar provisional / Reingresar legajo.
+	"""
+	extras = ["Continuar provisional", "Reingresar legajo"]
+	if as_text or not exists_aiogram:
+		return " / ".join([*opciones, *extras])
+	rows = [[KeyboardButton(text=o)] for o in opciones]
+	rows.append([KeyboardButton(text=l) for l in extras])
+	keyboard = ReplyKeyboardMarkup(
+		keyboard=rows,
+		resize_keyboard=True,
+		one_time_keyboard=True,
+		input_field_placeholder="Elegí una opción…",
+	)
+	return keyboard
@@ -0,0 +1,120 @@
+"""Middleware de aiogram: updates de un mismo chat en serie, chats distintos en paralelo.
+
+Cada chat tiene un asyncio.Lock (FIFO): un adjunto y el "adjuntar ahora" del
+mismo chat ya no se intercalan modificando la sesión a la vez. Un semáforo
+global acota cuántos updates se procesan juntos (BOT_MAX_CONCURRENCY); un chat
+con mensajes en cola ocupa un solo lugar del semáforo. El paralelismo es real
+porque el trabajo del diálogo no corre en el loop (LocalDialogue lo manda al
+pool de async_dao; ShardedDialogue, a los procesos worker).
+
+stats() informa la profundidad de las colas y el tiempo de espera de los
+updates (desde que llegan hasta que empieza su handler).
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from contextlib import AsyncExitStack
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+try:
+	from aiogram import BaseMiddleware
+except Exception:  # aiogram no instalado aún
+	BaseMiddleware = object  # type: ignore
+
+from ..config import settings
+
+
+class _ChatSlot:
+	__slots__ = ("lock", "waiters")
+
+	def __init__(self) -> None:
+		self.lock = asyncio.Lock()
+		# Updates del chat en cola o en proceso (el slot se descarta al llegar a 0)
+		self.waiters = 0
+
+
+class ChatSerializerMiddleware(BaseMiddleware):
+	"""Outer middleware de dp.update (después de UserContextMiddleware, que resuelve el chat)."""
+
+	def __init__(self, max_concurrency: Optional[int] = None, window: int = 1024, clock: Callable[[], float] = time.monotonic) -> None:
+		self.max_concurrency = settings.BOT_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+		self._sem = asyncio.Semaphore(self.max_concurrency)
+		self._slots: Dict[Any, _ChatSlot] = {}
+		self._clock = clock
+		self._queued = 0
+		self._active = 0
+		self._started = 0
+		self._processed = 0
+		self._max_depth = 0
+		self._wait_total = 0.0
+		self._wait_max = 0.0
+		# Últimas esperas para p50/p95
+		self._waits: deque[float] = deque(maxlen=window)
+
+	@staticmethod
+	def _chat_key(data: Dict[str, Any]) -> Any:
+		chat = data.get("event_chat")
+		if chat is not None:
+			return chat.id
+		user = data.get("event_from_user")
+		return f"u{user.id}" if user is not None else None
+
+	async def __call__(
+		self,
+		handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]],
+		event: Any,
+		data: Dict[str, Any],
+	) -> Any:
+		key = self._chat_key(data)
+		llegada = self._clock()
+		async with AsyncExitStack() as stack:
+			self._queued += 1
+			try:
+				if key is not None:
+					slot = self._slots.get(key)
+					if slot is None:
+						slot = self._slots[key] = _ChatSlot()
+					slot.waiters += 1
+					self._max_depth = max(self._max_depth, slot.waiters)
+					stack.callback(self._release, key, slot)
+					await stack.enter_async_context(slot.lock)
+				# Límite global (los updates sin chat ni usuario solo pasan por este)
+				await stack.enter_async_context(self._sem)
+			finally:
+				self._queued -= 1
+			return await self._run(handler, event, data, llegada)
+
+	def _release(self, key: Any, slot: _ChatSlot) -> None:
+		slot.waiters -= 1
+		if slot.waiters == 0:
+			del self._slots[key]
+
+	async def _run(self, handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]], event: Any, data: Dict[str, Any], llegada: float) -> Any:
+		espera = self._clock() - llegada
+		self._started += 1
+		self._waits.append(espera)
+		self._wait_total += espera
+		self._wait_max = max(self._wait_max, espera)
+		self._active += 1
+		try:
+			return await handler(event, data)
+		finally:
+			self._active -= 1
+			self._processed += 1
+
+	def stats(self) -> Dict[str, Any]:
+		waits = sorted(self._waits)
+		return {
+			"max_concurrency": self.max_concurrency,
+			"activos": self._active,
+			"en_cola": self._queued,
+			"chats_con_cola": sum(1 for slot in self._slots.values() if slot.waiters > 1),
+			"max_profundidad_chat": self._max_depth,
+			"procesados": self._processed,
+			"espera_media_ms": round(self._wait_total / self._started * 1000, 2) if self._started else 0.0,
+			"espera_p50_ms": round(waits[len(waits) // 2] * 1000, 2) if waits else 0.0,
+			"espera_p95_ms": round(waits[max(int(len(waits) * 0.95) - 1, 0)] * 1000, 2) if waits else 0.0,
+			"espera_max_ms": round(self._wait_max * 1000, 2),
+		}
@@ -0,0 +1,259 @@
+"""Reparto de chats entre procesos worker del bot (BOT_WORKERS > 0).
+
+El proceso de entrada (polling de bot.py o el webhook de bot_webhook.py)
+recibe los updates y manda cada llamada al DialogueManager del worker dueño
+del chat, elegido por hash consistente de chat.id. Cada worker procesa su
+cola en orden, así que los mensajes de un mismo chat se atienden en el orden
+de llegada y sus sesiones quedan siempre en la caché del mismo proceso
+(session_store); chats distintos se procesan en paralelo en otros núcleos.
+
+Con BOT_WORKERS=0 se usa LocalDialogue: el DialogueManager en el mismo
+proceso, con la misma interfaz async; cada llamada corre en el pool de
+async_dao (DB_THREADS) para no bloquear el event loop. El orden por chat lo da
+ChatSerializerMiddleware (middleware.py).
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import hashlib
+import itertools
+import logging
+import multiprocessing as mp
+import queue
+import threading
+from typing import Any, Optional
+
+from ..config import settings
+from ..persistence import async_dao
+
+logger = logging.getLogger(__name__)
+
+# Métodos de DialogueManager que se pueden invocar en el worker; todos reciben chat id primero
+_METHODS = frozenset({
+	"process_message",
+	"set_legajo_validado",
+	"handle_certificate_upload",
+	"get_facts",
+	"update_facts",
+})
+
+
+class WorkerError(RuntimeError):
+	"""Falló la llamada en el worker (excepción del DialogueManager o worker caído)."""
+
+
+def _hash(key: str) -> int:
+	return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+	"""Hash consistente con nodos virtuales: chat id -> índice de worker.
+
+	Al cambiar la cantidad de workers solo se reasigna ~1/N de los chats
+	(el resto conserva su worker y su caché de sesiones).
+	"""
+
+	def __init__(self, nodes: int, replicas: int = 64) -> None:
+		if nodes < 1:
+			raise ValueError("HashRing necesita al menos un nodo")
+		self.nodes = nodes
+		puntos = sorted((_hash(f"{node}#{r}"), node) for node in range(nodes) for r in range(replicas))
+		self._hashes = [h for h, _ in puntos]
+		self._nodes = [n for _, n in puntos]
+
+	def node_for(self, key: Any) -> int:
+		i = bisect.bisect(self._hashes, _hash(str(key)))
+		return self._nodes[i % len(self._nodes)]
+
+
+class LocalDialogue:
+	"""DialogueManager en el mismo proceso detrás de la interfaz de ShardedDialogue."""
+
+	def __init__(self) -> None:
+		from ..dialogue.manager import DialogueManager, dialogue_store
+
+		self.dm = DialogueManager(dialogue_store())
+
+	async def call(self, chat_id: Any, method: str, *args: Any) -> Any:
+		if method not in _METHODS:
+			raise ValueError(f"Método no permitido: {method}")
+		# Consultas al directorio, guardado de la sesión y alta del aviso: fuera del event loop
+		return await async_dao.run_db(getattr(self.dm, method), str(chat_id), *args)
+
+	async def process_message(self, chat_id: Any, text: str) -> dict[str, Any]:
+		return await self.call(chat_id, "process_message", text)
+
+	async def set_legajo_validado(self, chat_id: Any, legajo: str) -> None:
+		await self.call(chat_id, "set_legajo_validado", legajo)
+
+	async def close(self) -> None:
+		pass
+
+	def stats(self) -> dict[str, Any]:
+		return {"workers": 0}
+
+
+def _worker_main(index: int, inbox: Any, outbox: Any) -> None:
+	"""Bucle del proceso worker: (req_id, chat_id, método, args) -> (req_id, ok, resultado)."""
+	from ..dialogue.manager import DialogueManager, dialogue_store
+
+	logging.basicConfig(level=settings.LOG_LEVEL)
+	dm = DialogueManager(dialogue_store())
+	while True:
+		item = inbox.get()
+		if item is None:
+			break
+		req_id, chat_id, method, args = item
+		try:
+			outbox.put((req_id, True, getattr(dm, method)(chat_id, *args)))
+		except Exception as e:
+			logger.exception(f"Worker {index}: error en {method} para {chat_id}")
+			outbox.put((req_id, False, f"{type(e).__name__}: {e}"))
+
+
+class ShardedDialogue:
+	"""Front de N procesos worker con un DialogueManager cada uno.
+
+	Cada worker tiene su cola de entrada; las respuestas vuelven por una cola
+	común que lee un hilo y resuelve los futures del event loop. Si un worker
+	muere, sus llamadas pendientes fallan con WorkerError y se lo reinicia.
+	"""
+
+	def __init__(self, workers: int, replicas: int = 64, start_method: str = "spawn") -> None:
+		self.ring = HashRing(workers, replicas)
+		self._ctx = mp.get_context(start_method)
+		self._outbox = self._ctx.Queue()
+		self._inboxes: list[Any] = [None] * workers
+		self._procs: list[Any] = [None] * workers
+		# req_id -> (worker, loop, future)
+		self._pending: dict[int, tuple[int, asyncio.AbstractEventLoop, asyncio.Future]] = {}
+		self._pending_lock = threading.Lock()
+		self._ids = itertools.count()
+		self._reader: Optional[threading.Thread] = None
+		self._closing = False
+		self._counts = [0] * workers
+		self._restarts = 0
+
+	def _spawn(self, index: int) -> None:
+		self._inboxes[index] = self._ctx.Queue()
+		proc = self._ctx.Process(
+			target=_worker_main,
+			args=(index, self._inboxes[index], self._outbox),
+			name=f"bot-worker-{index}",
+			daemon=True,
+		)
+		proc.start()
+		self._procs[index] = proc
+
+	def start(self) -> "ShardedDialogue":
+		for index in range(self.ring.nodes):
+			self._spawn(index)
+		self._reader = threading.Thread(target=self._read_results, name="bot-sharding-reader", daemon=True)
+		self._reader.start()
+		return self
+
+	def _resolve(self, req_id: int, ok: bool, value: Any) -> None:
+		with self._pending_lock:
+			entry = self._pending.pop(req_id, None)
+		if entry is None:
+			return
+		_, loop, fut = entry
+
+		def _set() -> None:
+			if fut.done():
+				return
+			if ok:
+				fut.set_result(value)
+			else:
+				fut.set_exception(WorkerError(value))
+
+		loop.call_soon_threadsafe(_set)
+
+	def _check_workers(self) -> None:
+		for index, proc in enumerate(self._procs):
+			if proc is None or proc.is_alive() or self._closing:
+				continue
+			logger.error(f"Worker {index} terminó (exitcode={proc.exitcode}); reiniciando")
+			with self._pending_lock:
+				perdidas = [req_id for req_id, (w, _, _) in self._pending.items() if w == index]
+			for req_id in perdidas:
+				self._resolve(req_id, False, f"worker {index} terminó")
+			self._restarts += 1
+			self._spawn(index)
+
+	def _read_results(self) -> None:
+		while not self._closing:
+			try:
+				req_id, ok, value = self._outbox.get(timeout=0.5)
+			except queue.Empty:
+				self._check_workers()
+				continue
+			except (EOFError, OSError):
+				break
+			self._resolve(req_id, ok, value)
+
+	async def call(self, chat_id: Any, method: str, *args: Any) -> Any:
+		"""Ejecuta `DialogueManager.<method>(chat_id, *args)` en el worker dueño del chat."""
+		if method not in _METHODS:
+			raise ValueError(f"Método no permitido: {method}")
+		chat_id = str(chat_id)
+		index = self.ring.node_for(chat_id)
+		loop = asyncio.get_running_loop()
+		fut = loop.create_future()
+		req_id = next(self._ids)
+		with self._pending_lock:
+			self._pending[req_id] = (index, loop, fut)
+		self._counts[index] += 1
+		# put() no bloquea (el envío lo hace el hilo de la cola) y respeta el orden de llegada
+		self._inboxes[index].put((req_id, chat_id, method, args))
+		return await fut
+
+	async def process_message(self, chat_id: Any, text: str) -> dict[str, Any]:
+		return await self.call(chat_id, "process_message", text)
+
+	async def set_legajo_validado(self, chat_id: Any, legajo: str) -> None:
+		await self.call(chat_id, "set_legajo_validado", legajo)
+
+	async def close(self, timeout: float = 5.0) -> None:
+		"""Termina los workers después de que procesen lo que ya tienen en cola."""
+		self._closing = True
+		for inbox in self._inboxes:
+			if inbox is not None:
+				inbox.put(None)
+		loop = asyncio.get_running_loop()
+		for proc in self._procs:
+			if proc is not None:
+				await loop.run_in_executor(None, proc.join, timeout)
+				if proc.is_alive():
+					proc.terminate()
+		if self._reader is not None:
+			await loop.run_in_executor(None, self._reader.join, timeout)
+		# Respuestas que llegaron después de cerrar el lector
+		while True:
+			try:
+				self._resolve(*self._outbox.get_nowait())
+			except (queue.Empty, EOFError, OSError):
+				break
+		with self._pending_lock:
+			perdidas = list(self._pending)
+		for req_id in perdidas:
+			self._resolve(req_id, False, "bot detenido")
+
+	def stats(self) -> dict[str, Any]:
+		with self._pending_lock:
+			pendientes = len(self._pending)
+		return {
+			"workers": self.ring.nodes,
+			"mensajes_por_worker": list(self._counts),
+			"pendientes": pendientes,
+			"reinicios": self._restarts,
+		}
+
+
+def build_dialogue(workers: Optional[int] = None) -> LocalDialogue | ShardedDialogue:
+	"""LocalDialogue con BOT_WORKERS=0; si no, ShardedDialogue ya iniciado."""
+	workers = settings.BOT_WORKERS if workers is None else workers
+	if workers <= 0:
+		return LocalDialogue()
+	return ShardedDialogue(workers).start()
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Any, Generic, Hashable, Iterable, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class IntervalIndex(Generic[T]):
+	"""Intervalos cerrados [inicio, fin] ordenados por inicio + máximo acumulado de fin.
+
+	Como el máximo acumulado es no decreciente, tanto la existencia de solape
+	como el primer intervalo que solapa se resuelven con dos búsquedas binarias.
+	"""
+
+	__slots__ = ("starts", "ends", "max_end", "items")
+
+	def __init__(self, intervals: Iterable[tuple[date, date, T]] = ()) -> None:
+		rows = sorted(
+			((ini, fin, item) for ini, fin, item in intervals if ini is not None and fin is not None),
+			key=lambda r: (r[0], r[1]),
+		)
+		self.starts: list[date] = [r[0] for r in rows]
+		self.ends: list[date] = [r[1] for r in rows]
+		self.items: list[T] = [r[2] for r in rows]
+		self.max_end: list[date] = []
+		for fin in self.ends:
+			self.max_end.append(fin if not self.max_end or fin > self.max_end[-1] else self.max_end[-1])
+
+	def __len__(self) -> int:
+		return len(self.starts)
+
+	def _bounds(self, inicio: date, fin: date) -> tuple[int, int]:
+		# [lo, hi): candidatos con inicio <= fin; desde lo el máximo de fin ya alcanza `inicio`
+		hi = bisect_right(self.starts, fin)
+		lo = bisect_left(self.max_end, inicio, 0, hi)
+		return lo, hi
+
+	def overlaps(self, inicio: date, fin: date) -> bool:
+		lo, hi = self._bounds(inicio, fin)
+		return lo < hi
+
+	def find(self, inicio: date, fin: date) -> Optional[T]:
+		"""Primer intervalo (por inicio) que solapa con [inicio, fin], o None."""
+		lo, hi = self._bounds(inicio, fin)
+		return self.items[lo] if lo < hi else None
+
+	def find_all(self, inicio: date, fin: date) -> list[T]:
+		lo, hi = self._bounds(inicio, fin)
+		return [self.items[i] for i in range(lo, hi) if self.ends[i] >= inicio]
+
+
+class SolapeIndex(Generic[T]):
+	"""Un IntervalIndex por legajo; se construye una vez y se consulta en O(log n)."""
+
+	__slots__ = ("by_legajo",)
+
+	def __init__(self, intervals: Iterable[tuple[Hashable, date, date, T]] = ()) -> None:
+		grouped: dict[Hashable, list[tuple[date, date, T]]] = {}
+		for legajo, ini, fin, item in intervals:
+			grouped.setdefault(legajo, []).append((ini, fin, item))
+		self.by_legajo: dict[Hashable, IntervalIndex[T]] = {
+			legajo: IntervalIndex(rows) for legajo, rows in grouped.items()
+		}
+
+	def __len__(self) -> int:
+		return sum(len(ix) for ix in self.by_legajo.values())
+
+	def __repr__(self) -> str:
+		return f"SolapeIndex(legajos={len(self.by_legajo)}, intervalos={len(self)})"
+
+	def overlaps(self, legajo: Any, inicio: date, fin: date) -> bool:
+		ix = self.by_legajo.get(legajo)
+		return ix is not None and ix.overlaps(inicio, fin)
+
+	def find(self, legajo: Any, inicio: date, fin: date) -> Optional[T]:
+		ix = self.by_legajo.get(legajo)
+		return ix.find(inicio, fin) if ix is not None else None
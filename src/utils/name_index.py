@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import re
+from typing import Generic, Iterable, TypeVar
+
+from rapidfuzz import fuzz, process
+
+from .normalize import _strip_accents
+
+
+T = TypeVar("T")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_name(text: str) -> str:
+	"""minúsculas, sin acentos ni signos, espacios simples: "Pérez, Juan" -> "perez juan"."""
+	return " ".join(_WORD.findall(_strip_accents(text or "").lower()))
+
+
+class NameIndex(Generic[T]):
+	"""Búsqueda aproximada de nombres completos: top-k candidatos por similitud.
+
+	Índice invertido por palabra (nombre o apellido) -> posiciones. Cada palabra
+	de la consulta se resuelve contra el vocabulario con rapidfuzz (tolera
+	errores de tipeo), se intersectan los conjuntos de la más rara a la más
+	común mientras no quede vacío y los candidatos se ordenan con
+	token_sort_ratio (el orden nombre/apellido no importa).
+
+	Con nombres reales los trigramas son poco selectivos (unos pocos cientos
+	distintos, los frecuentes aparecen en la mitad de los nombres); las palabras
+	completas sí lo son.
+	"""
+
+	__slots__ = ("names", "items", "postings", "vocab_by_len")
+
+	# Similitud mínima (0-100) para considerar una palabra del vocabulario
+	TOKEN_CUTOFF = 75.0
+	# Palabras del vocabulario por palabra de la consulta
+	TOKEN_LIMIT = 4
+	# Candidatos máximos a puntuar (nombres muy comunes)
+	MAX_CANDIDATES = 2000
+
+	def __init__(self, entries: Iterable[tuple[str, T]] = ()) -> None:
+		self.names: list[str] = []
+		self.items: list[T] = []
+		self.postings: dict[str, set[int]] = {}
+		for nombre, item in entries:
+			normalizado = normalize_name(nombre)
+			if not normalizado:
+				continue
+			pos = len(self.names)
+			self.names.append(normalizado)
+			self.items.append(item)
+			for token in set(normalizado.split()):
+				self.postings.setdefault(token, set()).add(pos)
+		# Una palabra con ratio >= 75 no difiere en más de ~2 caracteres de largo
+		self.vocab_by_len: dict[int, list[str]] = {}
+		for token in self.postings:
+			self.vocab_by_len.setdefault(len(token), []).append(token)
+
+	def __len__(self) -> int:
+		return len(self.names)
+
+	def __repr__(self) -> str:
+		return f"NameIndex(nombres={len(self.names)}, palabras={len(self.postings)})"
+
+	def _token_matches(self, token: str) -> set[int]:
+		matches = set(self.postings.get(token, ()))
+		vocab = [v for n in range(len(token) - 2, len(token) + 3) for v in self.vocab_by_len.get(n, ())]
+		for similar, _score, _ in process.extract(
+			token, vocab, scorer=fuzz.ratio, score_cutoff=self.TOKEN_CUTOFF, limit=self.TOKEN_LIMIT
+		):
+			matches |= self.postings[similar]
+		return matches
+
+	def search(self, query: str, k: int = 5, score_cutoff: float = 0.0) -> list[tuple[T, str, float]]:
+		"""Hasta k (item, nombre normalizado, score 0-100), de mayor a menor score."""
+		normalizado = normalize_name(query)
+		sets = [m for m in (self._token_matches(t) for t in normalizado.split() if len(t) > 1) if m]
+		if not sets:
+			return []
+		sets.sort(key=len)
+		candidatos = sets[0]
+		for s in sets[1:]:
+			interseccion = candidatos & s
+			if interseccion:
+				candidatos = interseccion
+		elegidos = list(candidatos)[: self.MAX_CANDIDATES]
+		resultados = process.extract(
+			normalizado,
+			{pos: self.names[pos] for pos in elegidos},
+			scorer=fuzz.token_sort_ratio,
+			score_cutoff=score_cutoff,
+			limit=k,
+		)
+		return [(self.items[pos], nombre, float(score)) for nombre, score, pos in resultados]
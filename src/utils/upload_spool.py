@@ -0,0 +1,332 @@
+"""Spool de adjuntos direccionado por contenido y subidas a Drive en segundo plano.
+
+El handler del bot descarga el archivo directo a spool/tmp y lo mueve al spool
+(put_file: ruta por sha256, un mismo certificado reenviado se guarda una sola
+vez), encola la subida (submit) y responde enseguida; los hilos del spool suben
+el archivo con reintentos y backoff exponencial y al terminar llaman a
+`on_uploaded` con los avisos destino (el bot actualiza Certificado.archivo_path
+con el link). Si el aviso se crea después (certificado enviado durante el
+diálogo), add_target lo agrega como destino.
+
+Cada archivo tiene un manifiesto jobs/<sha256>.json con su estado, intentos y
+avisos destino, así que las subidas pendientes sobreviven a un reinicio
+(resume) y un archivo ya subido no se vuelve a subir.
+"""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# (ruta local, nombre, mime) -> link
+Uploader = Callable[[Path, str, str], str]
+# (manifiesto con los avisos destino, link) -> None
+OnUploaded = Callable[["UploadJob", str], None]
+
+# Errores que no se arreglan reintentando (Drive sin configurar, credenciales, librería ausente)
+PERMANENT_ERRORS: tuple[type[BaseException], ...] = (ValueError, ImportError, RuntimeError)
+
+
+@dataclass
+class UploadJob:
+	digest: str
+	ext: str
+	filename: str
+	mime_type: str
+	# Avisos a actualizar cuando termine la subida (vacío = todavía sin aviso)
+	targets: list[str] = field(default_factory=list)
+	state: str = "pending"  # pending | done | failed
+	attempts: int = 0
+	link: Optional[str] = None
+	error: Optional[str] = None
+
+
+class UploadSpool:
+	def __init__(
+		self,
+		root: Path | str,
+		uploader: Uploader,
+		on_uploaded: Optional[OnUploaded] = None,
+		workers: int = 2,
+		max_attempts: int = 6,
+		backoff_base: float = 2.0,
+		backoff_max: float = 600.0,
+	) -> None:
+		self.root = Path(root)
+		self.uploader = uploader
+		self.on_uploaded = on_uploaded
+		self.workers = workers
+		self.max_attempts = max_attempts
+		self.backoff_base = backoff_base
+		self.backoff_max = backoff_max
+		(self.root / "objects").mkdir(parents=True, exist_ok=True)
+		(self.root / "jobs").mkdir(parents=True, exist_ok=True)
+		(self.root / "tmp").mkdir(parents=True, exist_ok=True)
+		self._cond = threading.Condition()
+		# (vence_en, secuencia, digest): subidas a intentar a partir de vence_en
+		self._heap: list[tuple[float, int, str]] = []
+		self._seq = 0
+		self._queued: set[str] = set()
+		self._threads: list[threading.Thread] = []
+		self._closing = False
+		self._stats = {"stored": 0, "deduplicated": 0, "uploaded": 0, "retries": 0, "failed": 0}
+
+	# --- Archivos ---
+
+	def object_path(self, digest: str, ext: str) -> Path:
+		return self.root / "objects" / digest[:2] / f"{digest}{ext}"
+
+	def temp_path(self) -> Path:
+		"""Ruta nueva en spool/tmp para descargar un archivo antes de put_file."""
+		return self.root / "tmp" / f"{uuid.uuid4().hex}.part"
+
+	def put_file(self, tmp: Path | str, ext: str = "") -> tuple[str, Path]:
+		"""Mueve `tmp` (dentro del spool) a objects/ por su sha256; retorna (sha256, ruta).
+
+		Si el contenido ya estaba, `tmp` se borra y se devuelve la ruta existente.
+		"""
+		tmp = Path(tmp)
+		sha = hashlib.sha256()
+		with tmp.open("rb") as fh:
+			for bloque in iter(lambda: fh.read(1 << 20), b""):
+				sha.update(bloque)
+		digest = sha.hexdigest()
+		path = self.object_path(digest, ext.lower())
+		if path.exists():
+			tmp.unlink()
+			self._stats["deduplicated"] += 1
+			return digest, path
+		path.parent.mkdir(parents=True, exist_ok=True)
+		os.replace(tmp, path)
+		self._stats["stored"] += 1
+		return digest, path
+
+	def put_bytes(self, data: bytes, ext: str = "") -> tuple[str, Path]:
+		"""Guarda `data` en el spool; retorna (sha256, ruta). Si ya estaba no se reescribe."""
+		tmp = self.temp_path()
+		tmp.write_bytes(data)
+		return self.put_file(tmp, ext)
+
+	# --- Manifiestos ---
+
+	def _job_path(self, digest: str) -> Path:
+		return self.root / "jobs" / f"{digest}.json"
+
+	def load_job(self, digest: str) -> Optional[UploadJob]:
+		try:
+			return UploadJob(**json.loads(self._job_path(digest).read_text(encoding="utf-8")))
+		except FileNotFoundError:
+			return None
+
+	def _save_job(self, job: UploadJob) -> None:
+		path = self._job_path(job.digest)
+		tmp = path.with_suffix(".tmp")
+		tmp.write_text(json.dumps(asdict(job)), encoding="utf-8")
+		os.replace(tmp, path)
+
+	# --- Cola ---
+
+	def _schedule(self, digest: str, delay: float = 0.0) -> None:
+		with self._cond:
+			if digest in self._queued:
+				return
+			self._queued.add(digest)
+			self._seq += 1
+			heapq.heappush(self._heap, (time.monotonic() + delay, self._seq, digest))
+			self._cond.notify()
+
+	def submit(self, digest: str, ext: str, filename: str, mime_type: str, id_aviso: Optional[str] = None) -> UploadJob:
+		"""Encola la subida del archivo `digest` (ya guardado con put_file/put_bytes).
+
+		Si el mismo contenido ya se subió, no se vuelve a subir (ver add_target).
+		"""
+		with self._cond:
+			job = self.load_job(digest) or UploadJob(digest=digest, ext=ext.lower(), filename=filename, mime_type=mime_type)
+			if job.state == "failed":
+				# Reenvío de un archivo que agotó los intentos: empezar de nuevo
+				job.state, job.attempts, job.error = "pending", 0, None
+			self._save_job(job)
+		if job.state != "done":
+			self._schedule(digest)
+		if id_aviso is not None:
+			job = self.add_target(digest, id_aviso) or job
+		return job
+
+	def add_target(self, digest: str, id_aviso: str) -> Optional[UploadJob]:
+		"""Agrega `id_aviso` a los destinos de la subida de `digest`.
+
+		Si la subida ya terminó, `on_uploaded` se llama enseguida (en este hilo)
+		para ese aviso. Retorna None si el archivo no se encoló (Drive sin configurar).
+		"""
+		with self._cond:
+			job = self.load_job(digest)
+			if job is None or id_aviso in job.targets:
+				return job
+			job.targets.append(id_aviso)
+			self._save_job(job)
+		# Si no terminó, _attempt relee el manifiesto bajo el lock y ve el destino nuevo
+		if job.state == "done" and self.on_uploaded is not None and job.link:
+			self.on_uploaded(UploadJob(**{**asdict(job), "targets": [id_aviso]}), job.link)
+		return job
+
+	def resume(self) -> int:
+		"""Vuelve a encolar las subidas pendientes de una ejecución anterior."""
+		# Descargas que quedaron a medias al cortarse el proceso
+		for tmp in (self.root / "tmp").glob("*.part"):
+			tmp.unlink(missing_ok=True)
+		pendientes = 0
+		for path in (self.root / "jobs").glob("*.json"):
+			job = self.load_job(path.stem)
+			if job is not None and job.state == "pending":
+				self._schedule(job.digest)
+				pendientes += 1
+		return pendientes
+
+	def _backoff(self, attempts: int) -> float:
+		# Exponencial con jitter (evita que todas las subidas reintenten juntas)
+		delay = min(self.backoff_base * (2 ** (attempts - 1)), self.backoff_max)
+		return delay * random.uniform(0.5, 1.0)
+
+	def _update_job(self, digest: str, **changes) -> UploadJob:
+		"""Relee y guarda el manifiesto bajo el lock (submit puede agregar destinos mientras tanto)."""
+		with self._cond:
+			job = self.load_job(digest)
+			for key, value in changes.items():
+				setattr(job, key, value)
+			self._save_job(job)
+			return job
+
+	def _attempt(self, digest: str) -> None:
+		job = self.load_job(digest)
+		if job is None or job.state != "pending":
+			return
+		path = self.object_path(job.digest, job.ext)
+		attempts = job.attempts + 1
+		try:
+			link = self.uploader(path, job.filename, job.mime_type)
+		except Exception as e:
+			error = f"{type(e).__name__}: {e}"
+			if isinstance(e, PERMANENT_ERRORS) or attempts >= self.max_attempts:
+				self._update_job(digest, state="failed", attempts=attempts, error=error)
+				self._stats["failed"] += 1
+				logger.warning(f"Subida de {job.filename} abandonada tras {attempts} intento(s): {error}")
+				return
+			self._update_job(digest, attempts=attempts, error=error)
+			self._stats["retries"] += 1
+			delay = self._backoff(attempts)
+			logger.info(f"Subida de {job.filename} falló ({error}); reintento en {delay:.1f}s")
+			self._schedule(digest, delay)
+			return
+		job = self._update_job(digest, state="done", link=link, attempts=attempts, error=None)
+		self._stats["uploaded"] += 1
+		if self.on_uploaded is not None and job.targets:
+			try:
+				self.on_uploaded(job, link)
+			except Exception as e:
+				logger.error(f"Subida de {job.filename} lista ({link}) pero no se pudo registrar: {e}")
+
+	def _worker(self) -> None:
+		while True:
+			with self._cond:
+				while True:
+					if self._closing:
+						return
+					ahora = time.monotonic()
+					if self._heap and self._heap[0][0] <= ahora:
+						_, _, digest = heapq.heappop(self._heap)
+						self._queued.discard(digest)
+						break
+					self._cond.wait(self._heap[0][0] - ahora if self._heap else None)
+			try:
+				self._attempt(digest)
+			except Exception:
+				logger.exception(f"Error inesperado subiendo {digest}")
+
+	# --- Ciclo de vida ---
+
+	def start(self) -> "UploadSpool":
+		if not self._threads:
+			self._closing = False
+			self._threads = [
+				threading.Thread(target=self._worker, name=f"upload-{i}", daemon=True) for i in range(self.workers)
+			]
+			for t in self._threads:
+				t.start()
+		return self
+
+	def close(self, timeout: float = 5.0) -> None:
+		"""Detiene los hilos; lo pendiente queda en los manifiestos para resume()."""
+		with self._cond:
+			self._closing = True
+			self._cond.notify_all()
+		for t in self._threads:
+			t.join(timeout)
+		self._threads = []
+		with self._cond:
+			self._heap.clear()
+			self._queued.clear()
+
+	def join(self, timeout: float = 10.0) -> bool:
+		"""Espera a que no queden subidas en cola (tests y scripts); False si vence el plazo."""
+		limite = time.monotonic() + timeout
+		while time.monotonic() < limite:
+			with self._cond:
+				if not self._heap and not any(
+					(job := self.load_job(p.stem)) is not None and job.state == "pending"
+					for p in (self.root / "jobs").glob("*.json")
+				):
+					return True
+			time.sleep(0.01)
+		return False
+
+	def stats(self) -> dict[str, int]:
+		with self._cond:
+			return {**self._stats, "en_cola": len(self._heap)}
+
+
+def drive_uploader(path: Path, filename: str, mime_type: str) -> str:
+	"""Uploader real: drive_upload.upload_file (googleapiclient, bloqueante)."""
+	from .drive_upload import upload_file  # import aquí para evitar carga lenta inicial
+
+	return upload_file(str(path), filename=filename, mime_type=mime_type)
+
+
+def _registrar_link(job: UploadJob, link: str) -> None:
+	from ..persistence.dao import set_certificado_archivo_path
+
+	for id_aviso in job.targets:
+		set_certificado_archivo_path(id_aviso, link)
+
+
+_spool: Optional[UploadSpool] = None
+_spool_lock = threading.Lock()
+
+
+def get_upload_spool() -> UploadSpool:
+	"""Spool del proceso (UPLOAD_SPOOL_DIR) que sube a Drive y registra el link en el certificado."""
+	global _spool
+	with _spool_lock:
+		if _spool is None:
+			_spool = UploadSpool(
+				settings.UPLOAD_SPOOL_DIR,
+				drive_uploader,
+				on_uploaded=_registrar_link,
+				workers=settings.UPLOAD_WORKERS,
+				max_attempts=settings.UPLOAD_MAX_ATTEMPTS,
+				backoff_base=settings.UPLOAD_BACKOFF_BASE,
+				backoff_max=settings.UPLOAD_BACKOFF_MAX,
+			)
+		return _spool
@@ -6,225 +6,277 @@ API routes para el dashboard RRHH
 import logging
 import os
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from aiohttp import web
 from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 
+from ..persistence import async_dao
+from .cache import cache_key, etag_matches, make_etag, response_cache
+
 logger = logging.getLogger(__name__)
 
 
-async def get_ausencias(request: Request) -> Response:
-    """Endpoint que devuelve todas las ausencias con filtros opcionales"""
-    try:
-        from ..persistence.dao import session_scope
-        from ..persistence.models import Aviso, Employee
-        from sqlalchemy import select, func, and_
-        
-        # Parámetros de query
-        estado = request.query.get('estado', '').lower().strip()
-        motivo = request.query.get('motivo', '').strip()
-        fecha_desde = request.query.get('fecha_desde', '').strip()
-        fecha_hasta = request.query.get('fecha_hasta', '').strip()
-        filtro_fecha = request.query.get('filtro_fecha', '').strip()  # hoy, 3dias, semana, mes, todos
-        area = request.query.get('area', '').strip()  # filtro por sector/área
-        limit = int(request.query.get('limit', '100'))
-        
-        with session_scope() as session:
-            # Query base - LEFT JOIN para mostrar avisos sin empleado
-            query = select(Aviso, Employee).outerjoin(Employee, Aviso.legajo == Employee.legajo)
-            
-            # Aplicar filtros
-            if estado:
-                if estado == 'completo':
-                    query = query.where(Aviso.estado_aviso == 'completo')
-                elif estado == 'incompleto':
-                    query = query.where(Aviso.estado_aviso != 'completo')
-                elif estado == 'rechazado':
-                    query = query.where(Aviso.estado_aviso == 'rechazado')
-            
-            if motivo:
-                query = query.where(Aviso.motivo == motivo)
-            
-            if area:
-                if area == "N/A":
-                    query = query.where(Employee.area.is_(None))
-                else:
-                    query = query.where(Employee.area == area)
-            
-            # Filtros de fecha - predefinidos tienen prioridad
-            from datetime import datetime, timedelta
-            if filtro_fecha:
-                today = datetime.now().date()
-                if filtro_fecha == "hoy":
-                    query = query.where(Aviso.fecha_inicio == today)
-                elif filtro_fecha == "3dias":
-                    fecha_desde_obj = today - timedelta(days=2)
-                    query = query.where(Aviso.fecha_inicio >= fecha_desde_obj)
-                elif filtro_fecha == "semana":
-                    fecha_desde_obj = today - timedelta(days=6)
-                    query = query.where(Aviso.fecha_inicio >= fecha_desde_obj)
-                elif filtro_fecha == "mes":
-                    fecha_desde_obj = today - timedelta(days=29)
-                    query = query.where(Aviso.fecha_inicio >= fecha_desde_obj)
-                # "todos" no aplica filtro
-            else:
-                # Filtros de fecha personalizados
-                if fecha_desde:
-                    try:
-                        fecha_desde_obj = datetime.fromisoformat(fecha_desde).date()
-                        query = query.where(Aviso.fecha_inicio >= fecha_desde_obj)
-                    except:
-                        pass  # Ignorar fecha inválida
-                
-                if fecha_hasta:
-                    try:
-                        fecha_hasta_obj = datetime.fromisoformat(fecha_hasta).date()
-                        query = query.where(Aviso.fecha_inicio <= fecha_hasta_obj)
-                    except:
-                        pass  # Ignorar fecha inválida
-            
-            # Ordenar por fecha más reciente primero
-            query = query.order_by(Aviso.created_at.desc()).limit(limit)
-            
-            # Ejecutar query con LEFT JOIN
-            result_tuples = session.execute(query).all()
-            
-            # Formatear respuesta
-            results = []
-            for row in result_tuples:
-                aviso = row[0]  # Aviso object
-                empleado = row[1] if len(row) > 1 else None  # Employee object or None
-                
-                # Calcular si requiere validación RRHH (empleado no encontrado o datos faltantes)
-                requiere_validacion = not empleado or not empleado.nombre or not empleado.area
-                
-                # Calcular prioridad
-                if requiere_validacion:
-                    prioridad = "alta"  # Validación RRHH siempre es alta prioridad
-                elif aviso.estado_aviso == "completo":
-                    prioridad = "baja"
-                else:
-                    prioridad = "media"
-                
-                # Determinar acción requerida
-                accion = "Sin acción"
-                if requiere_validacion:
-                    accion = "Validar empleado"
-                elif aviso.estado_certificado in ["pendiente", "en_revision"]:
-                    accion = "Revisar certificado"
-                elif aviso.estado_aviso == "pendiente":
-                    accion = "Seguimiento"
-                
-                # Extraer nombre provisional de observaciones si existe
-                nombre_provisional = None
-                if hasattr(aviso, 'observaciones') and aviso.observaciones:
-                    # Formato: "Legajo PROVISIONAL - juan carlos pérez - validar con RRHH"
-                    if "PROVISIONAL -" in aviso.observaciones:
-                        parts = aviso.observaciones.split(" - ")
-                        if len(parts) >= 2:
-                            nombre_provisional = parts[1].title()  # Capitalize
-                
-                result = {
-                    "id_aviso": aviso.id_aviso,
-                    "legajo": aviso.legajo,
-                    "nombre_empleado": (
-                        empleado.nombre if empleado 
-                        else nombre_provisional if nombre_provisional 
-                        else "No encontrado"
-                    ),
-                    "area": empleado.area if empleado else "N/A",
-                    "puesto": empleado.puesto if empleado else "N/A",
-                    "motivo": aviso.motivo,
-                    "fecha_inicio": aviso.fecha_inicio.isoformat() if aviso.fecha_inicio else None,
-                    "dias_estimados": aviso.duracion_estimdays,
-                    "fecha_fin_estimada": aviso.fecha_fin_estimada.isoformat() if aviso.fecha_fin_estimada else None,
-                    "estado_aviso": aviso.estado_aviso or "pendiente",
-                    "estado_certificado": aviso.estado_certificado or "N/A",
-                    "requiere_validacion_rrhh": requiere_validacion,
-                    "prioridad": prioridad,
-                    "accion_requerida": accion,
-                    "fecha_creacion": aviso.created_at.isoformat() if aviso.created_at else None,
-                    "observaciones": getattr(aviso, 'observaciones', '') or ""
-                }
-                results.append(result)
+def _needs_employee_join(request: Request) -> bool:
+    """Filtros / orden que dependen de columnas de employees (se resuelven en SQL)"""
+    return bool(
+        request.query.get('area', '').strip()
+        or request.query.get('prioridad', '').lower().strip() in ('alta', 'media', 'baja')
+        or request.query.get('orden', '').strip() == 'prioridad'
+    )
+
+
+def _ausencias_query(request: Request, join_empleados: bool = True):
+    """Select de filas del dashboard con los filtros aplicados (sin orden ni límite)
+    
+    Sin join_empleados solo lee avisos (avisos_select): los datos del empleado
+    los completa el EmployeeDirectory en memoria.
+    """
+    from ..persistence.models import Aviso, Employee
+    from ..persistence.queries import ausencias_select, avisos_select, prioridad_expr
+    from datetime import datetime, timedelta
+    
+    # Parámetros de query
+    estado = request.query.get('estado', '').lower().strip()
+    motivo = request.query.get('motivo', '').strip()
+    fecha_desde = request.query.get('fecha_desde', '').strip()
+    fecha_hasta = request.query.get('fecha_hasta', '').strip()
+    filtro_fecha = request.query.get('filtro_fecha', '').strip()  # hoy, 3dias, semana, mes, todos
+    area = request.query.get('area', '').strip()  # filtro por sector/área
+    prioridad = request.query.get('prioridad', '').lower().strip()  # alta, media, baja
+    
+    # Query base - LEFT JOIN para mostrar avisos sin empleado (campos derivados en SQL)
+    query = ausencias_select() if join_empleados else avisos_select()
+    
+    # Aplicar filtros
+    if estado:
+        if estado == 'completo':
+            query = query.where(Aviso.estado_aviso == 'completo')
+        elif estado == 'incompleto':
+            query = query.where(Aviso.estado_aviso != 'completo')
+        elif estado == 'rechazado':
+            query = query.where(Aviso.estado_aviso == 'rechazado')
+    
+    if motivo:
+        query = query.where(Aviso.motivo == motivo)
+    
+    if prioridad in ('alta', 'media', 'baja'):
+        query = query.where(prioridad_expr() == prioridad)
+    
+    if area:
+        if area == "N/A":
+            query = query.where(Employee.area.is_(None))
+        else:
+            query = query.where(Employee.area == area)
+    
+    # Filtros de fecha - predefinidos tienen prioridad
+    if filtro_fecha:
+        today = datetime.now().date()
+        if filtro_fecha == "hoy":
+            query = query.where(Aviso.fecha_inicio == today)
+        elif filtro_fecha == "3dias":
+            fecha_desde_obj = today - timedelta(days=2)
+            query = query.where(Aviso.fecha_inicio >= fecha_desde_obj)
+        elif filtro_fecha == "semana":
+            fecha_desde_obj = today - timedelta(days=6)
+            query = query.where(Aviso.fecha_inicio >= fecha_desde_obj)
+        elif filtro_fecha == "mes":
+            fecha_desde_obj = today - timedelta(days=29)
+            query = query.where(Aviso.fecha_inicio >= fecha_desde_obj)
+        # "todos" no aplica filtro
+    else:
+        # Filtros de fecha personalizados
+        if fecha_desde:
+            try:
+                fecha_desde_obj = datetime.fromisoformat(fecha_desde).date()
+                query = query.where(Aviso.fecha_inicio >= fecha_desde_obj)
+            except:
+                pass  # Ignorar fecha inválida
         
+        if fecha_hasta:
+            try:
+                fecha_hasta_obj = datetime.fromisoformat(fecha_hasta).date()
+                query = query.where(Aviso.fecha_inicio <= fecha_hasta_obj)
+            except:
+                pass  # Ignorar fecha inválida
+    
+    return query
+
+
+def _json_default(value: Any) -> str:
+    # date / datetime de las columnas del select
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"No serializable: {type(value).__name__}")
+
+
+JSON_CONTENT_TYPE = "application/json; charset=utf-8"
+# Tope de cuerpo guardado en la caché de respuestas (páginas más grandes solo se transmiten)
+MAX_CACHED_BODY = 4 * 1024 * 1024
+
+
+async def _from_cache(request: Request) -> Tuple[Optional[Response], int, str, Dict[str, str]]:
+    """Resuelve 304 / respuesta cacheada sin consultar datos.
+    
+    La versión de datos (DATA_VERSION_TTL) + los parámetros definen el ETag, así
+    un If-None-Match vigente responde 304 aunque la entrada ya no esté en caché.
+    Retorna (respuesta o None, versión, clave, headers para la respuesta nueva).
+    """
+    version = await async_dao.data_version()
+    key = cache_key(request)
+    headers = {"ETag": make_etag(version, key), "Cache-Control": "no-cache"}
+    if etag_matches(request, headers["ETag"]):
+        response_cache.not_modified += 1
+        return web.Response(status=304, headers=headers), version, key, headers
+    hit = response_cache.get(key, version)
+    if hit is not None:
+        body, content_type = hit
+        return web.Response(body=body, headers={"Content-Type": content_type, **headers}), version, key, headers
+    return None, version, key, headers
+
+
+# Filas por escritura al stream (y por fetch del cursor de la base)
+STREAM_BATCH = 100
+
+
+async def get_ausencias(request: Request) -> web.StreamResponse:
+    """Endpoint que devuelve ausencias con filtros opcionales, paginadas por keyset.
+    
+    - limit: tamaño de página (máx. MAX_PAGE_SIZE)
+    - cursor: token `next_cursor` de la página anterior
+    - prioridad: alta | media | baja (filtro)
+    - orden: prioridad → alta primero, luego más recientes (default: más recientes)
+    
+    La página se lee en el pool de la base (async_dao) y el JSON se escribe
+    en streaming por lotes.
+    """
+    from ..persistence.queries import MAX_PAGE_SIZE, decode_cursor
+    
+    try:
+        try:
+            limit = int(request.query.get('limit', '100'))
+        except ValueError:
+            limit = 100
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        token = request.query.get('cursor', '').strip()
+        try:
+            cursor = decode_cursor(token) if token else None
+        except ValueError as e:
+            return web.json_response({"success": False, "error": str(e)}, status=400)
+        join_empleados = _needs_employee_join(request)
+        query = _ausencias_query(request, join_empleados)
+        por_prioridad = request.query.get('orden', '').strip() == 'prioridad'
+    except Exception as e:
+        logger.error(f"Error obteniendo ausencias: {e}", exc_info=True)
         return web.json_response({
-            "success": True,
-            "count": len(results),
-            "data": results
-        })
-        
+            "success": False,
+            "error": str(e)
+        }, status=500)
+    
+    cached, version, key, headers = await _from_cache(request)
+    if cached is not None:
+        return cached
+    
+    try:
+        filas, next_cursor = await async_dao.run_db(_fetch_page, query, cursor, limit, por_prioridad, join_empleados)
     except Exception as e:
         logger.error(f"Error obteniendo ausencias: {e}", exc_info=True)
         return web.json_response({
             "success": False,
             "error": str(e)
         }, status=500)
+    
+    response = web.StreamResponse(headers={"Content-Type": JSON_CONTENT_TYPE, **headers})
+    await response.prepare(request)
+    chunks: List[bytes] = []
+    size = 0
+    
+    async def write(chunk: bytes) -> None:
+        # Copia para la caché mientras no supere MAX_CACHED_BODY
+        nonlocal size
+        size += len(chunk)
+        if size <= MAX_CACHED_BODY:
+            chunks.append(chunk)
+        await response.write(chunk)
+    
+    try:
+        await _stream_ausencias(write, filas, next_cursor)
+        if size <= MAX_CACHED_BODY:
+            response_cache.put(key, version, b"".join(chunks), JSON_CONTENT_TYPE)
+    except Exception as e:
+        # Con la respuesta ya iniciada no se puede cambiar el status (cliente desconectado)
+        logger.error(f"Error en streaming de ausencias: {e}", exc_info=True)
+    await response.write_eof()
+    return response
+
+
+def _fetch_page(query, cursor, limit: int, por_prioridad: bool = False,
+                join_empleados: bool = True) -> Tuple[List[str], Optional[str]]:
+    """Lee una página (limit + 1 filas) y la serializa; corre en el pool de la base"""
+    import json
+    from ..persistence.dao import session_scope
+    from ..persistence.directory import employee_directory
+    from ..persistence.queries import encode_cursor, fila_ausencia, keyset_page, prioridad_rango_expr
+    
+    empleados = None if join_empleados else employee_directory.snapshot()
+    rango = prioridad_rango_expr() if por_prioridad else None
+    if rango is not None:
+        query = query.add_columns(rango.label("_rango"))
+    filas: List[str] = []
+    last = None
+    has_more = False
+    with session_scope() as session:
+        result = session.execute(
+            keyset_page(query, cursor, limit, rango),
+            execution_options={"yield_per": STREAM_BATCH},
+        )
+        try:
+            for row in result:
+                if len(filas) == limit:
+                    has_more = True
+                    break
+                if empleados is not None:
+                    fila = fila_ausencia(row, empleados.get(row.legajo))
+                else:
+                    fila = dict(row._mapping)
+                    fila.pop("_rango", None)
+                filas.append(json.dumps(fila, default=_json_default))
+                last = row
+        finally:
+            result.close()
+    next_cursor = None
+    if has_more and last is not None:
+        next_cursor = encode_cursor(last.fecha_creacion, last.id_aviso, last._rango if rango is not None else None)
+    return filas, next_cursor
+
+
+async def _stream_ausencias(write, filas: List[str], next_cursor: Optional[str]) -> None:
+    import json
+    
+    await write(b'{"success": true, "data": [')
+    for i in range(0, len(filas), STREAM_BATCH):
+        await write(((", " if i else "") + ", ".join(filas[i:i + STREAM_BATCH])).encode("utf-8"))
+    await write(f'], "count": {len(filas)}, "next_cursor": {json.dumps(next_cursor)}}}'.encode("utf-8"))
 
 
 async def get_stats(request: Request) -> Response:
     """Endpoint que devuelve estadísticas resumidas"""
     try:
-        from ..persistence.dao import session_scope
-        from ..persistence.models import Aviso, Employee
-        from sqlalchemy import select, func, and_
+        import json
         
-        with session_scope() as session:
-            # Contar totales
-            total_ausencias = session.execute(
-                select(func.count()).select_from(Aviso)
-            ).scalar()
-            
-            ausencias_activas = session.execute(
-                select(func.count()).select_from(Aviso).where(
-                    Aviso.estado_aviso != 'completo'
-                )
-            ).scalar()
-            
-            # Para requieren_validacion necesitamos hacer un join y evaluar la lógica
-            from sqlalchemy import or_
-            requieren_validacion = session.execute(
-                select(func.count()).select_from(Aviso).join(Employee, Aviso.legajo == Employee.legajo, isouter=True).where(
-                    or_(Employee.legajo.is_(None), Employee.nombre.is_(None), Employee.area.is_(None))
-                )
-            ).scalar()
-            
-            certificados_pendientes = session.execute(
-                select(func.count()).select_from(Aviso).where(
-                    Aviso.estado_certificado.in_(['pendiente', 'en_revision'])
-                )
-            ).scalar()
-            
-            completadas = session.execute(
-                select(func.count()).select_from(Aviso).where(
-                    Aviso.estado_aviso == 'completo'
-                )
-            ).scalar()
-            
-            # Casos de alta prioridad (requieren validación + certificados en revisión)
-            alta_prioridad = session.execute(
-                select(func.count()).select_from(Aviso).join(Employee, Aviso.legajo == Employee.legajo, isouter=True).where(
-                    and_(
-                        or_(Employee.legajo.is_(None), Employee.nombre.is_(None), Employee.area.is_(None)),
-                        Aviso.estado_certificado.in_(['pendiente', 'en_revision'])
-                    )
-                )
-            ).scalar()
+        cached, version, key, headers = await _from_cache(request)
+        if cached is not None:
+            return cached
         
-        stats = {
-            "total_ausencias": total_ausencias,
-            "ausencias_activas": ausencias_activas,
-            "requieren_validacion": requieren_validacion,
-            "certificados_pendientes": certificados_pendientes,
-            "completadas": completadas,
-            "alta_prioridad": alta_prioridad
-        }
+        # Un solo recorrido con SUM(CASE ...) o la tabla materializada (STATS_MATERIALIZED)
+        stats = await async_dao.get_stats()
         
-        return web.json_response({
+        body = json.dumps({
             "success": True,
             "stats": stats
-        })
+        }).encode("utf-8")
+        response_cache.put(key, version, body, JSON_CONTENT_TYPE)
+        return web.Response(body=body, headers={"Content-Type": JSON_CONTENT_TYPE, **headers})
         
     except Exception as e:
         logger.error(f"Error obteniendo estadísticas: {e}", exc_info=True)
@@ -239,57 +291,48 @@ async def get_certificate(request: Request) -> Response:
     try:
         id_aviso = request.match_info['id_aviso']
         
-        from ..persistence.dao import session_scope
-        from ..persistence.models import Certificado
-        from sqlalchemy import select
+        archivo_path = await async_dao.get_certificado_path(id_aviso)
+        if not archivo_path:
+            return web.json_response({
+                "success": False,
+                "error": "Certificado no encontrado"
+            }, status=404)
+        
+        # Construir ruta del archivo
+        base_dir = Path(__file__).parent.parent.parent  # Ir al directorio raíz
+        file_path = base_dir / archivo_path.replace('\\', '/')
+        
+        if not file_path.exists():
+            return web.json_response({
+                "success": False,
+                "error": "Archivo no encontrado en disco"
+            }, status=404)
+        
+        # Determinar content type
+        content_type = "image/jpeg"
+        if file_path.suffix.lower() == ".pdf":
+            content_type = "application/pdf"
+        elif file_path.suffix.lower() == ".png":
+            content_type = "image/png"
+        elif file_path.suffix.lower() == ".docx":
+            content_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        elif file_path.suffix.lower() == ".doc":
+            content_type = "application/msword"
+        
+        # Determinar disposition (inline para imágenes/PDF, attachment para documentos)
+        disposition = "inline"
+        if file_path.suffix.lower() in [".docx", ".doc"]:
+            disposition = "attachment"
+        
+        # Devolver el archivo
+        return web.FileResponse(
+            path=file_path,
+            headers={
+                "Content-Disposition": f'{disposition}; filename="certificado_{id_aviso}{file_path.suffix}"',
+                "Content-Type": content_type
+            }
+        )
         
-        with session_scope() as session:
-            # Buscar el certificado
-            certificado = session.execute(
-                select(Certificado).where(Certificado.id_aviso == id_aviso)
-            ).scalars().first()
-            
-            if not certificado or not certificado.archivo_path:
-                return web.json_response({
-                    "success": False,
-                    "error": "Certificado no encontrado"
-                }, status=404)
-            
-            # Construir ruta del archivo
-            base_dir = Path(__file__).parent.parent.parent  # Ir al directorio raíz
-            file_path = base_dir / certificado.archivo_path.replace('\\', '/')
-            
-            if not file_path.exists():
-                return web.json_response({
-                    "success": False,
-                    "error": "Archivo no encontrado en disco"
-                }, status=404)
-            
-            # Determinar content type
-            content_type = "image/jpeg"
-            if file_path.suffix.lower() == ".pdf":
-                content_type = "application/pdf"
-            elif file_path.suffix.lower() == ".png":
-                content_type = "image/png"
-            elif file_path.suffix.lower() == ".docx":
-                content_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            elif file_path.suffix.lower() == ".doc":
-                content_type = "application/msword"
-            
-            # Determinar disposition (inline para imágenes/PDF, attachment para documentos)
-            disposition = "inline"
-            if file_path.suffix.lower() in [".docx", ".doc"]:
-                disposition = "attachment"
-            
-            # Devolver el archivo
-            return web.FileResponse(
-                path=file_path,
-                headers={
-                    "Content-Disposition": f'{disposition}; filename="certificado_{id_aviso}{file_path.suffix}"',
-                    "Content-Type": content_type
-                }
-            )
-            
     except Exception as e:
         logger.error(f"Error sirviendo certificado: {e}", exc_info=True)
         return web.json_response({
@@ -304,4 +347,13 @@ def setup_api_routes(app: web.Application) -> None:
     app.router.add_get('/api/stats', get_stats)
     app.router.add_get('/api/certificado/{id_aviso}', get_certificate)
     
+    # Server-Sent Events para actualizaciones en vivo del dashboard
+    from .events import setup_event_routes
+    setup_event_routes(app)
+    
+    # Pool de hilos de la base (async_dao): cerrarlo al apagar el servidor
+    async def _shutdown_db_pool(app: web.Application) -> None:
+        async_dao.shutdown(wait=False)
+    app.on_cleanup.append(_shutdown_db_pool)
+    
     logger.info("Rutas de API configuradas")
\ No newline at end of file
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Caché de respuestas de la API por versión de datos + ETag / If-None-Match
+"""
+
+import hashlib
+from collections import OrderedDict
+from datetime import date
+from threading import Lock
+from typing import Optional, Tuple
+
+from aiohttp.web_request import Request
+
+from ..config import settings
+
+
+def cache_key(request: Request) -> str:
+    """Día + ruta + parámetros ordenados (el orden en la URL no importa).
+    
+    El día entra en la clave porque filtros como filtro_fecha=hoy dependen de la fecha.
+    """
+    params = "&".join(f"{k}={v}" for k, v in sorted(request.query.items()))
+    return f"{date.today().isoformat()}|{request.path}?{params}"
+
+
+def make_etag(version: int, key: str) -> str:
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=6).hexdigest()
+    return f'"v{version}-{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("If-None-Match", "")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Comparación débil: se ignora el prefijo W/
+    candidates = {c.strip().removeprefix("W/") for c in header.split(",")}
+    return etag in candidates
+
+
+class ResponseCache:
+    """LRU de cuerpos ya serializados; una entrada vale solo para su versión de datos"""
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[int, bytes, str]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: str, version: int) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] != version:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1], item[2]
+
+    def put(self, key: str, version: int, body: bytes, content_type: str) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (version, body, content_type)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
+
+
+response_cache = ResponseCache(settings.API_CACHE_SIZE)
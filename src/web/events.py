@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events para el dashboard RRHH (/api/events)
+
+Pub/sub en proceso: los commits del DAO (persistence.version.subscribe) encolan
+los ids de avisos tocados; un despachador arma las filas una sola vez y las
+difunde a todos los navegadores conectados. Las escrituras de otros procesos
+(el bot) se detectan por data_version y se difunden como "refresh".
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from aiohttp import web
+from aiohttp.web_request import Request
+
+from ..persistence import async_dao
+from ..persistence.version import Cambios, subscribe
+
+logger = logging.getLogger(__name__)
+
+# Intervalo de chequeo de data_version para cambios de otros procesos (segundos)
+POLL_INTERVAL = 1.0
+# Comentario keep-alive para proxies que cortan conexiones ociosas
+HEARTBEAT_INTERVAL = 15.0
+# Eventos pendientes por cliente; si se llena, el cliente recibe un "refresh"
+CLIENT_QUEUE_SIZE = 100
+
+
+def _json_default(value: Any) -> str:
+    # date / datetime igual que en /api/ausencias
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def format_sse(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, default=_json_default)}\n\n".encode("utf-8")
+
+
+def _fetch_rows(ids: List[str]) -> List[Dict[str, Any]]:
+    """Filas del dashboard (mismo formato que /api/ausencias) para los ids dados"""
+    from ..persistence.dao import session_scope
+    from ..persistence.models import Aviso
+    from ..persistence.queries import ausencias_select
+
+    with session_scope() as session:
+        rows = session.execute(ausencias_select().where(Aviso.id_aviso.in_(ids))).all()
+        return [dict(r._mapping) for r in rows]
+
+
+class EventBroker:
+    """Difusión de cambios a los clientes SSE conectados"""
+
+    def __init__(self) -> None:
+        self.clients: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changes: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._unsubscribe = None
+        self._version = 0
+
+    # --- ciclo de vida (on_startup / on_cleanup de aiohttp) ---
+
+    async def start(self, app: web.Application) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._changes = asyncio.Queue()
+        self._version = await async_dao.data_version()
+        self._unsubscribe = subscribe(self._on_commit)
+        self._task = asyncio.create_task(self._dispatch())
+
+    async def stop(self, app: web.Application) -> None:
+        if self._unsubscribe:
+            self._unsubscribe()
+            self._unsubscribe = None
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _on_commit(self, cambios: Cambios) -> None:
+        # Llamado en el hilo que hizo commit: solo se encola en el loop
+        if self._loop is not None and self._changes is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._changes.put_nowait, cambios)
+
+    # --- difusión ---
+
+    def publish(self, event: str, data: Any) -> None:
+        message = format_sse(event, data)
+        for queue in list(self.clients):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Cliente lento: se descarta lo pendiente y se le pide recargar
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(format_sse("refresh", {"motivo": "cola_llena"}))
+
+    async def _dispatch(self) -> None:
+        assert self._changes is not None and self._loop is not None
+        while True:
+            try:
+                cambios: List[Cambios] = []
+                try:
+                    cambios.append(await asyncio.wait_for(self._changes.get(), POLL_INTERVAL))
+                    # Agrupar ráfagas (p. ej. importaciones) en un solo envío
+                    while not self._changes.empty():
+                        cambios.append(self._changes.get_nowait())
+                except asyncio.TimeoutError:
+                    pass
+                version = await async_dao.data_version()
+                if cambios:
+                    await self._publish_changes(cambios, version)
+                elif version != self._version:
+                    # Cambio hecho por otro proceso: no hay detalle, recargar
+                    self.publish("refresh", {"version": version})
+                self._version = version
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error despachando eventos: {e}", exc_info=True)
+                await asyncio.sleep(POLL_INTERVAL)
+
+    async def _publish_changes(self, cambios: List[Cambios], version: int) -> None:
+        if any(c.completo for c in cambios):
+            self.publish("refresh", {"version": version})
+            return
+        eliminados = set().union(*(c.eliminados for c in cambios))
+        ids = sorted(set().union(*(c.avisos for c in cambios)) - eliminados)
+        if ids and self.clients:
+            rows = await async_dao.run_db(_fetch_rows, ids)
+            for row in rows:
+                self.publish("aviso", row)
+        for id_aviso in sorted(eliminados):
+            self.publish("eliminado", {"id_aviso": id_aviso})
+        self.publish("stats", {"version": version})
+
+    # --- endpoint ---
+
+    async def handle(self, request: Request) -> web.StreamResponse:
+        """GET /api/events: stream text/event-stream hasta que el cliente se desconecta"""
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+        await response.prepare(request)
+        queue: asyncio.Queue = asyncio.Queue(CLIENT_QUEUE_SIZE)
+        self.clients.add(queue)
+        try:
+            await response.write(b"retry: 3000\n\n")
+            await response.write(format_sse("hello", {"version": self._version}))
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    message = b": ping\n\n"
+                await response.write(message)
+        except ConnectionResetError:
+            pass
+        finally:
+            self.clients.discard(queue)
+        return response
+
+
+broker = EventBroker()
+
+
+def setup_event_routes(app: web.Application) -> None:
+    """Registra /api/events y el despachador en el ciclo de vida de la app"""
+    app.router.add_get('/api/events', broker.handle)
+    app.on_startup.append(broker.start)
+    app.on_cleanup.append(broker.stop)
@@ -8,11 +8,13 @@ from pathlib import Path
 # Forzar base de datos efímera para tests (evita conflictos con esquemas antiguos)
 test_db = Path(__file__).resolve().parents[1] / "test.db"
 # Resetear base de datos de pruebas para garantizar esquema limpio
-try:
-	if test_db.exists():
-		test_db.unlink()
-except Exception:
-	pass
+# (incluye -wal/-shm de WAL: un WAL viejo se aplicaría sobre la base nueva)
+for path in (test_db, test_db.with_name(test_db.name + "-wal"), test_db.with_name(test_db.name + "-shm")):
+	try:
+		if path.exists():
+			path.unlink()
+	except Exception:
+		pass
 os.environ.setdefault("DATABASE_URL", f"sqlite:///{test_db}")
 
 # Asegura que la raíz del repo esté en sys.path para poder importar el paquete `src`
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from src.telegram.middleware import ChatSerializerMiddleware
+from src.telegram.sharding import LocalDialogue
+
+
+def test_mismo_chat_en_serie_chats_distintos_en_paralelo():
+	mw = ChatSerializerMiddleware(max_concurrency=2)
+	orden: dict[int, list[int]] = {}
+	en_curso = {"chats": set(), "max": 0}
+
+	async def handler(event, data):
+		chat = data["event_chat"].id
+		# Nunca dos updates del mismo chat a la vez
+		assert chat not in en_curso["chats"]
+		en_curso["chats"].add(chat)
+		en_curso["max"] = max(en_curso["max"], len(en_curso["chats"]))
+		await asyncio.sleep(0.01 if event % 2 else 0)
+		orden.setdefault(chat, []).append(event)
+		en_curso["chats"].discard(chat)
+		return event
+
+	async def main():
+		tareas = [
+			asyncio.create_task(mw(handler, n, {"event_chat": SimpleNamespace(id=chat)}))
+			for n in range(5)
+			for chat in (1, 2, 3)
+		]
+		await asyncio.sleep(0)
+		intermedio = mw.stats()
+		resultados = await asyncio.gather(*tareas)
+		return intermedio, resultados
+
+	intermedio, resultados = asyncio.run(main())
+	assert resultados == [n for n in range(5) for _ in (1, 2, 3)]
+	assert orden == {1: [0, 1, 2, 3, 4], 2: [0, 1, 2, 3, 4], 3: [0, 1, 2, 3, 4]}
+	assert en_curso["max"] == 2  # acotado por max_concurrency
+	assert intermedio["en_cola"] == 13 and intermedio["max_profundidad_chat"] == 5
+	stats = mw.stats()
+	assert stats["procesados"] == 15 and stats["en_cola"] == 0 and stats["activos"] == 0
+	assert stats["espera_max_ms"] > 0
+	assert mw._slots == {}
+
+
+def test_update_cancelado_libera_la_cola():
+	mw = ChatSerializerMiddleware(max_concurrency=1)
+
+	async def lento(event, data):
+		await asyncio.sleep(0.05)
+		return event
+
+	async def main():
+		data = {"event_from_user": SimpleNamespace(id=7)}
+		primero = asyncio.create_task(mw(lento, "a", data))
+		segundo = asyncio.create_task(mw(lento, "b", data))
+		await asyncio.sleep(0.01)
+		segundo.cancel()
+		assert await primero == "a"
+		sin_chat = await mw(lento, "c", {})
+		return sin_chat
+
+	assert asyncio.run(main()) == "c"
+	stats = mw.stats()
+	assert stats["en_cola"] == 0 and stats["procesados"] == 2
+	assert mw._slots == {}
+
+
+def test_local_dialogue_procesa_chats_en_paralelo_sin_bloquear_el_loop():
+	mw = ChatSerializerMiddleware(max_concurrency=2)
+	local = LocalDialogue()
+	chats = [f"mw_{i}" for i in range(4)]
+	for chat in chats:
+		local.dm.sessions.pop(chat)
+	en_curso = {"n": 0, "max": 0}
+	lock = threading.Lock()
+
+	def consulta_lenta(legajo):
+		# Directorio "lento": la consulta real corre en el pool de async_dao
+		with lock:
+			en_curso["n"] += 1
+			en_curso["max"] = max(en_curso["max"], en_curso["n"])
+		time.sleep(0.1)
+		with lock:
+			en_curso["n"] -= 1
+		return True, "Empleado"
+
+	local.dm._validate_legajo_in_db = consulta_lenta
+
+	async def handler(event, data):
+		return await local.process_message(data["event_chat"].id, event)
+
+	async def main():
+		latidos: list[float] = []
+
+		async def latido():
+			while True:
+				latidos.append(time.perf_counter())
+				await asyncio.sleep(0.005)
+
+		pulso = asyncio.create_task(latido())
+		t0 = time.perf_counter()
+		respuestas = await asyncio.gather(*(
+			mw(handler, texto, {"event_chat": SimpleNamespace(id=chat)})
+			for texto in ("hola", "1005")
+			for chat in chats
+		))
+		total = time.perf_counter() - t0
+		latidos.append(time.perf_counter())
+		pulso.cancel()
+		return respuestas, total, max(b - a for a, b in zip(latidos, latidos[1:]))
+
+	respuestas, total, pausa_max = asyncio.run(main())
+	assert all("verificado" in r["reply_text"] for r in respuestas[len(chats):])
+	# 4 consultas de 0.1 s de a 2 (BOT_MAX_CONCURRENCY): ~0.2 s, no 0.4 s en serie
+	assert en_curso["max"] == 2
+	assert total < 0.35
+	assert pausa_max < 0.08
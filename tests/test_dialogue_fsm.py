@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from src.dialogue.fsm import DialogueTreeLoader, compile_tree
+from src.dialogue.manager import DIALOGUE_TREE_PATH, REGISTRY, SESSION_DEFAULTS, DialogueManager
+from src.session_store import MemoryBackend, SessionStore
+
+
+def _doc() -> dict:
+	return json.loads(DIALOGUE_TREE_PATH.read_text(encoding="utf-8"))
+
+
+def test_arbol_del_repo_compila_y_despacha_por_paso():
+	tree = compile_tree(_doc(), REGISTRY)
+	assert tree.initial == "inicio" and "confirmacion" in tree.states
+	mgr = DialogueManager(SessionStore(MemoryBackend(), "fsm", defaults=SESSION_DEFAULTS))
+	mgr.process_message("c1", "hola")
+	res = mgr.process_message("c1", "abc")
+	assert res["reply_text"].startswith("Formato inválido")
+	# Paso desconocido (p. ej. "completado"): vuelve a empezar
+	mgr.sessions["c1"]["step"] = "completado"
+	res = mgr.process_message("c1", "hola")
+	assert mgr.sessions["c1"]["step"] == "legajo"
+	# Teclados sin variables se construyen una vez por compilación
+	mgr.sessions["c1"].update(step="dias", requiere_certificado=False, motivo="matrimonio")
+	a = mgr.process_message("c1", "cero")
+	b = mgr.process_message("c1", "nada")
+	assert a["reply_markup"] is b["reply_markup"]
+
+
+@pytest.mark.parametrize(
+	"cambio, error",
+	[
+		(lambda d: d["states"]["inicio"]["transitions"][0].update(goto="no_existe"), "estado inexistente"),
+		(lambda d: d["states"]["legajo"]["transitions"][1].update(action="borrar_todo"), "acción desconocida"),
+		(lambda d: d["states"]["inicio"]["transitions"][0].update(reply="{saludo} {dni}"), "variable desconocida"),
+		(lambda d: d["states"]["motivo"].update(normalizer="regex"), "normalizador desconocido"),
+	],
+)
+def test_arbol_invalido_se_rechaza_al_compilar(cambio, error):
+	doc = _doc()
+	cambio(doc)
+	with pytest.raises(ValueError, match=error):
+		compile_tree(doc, REGISTRY)
+
+
+def test_recarga_en_caliente_y_version_invalida(tmp_path):
+	path = tmp_path / "dialogue.json"
+	doc = _doc()
+	path.write_text(json.dumps(doc), encoding="utf-8")
+	loader = DialogueTreeLoader(path, REGISTRY)
+	primero = loader.get()
+	assert loader.get() is primero
+
+	doc["states"]["inicio"]["transitions"][0]["reply"] = "Bienvenido de nuevo. {pedir_legajo}"
+	path.write_text(json.dumps(doc), encoding="utf-8")
+	nuevo = loader.get()
+	assert nuevo is not primero
+	sess = {**SESSION_DEFAULTS}
+	assert nuevo.dispatch(None, "x", sess, "hola")["reply_text"].startswith("Bienvenido de nuevo.")
+	assert sess["step"] == "legajo"
+
+	# Una versión rota no reemplaza a la vigente
+	doc["states"]["inicio"]["transitions"][0]["goto"] = "no_existe"
+	path.write_text(json.dumps(doc, indent=1), encoding="utf-8")
+	assert loader.get() is nuevo
+	assert loader.stats()["reloads"] == 1 and loader.stats()["errors"] == 1
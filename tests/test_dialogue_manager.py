@@ -42,3 +42,21 @@ def test_flujo_mixto_legajo_luego_campos():
 	assert "Días: 1111" not in res2.get("reply_text")
 
 
+
+
+def test_legajo_inexistente_sugiere_empleado_por_nombre():
+	from src.persistence.dao import session_scope
+	from src.persistence.models import Employee
+
+	with session_scope() as s:
+		if s.get(Employee, "7777") is None:
+			s.add(Employee(legajo="7777", nombre="Rigoberta Quintanilla", area="ventas"))
+	mgr = DialogueManager()
+	mgr.process_message("u_t4", "hola")
+	mgr.process_message("u_t4", "8888")  # no existe → pide nombre
+	res = mgr.process_message("u_t4", "rigoberta quintanila")
+	assert "7777 - Rigoberta Quintanilla" in res["reply_text"]
+	res = mgr.process_message("u_t4", "7777 - Rigoberta Quintanilla")
+	sess = mgr.sessions["u_t4"]
+	assert "verificado" in res["reply_text"]
+	assert (sess["legajo"], sess["legajo_validado"], sess["step"]) == ("7777", True, "motivo")
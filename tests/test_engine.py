@@ -175,3 +175,244 @@ def test_backward_enfermedad_familiar_pide_vinculo():
 	res = backward_chain("crear_aviso", facts)
 	assert res["status"] == "need_info"
 	assert "vinculo_familiar" in res["ask"]
+
+
+def test_kb_cache_hits_y_recarga_por_contenido(tmp_path, monkeypatch):
+	import os
+	import shutil
+	from src.engine import kb_loader
+
+	gl = tmp_path / "glossary.json"
+	rl = tmp_path / "rules.json"
+	shutil.copy(kb_loader.GLOSSARY_PATH, gl)
+	shutil.copy(kb_loader.RULES_PATH, rl)
+	monkeypatch.setattr(kb_loader, "GLOSSARY_PATH", gl)
+	monkeypatch.setattr(kb_loader, "RULES_PATH", rl)
+	kb_loader.clear_kb_cache()
+
+	kb1 = kb_loader.get_knowledge_base()
+	for _ in range(3):
+		forward_chain(_base_facts_ok())
+	assert kb_loader.get_knowledge_base() is kb1
+	stats = kb_loader.kb_cache_stats()
+	assert stats["misses"] == 1 and stats["hits"] == 4 and stats["reloads"] == 0
+
+	# Touch sin cambio de contenido → revalidación, misma KB
+	st = rl.stat()
+	os.utime(rl, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+	assert kb_loader.get_knowledge_base() is kb1
+	assert kb_loader.kb_cache_stats()["revalidations"] == 1
+
+	# Cambio real de contenido → recarga
+	rl.write_text(rl.read_text(encoding="utf-8").replace('"version": 1', '"version": 2'), encoding="utf-8")
+	os.utime(rl, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000))
+	kb2 = kb_loader.get_knowledge_base()
+	assert kb2 is not kb1 and kb2.version == 2
+	assert kb2.fingerprint != kb1.fingerprint
+	assert kb_loader.kb_cache_stats()["reloads"] == 1
+	kb_loader.clear_kb_cache()
+
+
+def test_semantica_de_condiciones_y_acciones_compiladas():
+	from src.engine.compiler import compile_action, compile_condition
+
+	casos = [
+		("==", 3, 3, True), ("==", "3", 3, False), ("!=", None, 3, True),
+		("in", "art", ["art", "x", 3], True), ("in", "y", ("x",), False), ("in", ["a"], [["a"]], True),
+		("in", "art", "art", False), ("in", ["a"], ["art"], False),
+		(">=", "2025-08-18", "2025-08-17", True), ("<=", date(2025, 8, 17), "2025-08-17", True),
+		(">=", "2025-08-17", date(2025, 8, 18), False), (">=", "3", 2, True), ("<=", 3, "2", False),
+		(">=", "x", 3, False), (">=", None, "2025-08-17", False), ("??", 1, 1, False),
+	]
+	for op, left, right, esperado in casos:
+		assert compile_condition({"var": "v", "op": op, "value": right}).test(left) is esperado, (op, left, right)
+
+	for start, esperado in [(None, ["rrhh"]), ("rrhh", ["rrhh"]), ("otro", ["otro", "rrhh"]), (["rrhh"], ["rrhh"]), (["otro"], ["otro", "rrhh"])]:
+		facts = {"v": list(start) if isinstance(start, list) else start}
+		compile_action({"var": "v", "op": "append", "value": "rrhh"}).apply(facts)
+		assert facts["v"] == esperado
+	facts = {}
+	compile_action({"var": "v", "op": "set", "value": "x"}).apply(facts)
+	assert facts == {"v": "x"}
+
+
+def test_red_rete_cadena_llega_a_punto_fijo():
+	from src.engine.compiler import compile_rules
+	from src.engine.rete import ReteSession, build_network
+
+	# Cadena declarada en orden inverso: x5 <- x4 <- ... <- x0 (más de 5 pasadas)
+	n = 7
+	rules = [
+		{"id": f"R{i}", "when": [{"var": f"x{i}", "op": "==", "value": True}],
+		 "then": [{"var": f"x{i + 1}", "op": "set", "value": True}]}
+		for i in reversed(range(n))
+	]
+	net = build_network(compile_rules(rules))
+	facts = {"x0": True}
+	fired: list[str] = []
+	sess = ReteSession(net, facts)
+	sess.run(lambda rule, act, hechos: fired.append(rule.id), lambda f: None)
+	assert facts[f"x{n}"] is True
+	# Cada regla dispara una sola vez (refracción) y se alcanza el punto fijo
+	assert sorted(fired) == sorted(f"R{i}" for i in range(n))
+	assert sess.passes == n
+
+
+def test_variable_derivada_nueva_reactiva_reglas_sin_declararla():
+	from src.engine.compiler import compile_rules
+	from src.engine.rete import ReteSession, build_network
+
+	rules = [
+		{"id": "R-B", "when": [{"var": "a", "op": "==", "value": True}], "then": [{"var": "b", "op": "set", "value": True}]},
+		{"id": "R-C", "when": [{"var": "derivada", "op": "==", "value": "si"}], "then": [{"var": "c", "op": "set", "value": True}]},
+	]
+
+	def after_pass(f):
+		# Como _derive_helper_states: escribe una variable que ninguna lista declara
+		if f.get("b"):
+			f["derivada"] = "si"
+
+	facts = {"a": True}
+	ReteSession(build_network(compile_rules(rules)), facts).run(lambda *_: None, after_pass)
+	assert facts.get("c") is True
+
+
+def test_red_rete_comparte_nodos_alfa():
+	kb = load_knowledge_base()
+	net = kb.network
+	total_conds = sum(len(r.conditions) for r in kb.compiled)
+	assert len(net.alphas) < total_conds
+	# Las reglas de mapeo documental dependen solo de `motivo`
+	motivo_rules = {r for ai in net.alphas_by_var["motivo"] for r in net.alphas[ai].rules}
+	assert all(kb.compiled[r].reads == ("motivo",) for r in motivo_rules if kb.compiled[r].id.startswith("R-DOC-MAP"))
+
+
+def test_indice_dependencias_y_stats():
+	kb = load_knowledge_base()
+	deps = kb.deps
+	ids = lambda idxs: {kb.compiled[i].id for i in idxs}
+	assert "R-PROD-5D-JP" in ids(deps.reads["duracion_estimdays"])
+	assert "R-ID-PEND-LEG" in ids(deps.reads["empleado_nombre"])
+	assert {"R-ID-PEND-LEG", "R-ART-ESTADOS"} <= ids(deps.writes["estado_aviso"])
+	# Variables del glosario sin reglas igualmente indexadas
+	assert deps.reads["vinculo_familiar"] == ()
+	assert "vinculo_familiar" not in deps.read_vars and "duracion_estimdays" in deps.read_vars
+
+	res = forward_chain(_base_facts_ok() | {"adjunto_certificado": "cert.pdf"})
+	st = res["stats"]
+	assert st["pasadas"] >= 1
+	assert st["condiciones_evaluadas"] + st["condiciones_evitadas"] == st["condiciones_full_scan"]
+	assert st["condiciones_evitadas"] > 0
+
+
+def test_forward_chain_batch_mismo_resultado_y_orden():
+	from src.engine.inference import forward_chain_batch
+
+	motivos = ["enfermedad_inculpable", "fallecimiento", "art", "matrimonio"]
+	lote = [_base_facts_ok() | {"motivo": m, "legajo": str(2000 + i)} for i, m in enumerate(motivos * 5)]
+	esperado = [forward_chain(f) for f in lote]
+	# Generador como entrada: se consume en streaming
+	assert list(forward_chain_batch(iter(lote))) == esperado
+	assert list(forward_chain_batch(lote, workers=2, chunksize=3)) == esperado
+
+
+def test_modo_columnar_paridad_con_forward_chain():
+	import pytest
+	pytest.importorskip("numpy")
+	from src.engine.vectorized import forward_chain_columns
+
+	inicio = date(2025, 8, 1)
+	filas = []
+	motivos = ["enfermedad_inculpable", "fallecimiento", "art", "permiso_gremial", "matrimonio"]
+	for i in range(60):
+		filas.append({
+			"id_aviso": f"A-{i}",
+			"legajo": str(1000 + i),
+			"empleado_nombre": None if i % 7 == 0 else f"Empleado {i}",
+			"area": "producción" if i % 2 else "ventas",
+			"motivo": motivos[i % len(motivos)],
+			"fecha_inicio": (inicio + timedelta(days=i)).isoformat(),
+			"duracion_estimdays": 1 + i % 5,
+			"adjunto_certificado": bool(i % 3),
+			"documento_legible": None if i % 4 else False,
+			"fecha_recepcion": (inicio + timedelta(days=i + i % 4)).isoformat() if i % 5 else None,
+			"plazo_cert_horas": 72,
+		})
+	res = forward_chain_columns(filas)
+	assert res.rows() == [forward_chain(f)["facts"] for f in filas]
+	assert res.column("estado_aviso")[0] == forward_chain(filas[0])["facts"]["estado_aviso"]
+
+
+def test_memo_forward_chain_copia_lru_y_ttl():
+	from src.engine import inference
+	from src.engine.memo import FactCache, fact_key, fingerprint_facts
+
+	inference.clear_engine_cache()
+	f = _base_facts_ok()
+	r1 = forward_chain(f)
+	r1["facts"]["estado_aviso"] = "mutado"
+	r2 = forward_chain(dict(reversed(list(f.items()))))
+	assert r2["facts"]["estado_aviso"] != "mutado"
+	assert r2 == inference._forward_chain_kb(load_knowledge_base(), f)
+	st = inference.engine_cache_stats()
+	assert st["hits"] == 1 and st["misses"] == 1
+	# backward_chain usa su propia entrada
+	assert backward_chain("crear_aviso", f) == backward_chain("crear_aviso", f)
+	assert inference.engine_cache_stats()["hits"] == 2
+
+	# Huella con tipos: 1 / True / "1" no colisionan
+	valores = (1, True, "1", 1.0, [1], (1,))
+	assert len({fingerprint_facts({"x": v}) for v in valores}) == 6
+	assert len({fact_key({"x": v}) for v in valores}) == 6
+
+	now = [0.0]
+	cache = FactCache(maxsize=2, ttl=10, clock=lambda: now[0])
+	cache.bind_kb("kb1")
+	cache.put("a", 1)
+	cache.put("b", 2)
+	cache.get("a")
+	cache.put("c", 3)  # desaloja "b" (LRU)
+	assert cache.get("b") is inference._MISS and cache.get("a") == 1
+	now[0] = 11
+	assert cache.get("a") is inference._MISS
+	cache.put("d", 4)
+	cache.bind_kb("kb2")
+	assert cache.get("d") is inference._MISS
+	st = cache.stats()
+	assert st["evictions"] == 1 and st["expirations"] == 1 and st["invalidations"] == 1
+
+
+def test_indice_intervalos_vs_recorrido_lineal():
+	import random
+	from src.utils.intervals import SolapeIndex
+
+	rnd = random.Random(7)
+	base = date(2025, 1, 1)
+	avisos = []
+	for i in range(400):
+		ini = base + timedelta(days=rnd.randrange(300))
+		avisos.append((f"L{i % 5}", ini, ini + timedelta(days=rnd.randrange(15)), i))
+	ix = SolapeIndex(avisos)
+	for _ in range(500):
+		leg = f"L{rnd.randrange(6)}"
+		fi = base + timedelta(days=rnd.randrange(-10, 320))
+		ff = fi + timedelta(days=rnd.randrange(5))
+		esperado = sorted(
+			(ai, af, n) for lg, ai, af, n in avisos if lg == leg and ai <= ff and af >= fi
+		)
+		assert ix.overlaps(leg, fi, ff) == bool(esperado)
+		assert ix.find(leg, fi, ff) == (esperado[0][2] if esperado else None)
+		if leg in ix.by_legajo:
+			assert sorted(ix.by_legajo[leg].find_all(fi, ff)) == sorted(e[2] for e in esperado)
+
+
+def test_duplicado_solapado_con_indice_prearmado():
+	from src.engine.inference import _solape_index
+
+	inicio = date.today()
+	abiertos = [{"legajo": "1234", "inicio": (inicio + timedelta(days=2)).isoformat(), "fin": (inicio + timedelta(days=4)).isoformat()}]
+	facts = _base_facts_ok() | {"duracion_estimdays": 3, "avisos_abiertos": _solape_index(abiertos)}
+	assert forward_chain(facts)["facts"]["estado_aviso"] == "rechazado"
+	# Borde inclusivo: termina el día anterior → sin solape
+	facts["duracion_estimdays"] = 1
+	assert forward_chain(facts)["facts"]["estado_aviso"] != "rechazado"
@@ -89,3 +89,22 @@ def test_parse_legajo_variants():
 	assert parse_legajo("L1000") is None
 
 
+
+
+def test_name_index_top_k_con_errores_de_tipeo():
+	from src.utils.name_index import NameIndex, normalize_name
+
+	assert normalize_name("  Pérez, JUAN  ") == "perez juan"
+	ix = NameIndex([
+		("Juan Pérez", "1001"),
+		("Juana Pereyra", "1002"),
+		("María López", "1003"),
+		("Juan Carlos Gómez", "1004"),
+		("", "1005"),
+	])
+	assert len(ix) == 4
+	top = ix.search("juan peres", k=2)
+	assert [legajo for legajo, _, _ in top][0] == "1001"
+	assert ix.search("Lopez Maria")[0][0] == "1003"  # orden apellido/nombre indistinto
+	assert ix.search("gomez", score_cutoff=90) == []  # solo apellido: por debajo del umbral
+	assert ix.search("zzz") == []
@@ -55,6 +55,34 @@ def test_detectar_solape():
 		assert True
 
 
+def test_find_solape_con_indice_igual_a_consulta():
+	from src.persistence.dao import build_solape_index, find_solape
+
+	ensure_schema()
+	with session_scope() as s:
+		s.query(Aviso).filter(Aviso.legajo == "L1002").delete()
+	fi = date(2025, 9, 1)
+	for i in range(4):
+		create_aviso({
+			"legajo": "L1002",
+			"motivo": "matrimonio",
+			"fecha_inicio": (fi + timedelta(days=10 * i)).isoformat(),
+			"duracion_estimdays": 3,
+			"estado_aviso": "completo",
+		})
+	with session_scope() as s:
+		indice = build_solape_index(s, ["L1002"])
+		assert len(indice) == 4
+		for d in range(-5, 45):
+			ini = fi + timedelta(days=d)
+			fin = ini + timedelta(days=1)
+			sql = find_solape(s, "L1002", ini, fin)
+			mem = find_solape(s, "L1002", ini, fin, indice=indice)
+			assert (sql is None) == (mem is None)
+			if mem is not None:
+				assert mem.id_aviso == sql.id_aviso
+
+
 def test_adjuntar_certificado_y_cambiar_estado():
 	ensure_schema()
 	with session_scope() as s:
@@ -78,3 +106,373 @@ def test_adjuntar_certificado_y_cambiar_estado():
 	})
 	assert upd["estado_certificado"] == "validado"
 	assert upd["estado_aviso"] == "completo"
+
+
+def test_reclasificacion_columnar_desde_query():
+	import pytest
+	pytest.importorskip("numpy")
+	from src.engine.inference import forward_chain, forward_chain_columnar
+	from src.engine.vectorized import _hechos_de_fila
+	from src.persistence.dao import query_hechos_avisos
+
+	ensure_schema()
+	query = query_hechos_avisos().where(Aviso.legajo.in_(["L1000", "L1001", "L1002"]))
+	res = forward_chain_columnar(query, extra={"plazo_cert_horas": 72})
+	with session_scope() as s:
+		filas = [_hechos_de_fila(dict(r)) | {"plazo_cert_horas": 72} for r in s.execute(query).mappings()]
+	assert res.n == len(filas)
+	assert res.rows() == [forward_chain(f)["facts"] for f in filas]
+
+
+def test_ensure_schema_crea_indices_faltantes():
+	from src.persistence.dao import _engine
+
+	ensure_schema()
+	with _engine.begin() as conn:
+		conn.exec_driver_sql("DROP INDEX IF EXISTS ix_avisos_legajo_fechas")
+	ensure_schema()  # memoizado: no vuelve a verificar
+	with _engine.connect() as conn:
+		assert "ix_avisos_legajo_fechas" not in {r[1] for r in conn.exec_driver_sql("PRAGMA index_list(avisos)")}
+	ensure_schema(force=True)
+	with _engine.connect() as conn:
+		nombres = {r[1] for r in conn.exec_driver_sql("PRAGMA index_list(avisos)")}
+		plan = " ".join(
+			r[3] for r in conn.exec_driver_sql(
+				"EXPLAIN QUERY PLAN SELECT id_aviso FROM avisos WHERE legajo = 'L1' "
+				"AND fecha_inicio <= '2025-01-05' AND fecha_fin_estimada >= '2025-01-01'"
+			)
+		)
+	assert {"ix_avisos_legajo_fechas", "ix_avisos_legajo_created_at", "ix_avisos_estado_aviso"} <= nombres
+	assert "ix_avisos_legajo_fechas" in plan
+
+
+def test_ids_aviso_concurrentes_sin_duplicados():
+	from concurrent.futures import ThreadPoolExecutor
+	from src.persistence.dao import reservar_ids_aviso
+	from src.persistence.models import AvisoSecuencia
+
+	ensure_schema()
+	fi = date(2031, 1, 15)
+	with session_scope() as s:
+		s.query(Aviso).filter(Aviso.fecha_inicio == fi).delete()
+		s.query(AvisoSecuencia).filter(AvisoSecuencia.fecha == fi).delete()
+
+	def crear(i: int) -> str:
+		return create_aviso({
+			"legajo": f"S{i:04d}",
+			"motivo": "matrimonio",
+			"fecha_inicio": fi.isoformat(),
+			"duracion_estimdays": 1,
+			"estado_aviso": "completo",
+		})["id_aviso"]
+
+	n = 64
+	with ThreadPoolExecutor(max_workers=16) as pool:
+		ids = list(pool.map(crear, range(n)))
+	assert len(set(ids)) == n
+	assert sorted(ids) == [f"A-20310115-{i:04d}" for i in range(1, n + 1)]
+
+	# Bloque para importación masiva: consecutivo a lo ya asignado
+	with session_scope() as s:
+		bloque = reservar_ids_aviso(s, fi, 10)
+	assert bloque[0] == f"A-20310115-{n + 1:04d}" and len(bloque) == 10
+
+
+def test_stats_agregado_unico_y_materializado(monkeypatch):
+	from sqlalchemy import func, or_, select
+	from src.config import settings
+	from src.persistence.models import Employee
+	from src.persistence.queries import compute_stats, fetch_stats, rebuild_stats
+
+	ensure_schema()
+	with session_scope() as s:
+		s.query(Aviso).filter(Aviso.legajo.in_(["L1003", "X9999"])).delete()
+		if s.get(Employee, "L1003") is None:
+			s.add(Employee(legajo="L1003", nombre="Ana", area="ventas"))
+
+	monkeypatch.setattr(settings, "STATS_MATERIALIZED", True)
+	with session_scope() as s:
+		rebuild_stats(s)
+
+	fi = date(2032, 3, 1)
+	a1 = create_aviso({
+		"legajo": "L1003", "motivo": "enfermedad_inculpable", "fecha_inicio": fi.isoformat(),
+		"duracion_estimdays": 2, "documento_tipo": "certificado_medico",
+		"estado_certificado": "pendiente", "estado_aviso": "incompleto",
+	})
+	create_aviso({
+		"legajo": "X9999", "motivo": "matrimonio", "fecha_inicio": fi.isoformat(),
+		"duracion_estimdays": 1, "estado_certificado": "pendiente", "estado_aviso": "incompleto",
+	})
+	update_certificado(a1["id_aviso"], {"archivo_nombre": "c.pdf", "documento_legible": True})
+
+	with session_scope() as s:
+		vivo = compute_stats(s)
+		assert fetch_stats(s) == vivo
+		# Mismo resultado que los COUNT por separado
+		sin_validar = or_(Employee.legajo.is_(None), Employee.nombre.is_(None), Employee.area.is_(None))
+		base = select(func.count()).select_from(Aviso).outerjoin(Employee, Aviso.legajo == Employee.legajo)
+		assert vivo["total_ausencias"] == s.execute(base).scalar()
+		assert vivo["ausencias_activas"] == s.execute(base.where(Aviso.estado_aviso != "completo")).scalar()
+		assert vivo["requieren_validacion"] == s.execute(base.where(sin_validar)).scalar()
+		assert vivo["alta_prioridad"] == s.execute(
+			base.where(sin_validar, Aviso.estado_certificado.in_(["pendiente", "en_revision"]))
+		).scalar()
+		assert vivo["alta_prioridad"] >= 1
+
+
+def test_stats_materializadas_siguen_a_empleados_y_bajas(monkeypatch):
+	from src.config import settings
+	from src.persistence.models import Employee
+	from src.persistence.queries import compute_stats, fetch_stats
+
+	ensure_schema()
+	with session_scope() as s:
+		s.query(Aviso).filter(Aviso.legajo == "Z1").delete()
+		s.query(Employee).filter(Employee.legajo == "Z1").delete()
+	monkeypatch.setattr(settings, "STATS_MATERIALIZED", True)
+	with session_scope() as s:
+		fetch_stats(s)
+
+	# Aviso de un legajo sin empleado: requiere validación y es de alta prioridad
+	a = create_aviso({
+		"legajo": "Z1", "motivo": "art", "fecha_inicio": date(2034, 2, 1).isoformat(),
+		"duracion_estimdays": 1, "estado_certificado": "pendiente", "estado_aviso": "incompleto",
+	})
+	with session_scope() as s:
+		antes = fetch_stats(s)
+		assert antes == compute_stats(s)
+
+	# Alta del empleado: el aviso deja de requerir validación
+	with session_scope() as s:
+		s.add(Employee(legajo="Z1", nombre="Zoe", area="ventas"))
+	with session_scope() as s:
+		despues = fetch_stats(s)
+		assert despues == compute_stats(s)
+		assert despues["requieren_validacion"] == antes["requieren_validacion"] - 1
+		assert despues["alta_prioridad"] == antes["alta_prioridad"] - 1
+
+	# Baja del empleado y DELETE masivo del aviso
+	with session_scope() as s:
+		s.delete(s.get(Employee, "Z1"))
+	with session_scope() as s:
+		assert fetch_stats(s)["requieren_validacion"] == antes["requieren_validacion"]
+	with session_scope() as s:
+		s.query(Aviso).filter(Aviso.id_aviso == a["id_aviso"]).delete()
+	with session_scope() as s:
+		stats = fetch_stats(s)
+		assert stats == compute_stats(s)
+		assert stats["total_ausencias"] == antes["total_ausencias"] - 1
+
+
+def test_paginacion_keyset_sin_huecos_ni_duplicados():
+	from datetime import datetime
+	from sqlalchemy import select
+	from src.persistence.queries import decode_cursor, encode_cursor, keyset_page
+
+	ensure_schema()
+	with session_scope() as s:
+		s.query(Aviso).filter(Aviso.legajo == "K1").delete()
+		ts = datetime(2033, 1, 1)
+		for i in range(23):
+			# Varios avisos con el mismo created_at: desempata id_aviso
+			s.add(Aviso(
+				id_aviso=f"K-{i:03d}", legajo="K1", motivo="art", fecha_inicio=date(2033, 1, 1),
+				fecha_fin_estimada=date(2033, 1, 2), duracion_estimdays=1, created_at=ts + timedelta(minutes=i // 4),
+			))
+	base = select(Aviso).where(Aviso.legajo == "K1")
+	vistos: list[str] = []
+	cursor = None
+	with session_scope() as s:
+		while True:
+			filas = s.execute(keyset_page(base, cursor, 5)).scalars().all()
+			pagina = filas[:5]
+			vistos += [a.id_aviso for a in pagina]
+			if len(filas) <= 5:
+				break
+			cursor = decode_cursor(encode_cursor(pagina[-1].created_at, pagina[-1].id_aviso))
+	assert vistos == [f"K-{i:03d}" for i in reversed(range(23))]
+	try:
+		decode_cursor("no-es-un-cursor")
+		assert False, "Debió fallar"
+	except ValueError:
+		pass
+
+
+def test_campos_derivados_en_sql_y_backfill_nombre_provisional():
+	from src.persistence.dao import _engine
+	from src.persistence.models import Employee
+	from src.persistence.queries import ausencias_select
+	from src.persistence.seed import backfill_nombre_provisional
+
+	ensure_schema()
+	with session_scope() as s:
+		s.query(Aviso).filter(Aviso.legajo.in_(["D1", "D2"])).delete()
+		if s.get(Employee, "D1") is None:
+			s.add(Employee(legajo="D1", nombre="Ana", area="ventas"))
+		comun = {"motivo": "art", "fecha_inicio": date(2034, 1, 1), "fecha_fin_estimada": date(2034, 1, 2), "duracion_estimdays": 1}
+		s.add(Aviso(id_aviso="D-1", legajo="D1", estado_aviso="completo", **comun))
+		s.add(Aviso(id_aviso="D-2", legajo="D1", estado_aviso="incompleto", estado_certificado="pendiente", **comun))
+		s.add(Aviso(id_aviso="D-3", legajo="D2", observaciones="Legajo PROVISIONAL - juan perez - validar con RRHH", **comun))
+	with _engine.begin() as conn:
+		assert backfill_nombre_provisional(conn) >= 1
+	with session_scope() as s:
+		filas = {r.id_aviso: r for r in s.execute(ausencias_select().where(Aviso.legajo.in_(["D1", "D2"])))}
+	assert (filas["D-1"].prioridad, filas["D-1"].accion_requerida) == ("baja", "Sin acción")
+	assert (filas["D-2"].prioridad, filas["D-2"].accion_requerida) == ("media", "Revisar certificado")
+	d3 = filas["D-3"]
+	assert d3.requiere_validacion_rrhh is True and d3.prioridad == "alta"
+	assert (d3.nombre_empleado, d3.area, d3.estado_aviso) == ("Juan Perez", "N/A", "pendiente")
+
+
+def test_data_version_sube_con_escrituras():
+	from src.persistence import version
+
+	ensure_schema()
+	avisos: list = []
+	baja = version.subscribe(avisos.append)
+	try:
+		v0 = version.current_data_version()
+		with session_scope() as s:
+			s.query(Aviso).filter(Aviso.legajo == "V1").count()
+		assert version.current_data_version() == v0 and not avisos  # lectura: sin cambio
+		res = create_aviso({
+			"legajo": "V1", "motivo": "matrimonio", "fecha_inicio": "2035-01-01",
+			"duracion_estimdays": 1, "estado_aviso": "completo",
+		})
+		v1 = version.current_data_version()
+		assert v1 == v0 + 1 and len(avisos) == 1
+		assert avisos[0].avisos == {res["id_aviso"]} and not avisos[0].completo
+		update_certificado(res["id_aviso"], {"archivo_nombre": "c.pdf"})
+		with session_scope() as s:
+			s.query(Aviso).filter(Aviso.legajo == "V1").delete()  # DELETE masivo
+		assert version.current_data_version() == v1 + 2
+		assert avisos[-1].completo
+	finally:
+		baja()
+
+
+def test_async_dao_en_pool_de_hilos(monkeypatch):
+	import asyncio
+	import threading
+	from src.config import settings
+	from src.persistence import async_dao
+
+	ensure_schema()
+	with session_scope() as s:
+		s.query(Aviso).filter(Aviso.legajo == "AS1").delete()
+	hilos: set = set()
+
+	def marcar(legajo, limit=10):
+		hilos.add(threading.current_thread().name)
+		return historial_empleado(legajo, limit)
+
+	async def escenario():
+		res = await async_dao.create_aviso({
+			"legajo": "AS1", "motivo": "matrimonio", "fecha_inicio": "2036-01-01",
+			"duracion_estimdays": 1, "estado_aviso": "completo",
+		})
+		historiales = await asyncio.gather(*(async_dao.run_db(marcar, "AS1") for _ in range(8)))
+		estado = await async_dao.get_aviso_status(res["id_aviso"])
+		return res, historiales, estado
+
+	monkeypatch.setattr(settings, "DB_THREADS", 2)
+	async_dao.shutdown()
+	try:
+		res, historiales, estado = asyncio.run(escenario())
+	finally:
+		async_dao.shutdown()
+	assert all(h[0]["id_aviso"] == res["id_aviso"] for h in historiales)
+	assert estado["estado_aviso"] == "completo"
+	assert hilos and all(n.startswith("db") for n in hilos) and len(hilos) <= 2
+
+	# DB_THREADS=0: mismo resultado ejecutando en el loop
+	monkeypatch.setattr(settings, "DB_THREADS", 0)
+	assert asyncio.run(async_dao.historial_empleado("AS1"))[0]["id_aviso"] == res["id_aviso"]
+
+
+def test_engine_pragmas_sqlite_y_estado_del_pool():
+	from src.config import settings
+	from src.persistence.dao import _engine
+	from src.persistence.engine import build_engine, pool_status
+
+	ensure_schema()
+	with _engine.connect() as conn:
+		pragma = lambda p: conn.exec_driver_sql(f"PRAGMA {p}").scalar()
+		assert str(pragma("journal_mode")).lower() == "wal"
+		assert pragma("synchronous") == 1  # NORMAL
+		assert pragma("busy_timeout") == settings.SQLITE_BUSY_TIMEOUT_MS
+		assert pragma("cache_size") == settings.SQLITE_CACHE_SIZE
+		estado = pool_status(_engine)
+		assert estado["pool"] == "QueuePool" and estado["checked_out"] >= 1
+	assert estado["size"] == settings.DB_POOL_SIZE and estado["connects"] >= 1
+
+	# En memoria: sin pool configurable ni WAL, pero con el resto de PRAGMAs
+	memoria = build_engine("sqlite://")
+	with memoria.connect() as conn:
+		assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == settings.SQLITE_BUSY_TIMEOUT_MS
+	assert "size" not in pool_status(memoria)
+
+
+def test_employee_directory_incremental_y_filas_sin_join():
+	from src.persistence.directory import EmployeeDirectory
+	from src.persistence.models import Employee
+	from src.persistence.queries import ausencias_select, avisos_select, fila_ausencia
+
+	ensure_schema()
+	with session_scope() as s:
+		s.query(Employee).filter(Employee.legajo.in_(["ED1", "ED2"])).delete()
+	directorio = EmployeeDirectory()
+	assert directorio.lookup("ED1") is None
+	cargas = directorio.full_loads
+
+	with session_scope() as s:
+		s.add(Employee(legajo="ED1", nombre="Eva", area="ventas"))
+	assert directorio.lookup("ED1").nombre == "Eva"
+	with session_scope() as s:
+		s.get(Employee, "ED1").nombre = "Eva María"
+	assert directorio.lookup("ED1").nombre == "Eva María"
+	assert directorio.full_loads == cargas  # altas y cambios: solo incremental
+
+	with session_scope() as s:
+		s.query(Employee).filter(Employee.legajo == "ED1").delete()
+	assert directorio.lookup("ED1") is None and directorio.full_loads == cargas + 1
+	estado = directorio.stats()
+	assert (estado["hits"], estado["misses"]) == (2, 2) and estado["hit_rate"] == 0.5
+
+	# Filas armadas con el directorio == filas del LEFT JOIN en SQL
+	with session_scope() as s:
+		con_join = [dict(r._mapping) for r in s.execute(ausencias_select().order_by(Aviso.id_aviso))]
+		empleados = directorio.snapshot()
+		sin_join = [fila_ausencia(r, empleados.get(r.legajo)) for r in s.execute(avisos_select().order_by(Aviso.id_aviso))]
+	assert con_join and sin_join == con_join
+	assert [list(f) for f in sin_join[:1]] == [list(f) for f in con_join[:1]]
+
+
+def test_employee_directory_reusa_indice_de_nombres_tras_escrituras_ajenas():
+	from src.persistence.directory import EmployeeDirectory
+	from src.persistence.models import Employee
+
+	ensure_schema()
+	with session_scope() as s:
+		s.query(Employee).filter(Employee.legajo == "ED3").delete()
+		s.add(Employee(legajo="ED3", nombre="Elena Ruiz", area="ventas"))
+	directorio = EmployeeDirectory()
+	indice = directorio.name_index()
+
+	# Escritura que no toca empleados: sube data_version y se refresca, pero el índice sigue
+	create_aviso({
+		"legajo": "ED3", "motivo": "art", "fecha_inicio": date(2035, 1, 1).isoformat(), "duracion_estimdays": 1,
+	})
+	assert directorio.name_index() is indice
+	# Cambio de área: registro actualizado, mismo índice
+	with session_scope() as s:
+		s.get(Employee, "ED3").area = "compras"
+	assert directorio.name_index() is indice
+	assert directorio.lookup("ED3").area == "compras"
+	assert directorio.suggest("elena ruiz")[0][0].area == "compras"
+
+	with session_scope() as s:
+		s.get(Employee, "ED3").nombre = "Elena Ruiz Díaz"
+	assert directorio.name_index() is not indice
+	assert directorio.suggest("elena ruiz diaz")[0][0].nombre == "Elena Ruiz Díaz"
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import pytest
+
+from src.session_store import MemoryBackend, SessionBackend, SessionStore, SqlBackend, decode_record, encode_record
+
+
+class Reloj:
+	def __init__(self) -> None:
+		self.t = 0.0
+
+	def __call__(self) -> float:
+		return self.t
+
+
+def test_registro_compacto_omite_defaults_y_comprime():
+	defaults = {"step": "inicio", "legajo": None, "sugerencias": {}}
+	blob = encode_record({"step": "motivo", "legajo": None, "sugerencias": {}}, defaults)
+	assert blob == b'j{"step":"motivo"}'
+	assert decode_record(blob, defaults) == {"step": "motivo", "legajo": None, "sugerencias": {}}
+	grande = encode_record({"obs": "x" * 5000})
+	assert grande[:1] == b"z" and len(grande) < 200
+	assert decode_record(grande) == {"obs": "x" * 5000}
+
+
+def test_lru_ttl_en_memoria_con_backend_durable():
+	backend = MemoryBackend()
+	reloj = Reloj()
+	store = SessionStore(backend, "t", maxsize=2, ttl=60, clock=reloj)
+	for chat in ("a", "b", "c"):
+		store[chat] = {"step": chat}
+	assert len(store) == 2 and store.stats()["evictions"] == 1
+	assert store.get("a") == {"step": "a"}  # desalojada de memoria, se recarga del backend
+	assert store.stats()["loads"] == 1
+
+	sess = store["b"]
+	sess["step"] = "fecha"
+	store.save("b")
+	store.save("b")  # sin cambios: no se reescribe
+	assert store.stats()["skipped_writes"] == 1
+
+	# Otro proceso escribe la misma sesión: se ve al vencer el TTL
+	otro = SessionStore(backend, "t", clock=reloj)
+	otro["b"] = {"step": "dias"}
+	assert store["b"]["step"] == "fecha"
+	reloj.t = 61
+	assert store["b"]["step"] == "dias"
+
+	assert store.purge(max_age_days=1) == 0
+	assert store.purge(max_age_days=0) == 3
+	assert backend.load("t:a") is None
+	store["d"] = {"step": "d"}
+	store.clear()
+	assert "d" not in store and backend.load("t:d") is None
+
+
+def test_save_con_dict_vivo_escribe_aunque_se_haya_desalojado():
+	backend = MemoryBackend()
+	store = SessionStore(backend, "t", maxsize=1)
+	store["a"] = {"step": "motivo"}
+	sess = store["a"]
+	store["b"] = {"step": "b"}  # otro chat desaloja "a" del LRU antes del save
+	assert "a" not in store._data
+	sess["step"] = "fecha"
+	store.save("a", sess)
+	assert decode_record(backend.load("t:a")) == {"step": "fecha"}
+	assert store["a"]["step"] == "fecha"
+
+
+def test_backend_incompleto_falla_al_crearse():
+	class SoloLectura(SessionBackend):
+		def load(self, key):
+			return None
+
+	with pytest.raises(TypeError):
+		SoloLectura()
+
+
+def test_dialogo_sobrevive_reinicio_con_backend_sql():
+	from src.dialogue.manager import SESSION_DEFAULTS, DialogueManager
+
+	nuevo_store = lambda: SessionStore(SqlBackend(), "dialogo_test", defaults=SESSION_DEFAULTS)
+	store = nuevo_store()
+	store.clear()
+	mgr = DialogueManager(store)
+	mgr.process_message("r1", "hola")
+	assert mgr.sessions["r1"]["step"] == "legajo"
+
+	# "Reinicio": store nuevo, sin nada en memoria; la sesión se carga con el primer mensaje
+	mgr2 = DialogueManager(nuevo_store())
+	assert len(mgr2.sessions) == 0
+	assert mgr2.sessions["r1"]["step"] == "legajo"
+	assert mgr2.sessions["r1"]["sugerencias"] == {}
+	store.clear()
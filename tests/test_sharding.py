@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+
+import pytest
+
+from src.persistence.seed import ensure_schema, seed_employees_synthetic
+from src.telegram.sharding import HashRing, LocalDialogue, ShardedDialogue, WorkerError
+
+
+def test_hash_ring_reparte_y_reasigna_poco():
+	chats = [str(100000 + i) for i in range(4000)]
+	ring4, ring5 = HashRing(4), HashRing(5)
+	carga = Counter(ring4.node_for(c) for c in chats)
+	assert set(carga) == {0, 1, 2, 3}
+	assert min(carga.values()) > 500
+	movidos = sum(ring4.node_for(c) != ring5.node_for(c) for c in chats)
+	# Agregar un worker mueve ~1/5 de los chats (y solo hacia el nuevo)
+	assert movidos < len(chats) * 0.3
+	assert all(ring5.node_for(c) == 4 for c in chats if ring4.node_for(c) != ring5.node_for(c))
+
+
+def test_workers_respetan_orden_por_chat():
+	ensure_schema()
+	seed_employees_synthetic(50)
+	guion = ["hola", "1005", "enfermedad", "mañana", "3"]
+	chats = [f"sh_{i}" for i in range(12)]
+
+	async def replay(dialogue):
+		# Todos los mensajes de todos los chats en vuelo a la vez
+		tareas = [dialogue.process_message(chat, texto) for texto in guion for chat in chats]
+		respuestas = await asyncio.gather(*tareas)
+		return [r["reply_text"] for r in respuestas]
+
+	async def main():
+		sharded = ShardedDialogue(2).start()
+		try:
+			resultado = await replay(sharded)
+			with pytest.raises(ValueError):
+				await sharded.call("sh_0", "_create_absence_record")
+			with pytest.raises(WorkerError):
+				await sharded.call("sh_0", "update_facts", None)
+			return resultado, sharded.stats()
+		finally:
+			await sharded.close()
+
+	respuestas, stats = asyncio.run(main())
+	assert stats["workers"] == 2 and all(stats["mensajes_por_worker"])
+	# Mismas respuestas que el DialogueManager en proceso (en el bot el orden por chat
+	# lo da ChatSerializerMiddleware; acá cada mensaje se espera antes del siguiente)
+	local = LocalDialogue()
+	for chat in chats:
+		local.dm.sessions.pop(chat)
+
+	async def replay_en_serie():
+		return [(await local.process_message(chat, texto))["reply_text"] for texto in guion for chat in chats]
+
+	esperadas = asyncio.run(replay_en_serie())
+	assert respuestas == esperadas
+	assert "Duración: 3 día(s)" in respuestas[-1]
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import threading
+from datetime import date
+
+import pytest
+
+from src.dialogue.manager import DialogueManager
+from src.persistence.dao import create_aviso, session_scope, set_certificado_archivo_path, update_certificado
+from src.persistence.models import Aviso, Certificado
+from src.persistence.seed import ensure_schema, seed_employees_synthetic
+from src.utils.upload_spool import UploadSpool, _registrar_link
+
+
+class FakeDrive:
+	"""Reemplazo de drive_upload: falla `fallas` veces con `error` y después devuelve un link."""
+
+	def __init__(self, fallas: int = 0, error: Exception | None = None) -> None:
+		self.fallas = fallas
+		self.error = error or OSError("timeout")
+		self.subidos: list[str] = []
+		self.llamadas = 0
+		self._lock = threading.Lock()
+
+	def __call__(self, path, filename, mime_type) -> str:
+		with self._lock:
+			self.llamadas += 1
+			if self.fallas > 0:
+				self.fallas -= 1
+				raise self.error
+			assert path.read_bytes()
+			self.subidos.append(filename)
+			return f"https://drive.example/{filename}"
+
+
+def _spool(tmp_path, drive, registrados=None, **kw) -> UploadSpool:
+	def on_uploaded(job, link):
+		registrados.extend((t, link) for t in job.targets)
+
+	kw.setdefault("backoff_base", 0.01)
+	return UploadSpool(tmp_path, drive, on_uploaded=on_uploaded if registrados is not None else None, **kw)
+
+
+def test_reintenta_errores_transitorios_y_registra_link(tmp_path):
+	drive, registrados = FakeDrive(fallas=2), []
+	spool = _spool(tmp_path, drive, registrados).start()
+	digest, path = spool.put_bytes(b"%PDF certificado", ".PDF")
+	assert path.name == f"{digest}.pdf" and path.read_bytes() == b"%PDF certificado"
+	spool.submit(digest, ".pdf", "cert.pdf", "application/pdf", "A1")
+	assert spool.join(5)
+	spool.close()
+	job = spool.load_job(digest)
+	assert (job.state, job.attempts, job.link) == ("done", 3, "https://drive.example/cert.pdf")
+	assert registrados == [("A1", job.link)]
+	assert spool.stats()["retries"] == 2 and spool.stats()["uploaded"] == 1
+
+
+def test_error_permanente_o_intentos_agotados_no_se_reintentan(tmp_path):
+	drive = FakeDrive(fallas=10, error=ValueError("GD_FOLDER_ID no configurado"))
+	spool = _spool(tmp_path, drive, []).start()
+	d1, _ = spool.put_bytes(b"uno", ".jpg")
+	spool.submit(d1, ".jpg", "uno.jpg", "image/jpeg", "A1")
+	assert spool.join(5)
+	assert drive.llamadas == 1 and spool.load_job(d1).state == "failed"
+
+	drive.error = OSError("503")
+	spool.max_attempts = 3
+	d2, _ = spool.put_bytes(b"dos", ".jpg")
+	spool.submit(d2, ".jpg", "dos.jpg", "image/jpeg", "A2")
+	assert spool.join(5)
+	spool.close()
+	assert drive.llamadas == 4
+	job = spool.load_job(d2)
+	assert (job.state, job.attempts) == ("failed", 3) and "503" in job.error
+
+
+def test_mismo_contenido_se_guarda_y_sube_una_vez(tmp_path):
+	drive, registrados = FakeDrive(), []
+	spool = _spool(tmp_path, drive, registrados).start()
+	# Descarga directa a spool/tmp (como bot.download_file(destination=...))
+	tmp = spool.temp_path()
+	tmp.write_bytes(b"foto")
+	d1, p1 = spool.put_file(tmp, ".JPG")
+	assert p1.name == f"{d1}.jpg" and not tmp.exists()
+	spool.submit(d1, ".jpg", "a.jpg", "image/jpeg", "A1")
+	assert spool.join(5)
+	d2, p2 = spool.put_bytes(b"foto", ".jpg")
+	assert (d1, p1) == (d2, p2) and list((tmp_path / "tmp").iterdir()) == []
+	# Ya subido: no se vuelve a subir, se registra enseguida para el aviso nuevo
+	spool.submit(d2, ".jpg", "b.jpg", "image/jpeg", "A2")
+	spool.close()
+	assert drive.subidos == ["a.jpg"]
+	assert [t for t, _ in registrados] == ["A1", "A2"]
+	assert spool.stats()["deduplicated"] == 1
+
+
+def test_pendientes_se_reanudan_tras_reinicio(tmp_path):
+	# Sin hilos (proceso que se cortó antes de subir): queda el manifiesto pendiente
+	spool = _spool(tmp_path, FakeDrive())
+	digest, _ = spool.put_bytes(b"pendiente", ".pdf")
+	spool.submit(digest, ".pdf", "p.pdf", "application/pdf", "A9")
+	spool.close()
+
+	drive, registrados = FakeDrive(), []
+	nuevo = _spool(tmp_path, drive, registrados)
+	assert nuevo.resume() == 1
+	nuevo.start()
+	assert nuevo.join(5)
+	nuevo.close()
+	assert drive.subidos == ["p.pdf"] and registrados == [("A9", "https://drive.example/p.pdf")]
+
+
+def test_link_reemplaza_archivo_path_del_certificado(tmp_path):
+	ensure_schema()
+	with session_scope() as s:
+		s.query(Aviso).filter(Aviso.legajo == "L1500").delete()
+	res = create_aviso({
+		"legajo": "L1500",
+		"motivo": "enfermedad_inculpable",
+		"fecha_inicio": date(2025, 9, 1).isoformat(),
+		"duracion_estimdays": 2,
+		"documento_tipo": "certificado_medico",
+	})
+	id_aviso = res["id_aviso"]
+	spool = UploadSpool(
+		tmp_path, FakeDrive(fallas=1), backoff_base=0.01,
+		on_uploaded=lambda job, link: [set_certificado_archivo_path(t, link) for t in job.targets],
+	).start()
+	digest, path = spool.put_bytes(b"%PDF", ".pdf")
+	update_certificado(id_aviso, {"archivo_nombre": "c.pdf", "archivo_path": str(path), "documento_legible": True})
+	spool.submit(digest, ".pdf", "c.pdf", "application/pdf", id_aviso)
+	assert spool.join(5)
+	spool.close()
+	with session_scope() as s:
+		cert = s.query(Certificado).filter(Certificado.id_aviso == id_aviso).one()
+		assert cert.archivo_path == "https://drive.example/c.pdf"
+	assert set_certificado_archivo_path("NO-EXISTE", "x") is False
+
+
+@pytest.mark.parametrize("subida_antes_de_confirmar", [True, False])
+def test_certificado_adjuntado_antes_de_crear_el_aviso_recibe_el_link(tmp_path, subida_antes_de_confirmar):
+	# Handler de archivos sin id_aviso: el certificado queda en facts y el aviso se crea al confirmar
+	ensure_schema()
+	seed_employees_synthetic(50)
+	drive = FakeDrive()
+	spool = UploadSpool(tmp_path, drive, on_uploaded=_registrar_link, backoff_base=0.01)
+	mgr = DialogueManager()
+	chat = f"spool_{subida_antes_de_confirmar}"
+	mgr.process_message(chat, "hola")
+	mgr.process_message(chat, "1007")
+	mgr.process_message(chat, "enfermedad")
+	mgr.process_message(chat, "15/03/2027" if subida_antes_de_confirmar else "15/04/2027")
+	mgr.process_message(chat, "2")
+	mgr.process_message(chat, "enviar más tarde")
+	assert mgr.sessions[chat]["step"] == "confirmacion"
+
+	digest, path = spool.put_bytes(f"%PDF {chat}".encode(), ".pdf")
+	spool.submit(digest, ".pdf", "cert.pdf", "application/pdf")
+	mgr.update_facts(chat, {"certificado_archivo_path": str(path), "certificado_digest": digest})
+	if subida_antes_de_confirmar:
+		spool.start()
+		assert spool.join(5)
+
+	res = mgr.process_message(chat, "si")
+	id_aviso = res["id_aviso"]
+	assert "RECORDATORIO" not in res["reply_text"]
+	assert mgr.get_facts(chat) == {}
+	with session_scope() as s:
+		assert s.query(Certificado).filter(Certificado.id_aviso == id_aviso).one().archivo_path == str(path)
+
+	# Lo que hace el bot con la respuesta (vincular_adjunto)
+	spool.add_target(res["adjunto"]["certificado_digest"], id_aviso)
+	spool.start()
+	assert spool.join(5)
+	spool.close()
+	assert drive.subidos == ["cert.pdf"]
+	with session_scope() as s:
+		cert = s.query(Certificado).filter(Certificado.id_aviso == id_aviso).one()
+		assert cert.archivo_path == "https://drive.example/cert.pdf"